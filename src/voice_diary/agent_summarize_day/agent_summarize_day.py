@@ -136,7 +136,10 @@ def process_with_openai_assistant(transcriptions, prompt_template, openai_config
         logger.error("No OpenAI API key found. Set it in the config file or as an environment variable.")
         return None
     
-    client = OpenAI(api_key=api_key)
+    # The base URL follows the configured endpoint, so a local stand-in server can be used
+    api_endpoint = config.get('api_endpoint') or ''
+    base_url = api_endpoint[:api_endpoint.index('/v1') + len('/v1')] if '/v1' in api_endpoint else None
+    client = OpenAI(api_key=api_key, base_url=base_url)
     
     try:
         # Check if we have a saved assistant_id in the config
@@ -3,6 +3,7 @@ import psycopg2
 from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
 import json
+import os
 
 from voice_diary.db_utils.db_config import get_db_url
 
@@ -12,6 +13,9 @@ logger = logging.getLogger(__name__)
 # Connection pool for reusing database connections
 connection_pool = None
 
+# States of an audio file in the processed_files job table
+PROCESSED_FILE_STATES = ('discovered', 'transcribing', 'transcribed', 'saved', 'failed', 'skipped')
+
 def initialize_db():
     """Initialize database and create necessary tables if they don't exist"""
     global connection_pool
@@ -70,6 +74,43 @@ def create_tables():
         CREATE INDEX IF NOT EXISTS idx_transcriptions_created_at ON transcriptions(created_at)
         """)
         
+        # Create transcription cache table, keyed by the audio content and the model
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS transcription_cache (
+            audio_sha256 TEXT NOT NULL,
+            model TEXT NOT NULL,
+            content TEXT NOT NULL,
+            transcription_id INTEGER REFERENCES transcriptions(id) ON DELETE SET NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (audio_sha256, model)
+        )
+        """)
+        
+        # Create processed files table, tracking each audio file through the transcription stage
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS processed_files (
+            id SERIAL PRIMARY KEY,
+            audio_path TEXT NOT NULL UNIQUE,
+            filename TEXT,
+            state TEXT NOT NULL DEFAULT 'discovered'
+                CHECK (state IN ('discovered', 'transcribing', 'transcribed', 'saved', 'failed', 'skipped')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            content TEXT,
+            transcription_id INTEGER REFERENCES transcriptions(id) ON DELETE SET NULL,
+            error TEXT,
+            metadata JSONB,
+            claimed_at TIMESTAMP WITH TIME ZONE,
+            claimed_by TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        
+        # Create index on processed_files.state for finding the remaining work
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_processed_files_state ON processed_files(state)
+        """)
+        
         conn.commit()
         logger.info("Database tables created successfully")
     except Exception as e:
@@ -131,6 +172,381 @@ def save_transcription(content, filename=None, audio_path=None, model_type=None,
         if conn:
             return_connection(conn)
 
+def get_cached_transcription(audio_sha256, model):
+    """
+    Look up the stored transcript of identical audio
+    
+    Args:
+        audio_sha256 (str): SHA-256 hex digest of the audio bytes
+        model (str): Name of the transcription model
+        
+    Returns:
+        dict: The cache entry (content, transcription_id, created_at) or None if there is none
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute("""
+        SELECT content, transcription_id, created_at
+        FROM transcription_cache
+        WHERE audio_sha256 = %s AND model = %s
+        """, (audio_sha256, model))
+        
+        return cur.fetchone()
+    except Exception as e:
+        logger.error(f"Error reading transcription cache: {str(e)}")
+        return None
+    finally:
+        if conn:
+            return_connection(conn)
+
+def save_cached_transcription(audio_sha256, model, content, transcription_id=None):
+    """
+    Store a transcript in the transcription cache
+    
+    Args:
+        audio_sha256 (str): SHA-256 hex digest of the audio bytes
+        model (str): Name of the transcription model
+        content (str): The transcription text
+        transcription_id (int, optional): ID of the transcription saved for this audio
+        
+    Returns:
+        bool: True if the entry was stored (or already existed), False if error
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("""
+        INSERT INTO transcription_cache 
+        (audio_sha256, model, content, transcription_id)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (audio_sha256, model) DO NOTHING
+        """, (audio_sha256, model, content, transcription_id))
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error saving to transcription cache: {str(e)}")
+        return False
+    finally:
+        if conn:
+            return_connection(conn)
+
+def register_processed_files(audio_paths):
+    """
+    Add audio files to the processed_files job table and get their current state
+    
+    Files that are already in the table keep their state, so registering the
+    same files again is harmless.
+    
+    Args:
+        audio_paths (list): Paths of the audio files
+        
+    Returns:
+        dict: Job row (state, attempts, content, transcription_id) by audio path, empty if error
+    """
+    audio_paths = [str(audio_path) for audio_path in audio_paths]
+    if not audio_paths:
+        return {}
+    
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute("""
+        INSERT INTO processed_files (audio_path, filename)
+        SELECT * FROM unnest(%s::text[], %s::text[])
+        ON CONFLICT (audio_path) DO NOTHING
+        """, (audio_paths, [os.path.basename(audio_path) for audio_path in audio_paths]))
+        
+        cur.execute("""
+        SELECT audio_path, state, attempts, content, transcription_id
+        FROM processed_files
+        WHERE audio_path = ANY(%s)
+        """, (audio_paths,))
+        
+        jobs = {row['audio_path']: row for row in cur.fetchall()}
+        conn.commit()
+        return jobs
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error registering processed files: {str(e)}")
+        return {}
+    finally:
+        if conn:
+            return_connection(conn)
+
+def claim_processed_file(audio_path, max_attempts=3, stale_after_seconds=900, claimed_by=None):
+    """
+    Claim an audio file for transcription
+    
+    A file can be claimed when it was discovered but not yet tried, when an
+    earlier attempt failed, or when an earlier claim is older than
+    'stale_after_seconds' (the run that made it has crashed). Failed and
+    stale files are only retried up to 'max_attempts' times.
+    
+    Claiming does not count as an attempt; failures do (see
+    fail_processed_file), and so does taking over a stale claim.
+    
+    Args:
+        audio_path (str): Path of the audio file
+        max_attempts (int): Maximum number of transcription attempts
+        stale_after_seconds (float): Age after which a claim is given up
+        claimed_by (str, optional): Run making the claim (e.g. host and process id)
+        
+    Returns:
+        bool: True if claimed, False if the file is not claimable, None if error
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("""
+        UPDATE processed_files
+        SET state = 'transcribing', attempts = attempts + CASE WHEN state = 'transcribing' THEN 1 ELSE 0 END,
+            error = NULL, claimed_at = CURRENT_TIMESTAMP, claimed_by = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE audio_path = %s
+          AND (state = 'discovered'
+               OR (state = 'failed' AND attempts < %s)
+               OR (state = 'transcribing' AND attempts < %s
+                   AND claimed_at < CURRENT_TIMESTAMP - make_interval(secs => %s)))
+        RETURNING id
+        """, (claimed_by, str(audio_path), max_attempts, max_attempts, stale_after_seconds))
+        
+        claimed = cur.fetchone() is not None
+        conn.commit()
+        return claimed
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error claiming processed file: {str(e)}")
+        return None
+    finally:
+        if conn:
+            return_connection(conn)
+
+def get_processed_file_claimants():
+    """
+    Get the runs that hold claims in the processed_files job table
+    
+    Returns:
+        list: The distinct 'claimed_by' values of files being transcribed, empty if error
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("""
+        SELECT DISTINCT claimed_by
+        FROM processed_files
+        WHERE state = 'transcribing' AND claimed_by IS NOT NULL
+        """)
+        
+        return [row[0] for row in cur.fetchall()]
+    except Exception as e:
+        logger.error(f"Error getting processed file claimants: {str(e)}")
+        return []
+    finally:
+        if conn:
+            return_connection(conn)
+
+def release_processed_file_claims(claimants, error):
+    """
+    Give up the claims of runs that ended without finishing their files
+    
+    The files are marked failed, counting the interrupted attempt, so they
+    can be claimed again at once instead of after the claim timeout.
+    
+    Args:
+        claimants (list): 'claimed_by' values of the runs that ended
+        error (str): Reason recorded for the failure
+        
+    Returns:
+        int: Number of files released, 0 if error
+    """
+    if not claimants:
+        return 0
+    
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("""
+        UPDATE processed_files
+        SET state = 'failed', attempts = attempts + 1, error = %s, claimed_by = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE state = 'transcribing' AND claimed_by = ANY(%s)
+        RETURNING id
+        """, (error, list(claimants)))
+        
+        released = len(cur.fetchall())
+        conn.commit()
+        return released
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error releasing processed file claims: {str(e)}")
+        return 0
+    finally:
+        if conn:
+            return_connection(conn)
+
+def set_processed_file_state(audio_path, state, from_states, content=None, transcription_id=None, error=None,
+                             metadata=None, count_attempt=False):
+    """
+    Move an audio file to a new state in the processed_files job table
+    
+    The transition is idempotent: repeating it for a file that is already in
+    'state' succeeds without changing anything.
+    
+    Args:
+        audio_path (str): Path of the audio file
+        state (str): The new state
+        from_states (tuple): States the file may move from
+        content (str, optional): Transcription text to keep with the job
+        transcription_id (int, optional): ID of the saved transcription
+        error (str, optional): Reason for a failure
+        metadata (dict, optional): Additional metadata for the job
+        count_attempt (bool): Whether the transition counts as a transcription attempt
+        
+    Returns:
+        bool: True if the file is now in 'state', False otherwise or if error
+    """
+    if state not in PROCESSED_FILE_STATES:
+        raise ValueError(f"Unknown processed file state: {state}")
+    
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("""
+        UPDATE processed_files
+        SET state = %s, content = COALESCE(%s, content),
+            transcription_id = COALESCE(%s, transcription_id),
+            error = %s, metadata = COALESCE(%s, metadata), attempts = attempts + %s,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE audio_path = %s AND state = ANY(%s)
+        RETURNING id
+        """, (state, content, transcription_id, error, json.dumps(metadata) if metadata else None,
+              1 if count_attempt else 0, str(audio_path), list(from_states)))
+        
+        if cur.fetchone() is None:
+            cur.execute("SELECT state FROM processed_files WHERE audio_path = %s", (str(audio_path),))
+            row = cur.fetchone()
+            conn.commit()
+            return row is not None and row[0] == state
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error updating processed file state: {str(e)}")
+        return False
+    finally:
+        if conn:
+            return_connection(conn)
+
+def complete_processed_file(audio_path, content):
+    """Record the transcription of an audio file, before it is saved"""
+    return set_processed_file_state(audio_path, 'transcribed', ('discovered', 'transcribing', 'failed'),
+                                    content=content)
+
+def mark_processed_file_saved(audio_path, transcription_id=None):
+    """Record that the transcription of an audio file has been saved"""
+    return set_processed_file_state(audio_path, 'saved', ('transcribed',), transcription_id=transcription_id)
+
+def fail_processed_file(audio_path, error):
+    """Record a failed transcription attempt for an audio file"""
+    return set_processed_file_state(audio_path, 'failed', ('discovered', 'transcribing'), error=error,
+                                    count_attempt=True)
+
+def skip_processed_file(audio_path, metadata=None):
+    """Record that an audio file is not worth transcribing (e.g. it holds no speech)"""
+    return set_processed_file_state(audio_path, 'skipped', ('discovered', 'transcribing', 'failed'),
+                                    metadata=metadata)
+
+def save_processed_transcription(audio_path, content, filename=None, duration_seconds=None, metadata=None,
+                                 audio_sha256=None, model=None):
+    """
+    Save the transcription of an audio file and mark its job saved, once
+    
+    The transcription, its cache entry and the job's move to 'saved' are
+    written in one transaction while the job row is locked, so a file that
+    two runs both try to save (e.g. one resuming it after a crash) is only
+    saved by the first of them.
+    
+    Args:
+        audio_path (str): Path of the audio file
+        content (str): The transcription text
+        filename (str, optional): Original audio filename
+        duration_seconds (float, optional): Duration of the audio in seconds
+        metadata (dict, optional): Additional metadata for the transcription
+        audio_sha256 (str, optional): SHA-256 hex digest of the audio, to cache the transcript under
+        model (str, optional): Name of the transcription model, to cache the transcript under
+    
+    Returns:
+        int: ID of the inserted record, None if the file was already saved or if error
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        # Files that are not in the job table are saved without a job to update
+        cur.execute("SELECT state FROM processed_files WHERE audio_path = %s FOR UPDATE", (str(audio_path),))
+        row = cur.fetchone()
+        if row is not None and row[0] != 'transcribed':
+            conn.commit()
+            logger.info(f"Transcription of {audio_path} is already saved")
+            return None
+        
+        cur.execute("""
+        INSERT INTO transcriptions
+        (content, filename, audio_path, duration_seconds, metadata)
+        VALUES (%s, %s, %s, %s, %s)
+        RETURNING id
+        """, (content, filename, str(audio_path), duration_seconds, json.dumps(metadata) if metadata else None))
+        transcription_id = cur.fetchone()[0]
+        
+        if audio_sha256 and model:
+            cur.execute("""
+            INSERT INTO transcription_cache
+            (audio_sha256, model, content, transcription_id)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (audio_sha256, model) DO NOTHING
+            """, (audio_sha256, model, content, transcription_id))
+        
+        cur.execute("""
+        UPDATE processed_files
+        SET state = 'saved', transcription_id = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE audio_path = %s
+        """, (transcription_id, str(audio_path)))
+        
+        conn.commit()
+        logger.info(f"Saved transcription with ID: {transcription_id}")
+        return transcription_id
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error saving processed transcription: {str(e)}")
+        return None
+    finally:
+        if conn:
+            return_connection(conn)
+
 def get_transcription(transcription_id):
     """Retrieve a transcription by ID"""
     conn = None
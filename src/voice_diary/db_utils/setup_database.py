@@ -41,8 +41,9 @@ def main():
         logger.info("The following tables have been created:")
         logger.info("  - transcriptions: Stores transcription content and metadata")
         logger.info("  - categories: Categorization of transcriptions")
-        logger.info("  - processed_files: Tracks processed audio files")
+        logger.info("  - processed_files: Tracks each audio file through transcription (job queue)")
         logger.info("  - optimize_transcriptions: Stores optimized transcription content with structured data")
+        logger.info("  - transcription_cache: Transcripts keyed by audio content hash and model")
     else:
         logger.error("Database setup failed.")
         sys.exit(1)
@@ -85,7 +85,16 @@ class TestDbManager(unittest.TestCase):
         create_tables()
         
         # Verify cursor executed the expected SQL statements
-        self.assertEqual(mock_cursor.execute.call_count, 8)  # 4 CREATE TABLE + 4 CREATE INDEX statements
+        self.assertEqual(mock_cursor.execute.call_count, 5)  # 3 CREATE TABLE + 2 CREATE INDEX
+        statements = [' '.join(call[0][0].split()) for call in mock_cursor.execute.call_args_list]
+        cache_ddl = next(sql for sql in statements if 'CREATE TABLE IF NOT EXISTS transcription_cache' in sql)
+        self.assertIn('PRIMARY KEY (audio_sha256, model)', cache_ddl)
+        jobs_ddl = next(sql for sql in statements if 'CREATE TABLE IF NOT EXISTS processed_files' in sql)
+        self.assertIn('audio_path TEXT NOT NULL UNIQUE', jobs_ddl)
+        self.assertIn("CHECK (state IN ('discovered', 'transcribing', 'transcribed', 'saved', 'failed', 'skipped'))",
+                      jobs_ddl)
+        self.assertIn('claimed_by TEXT', jobs_ddl)
+        self.assertIn('CREATE INDEX IF NOT EXISTS idx_processed_files_state ON processed_files(state)', statements)
         mock_conn.commit.assert_called_once()
         mock_return_connection.assert_called_once_with(mock_conn)
 
@@ -191,5 +200,221 @@ class TestDbManager(unittest.TestCase):
         mock_conn.commit.assert_called_once()
         mock_return_connection.assert_called_once_with(mock_conn)
 
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_get_cached_transcription(self, mock_return_connection, mock_get_connection):
+        """Test looking up a transcript by audio hash and model."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_entry = {"content": "Cached text", "transcription_id": 7, "created_at": "2023-01-01"}
+        mock_cursor.fetchone.return_value = mock_entry
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import get_cached_transcription
+        result = get_cached_transcription("abc123", "whisper-1")
+        
+        # Verify results
+        self.assertEqual(result, mock_entry)
+        mock_cursor.execute.assert_called_once_with(unittest.mock.ANY, ("abc123", "whisper-1"))
+        mock_return_connection.assert_called_once_with(mock_conn)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_save_cached_transcription(self, mock_return_connection, mock_get_connection):
+        """Test storing a transcript in the transcription cache."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import save_cached_transcription
+        result = save_cached_transcription("abc123", "whisper-1", "Cached text", 7)
+        
+        # Verify results
+        self.assertTrue(result)
+        mock_cursor.execute.assert_called_once_with(unittest.mock.ANY, ("abc123", "whisper-1", "Cached text", 7))
+        mock_conn.commit.assert_called_once()
+        mock_return_connection.assert_called_once_with(mock_conn)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_claim_processed_file(self, mock_return_connection, mock_get_connection):
+        """Test claiming an audio file only succeeds while it is claimable."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.side_effect = [(5,), None]  # Claimed, then already claimed
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import claim_processed_file
+        first = claim_processed_file("/path/to/test.wav", max_attempts=3, stale_after_seconds=60,
+                                     claimed_by="host:123")
+        second = claim_processed_file("/path/to/test.wav", max_attempts=3, stale_after_seconds=60,
+                                      claimed_by="host:123")
+        
+        # Verify results
+        self.assertTrue(first)
+        self.assertFalse(second)
+        mock_cursor.execute.assert_called_with(unittest.mock.ANY, ("host:123", "/path/to/test.wav", 3, 3, 60))
+        self.assertEqual(mock_conn.commit.call_count, 2)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_fail_processed_file_counts_attempt(self, mock_return_connection, mock_get_connection):
+        """Test a failed transcription counts as an attempt while claiming does not."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (5,)
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import fail_processed_file, complete_processed_file
+        fail_processed_file("/path/to/test.wav", "Timed out")
+        fail_params = mock_cursor.execute.call_args[0][1]
+        complete_processed_file("/path/to/test.wav", "Test transcription")
+        complete_params = mock_cursor.execute.call_args[0][1]
+        
+        # Verify results
+        self.assertEqual(fail_params[0], 'failed')
+        self.assertEqual(fail_params[5], 1)
+        self.assertEqual(complete_params[5], 0)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_release_processed_file_claims(self, mock_return_connection, mock_get_connection):
+        """Test releasing the claims of ended runs reports the files released."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [(5,), (6,)]
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import release_processed_file_claims
+        result = release_processed_file_claims(["host:123"], "The run ended")
+        
+        # Verify results
+        self.assertEqual(result, 2)
+        mock_cursor.execute.assert_called_once_with(unittest.mock.ANY, ("The run ended", ["host:123"]))
+        mock_conn.commit.assert_called_once()
+        self.assertEqual(release_processed_file_claims([], "The run ended"), 0)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_complete_processed_file_is_idempotent(self, mock_return_connection, mock_get_connection):
+        """Test completing an audio file that is already transcribed succeeds without changes."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.side_effect = [None, ('transcribed',)]  # No row updated, current state
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import complete_processed_file
+        result = complete_processed_file("/path/to/test.wav", "Test transcription")
+        
+        # Verify results
+        self.assertTrue(result)
+        self.assertEqual(mock_cursor.execute.call_count, 2)  # Conditional update, state lookup
+        mock_return_connection.assert_called_once_with(mock_conn)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_mark_processed_file_saved_requires_transcription(self, mock_return_connection, mock_get_connection):
+        """Test an audio file that was never transcribed cannot be marked saved."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.side_effect = [None, ('transcribing',)]
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import mark_processed_file_saved
+        result = mark_processed_file_saved("/path/to/test.wav", 42)
+        
+        # Verify results
+        self.assertFalse(result)
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_skip_processed_file_records_metadata(self, mock_return_connection, mock_get_connection):
+        """Test skipping an audio file stores the reason in the job metadata."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (5,)
+        metadata = {"vad": {"decision": "skip", "speech_ratio": 0.0}}
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import skip_processed_file
+        result = skip_processed_file("/path/to/test.wav", metadata)
+        
+        # Verify results
+        self.assertTrue(result)
+        params = mock_cursor.execute.call_args[0][1]
+        self.assertEqual(params[0], 'skipped')
+        self.assertEqual(json.loads(params[4]), metadata)
+        mock_conn.commit.assert_called_once()
+
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_save_processed_transcription(self, mock_return_connection, mock_get_connection):
+        """Test a transcribed file is saved, cached and marked saved in one transaction."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.side_effect = [('transcribed',), (42,)]  # Locked job, inserted transcription
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import save_processed_transcription
+        result = save_processed_transcription("/path/to/test.wav", "Test transcription", filename="test.wav",
+                                              audio_sha256="abc123", model="whisper-1")
+        
+        # Verify results
+        self.assertEqual(result, 42)
+        statements = [' '.join(call[0][0].split()) for call in mock_cursor.execute.call_args_list]
+        self.assertEqual(len(statements), 4)  # Lock, transcription, cache entry, job state
+        self.assertIn('FOR UPDATE', statements[0])
+        self.assertEqual(mock_cursor.execute.call_args_list[2][0][1], ("abc123", "whisper-1", "Test transcription", 42))
+        self.assertEqual(mock_cursor.execute.call_args_list[3][0][1], (42, "/path/to/test.wav"))
+        mock_conn.commit.assert_called_once()
+        mock_return_connection.assert_called_once_with(mock_conn)
+    
+    @patch('voice_diary.db_utils.db_manager.get_connection')
+    @patch('voice_diary.db_utils.db_manager.return_connection')
+    def test_save_processed_transcription_skips_saved_file(self, mock_return_connection, mock_get_connection):
+        """Test a file another run already saved is not saved again."""
+        # Setup mocks
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = ('saved',)
+        
+        # Import and call the function
+        from voice_diary.db_utils.db_manager import save_processed_transcription
+        result = save_processed_transcription("/path/to/test.wav", "Test transcription")
+        
+        # Verify results
+        self.assertIsNone(result)
+        mock_cursor.execute.assert_called_once()  # Only the lock, no insert
+        mock_conn.commit.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
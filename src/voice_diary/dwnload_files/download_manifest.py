@@ -0,0 +1,151 @@
+"""
+Download Manifest
+
+Persistent record of the Google Drive files that have already been downloaded,
+keyed by Drive file ID and md5Checksum. It is stored in a local SQLite database
+so skip decisions are a single indexed lookup and survive between runs.
+"""
+
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Shared connection, guarded by a lock so download worker threads can use it
+connection = None
+connection_lock = threading.Lock()
+
+
+def open_manifest(db_path):
+    """Open (and create if needed) the manifest database.
+
+    Args:
+        db_path: Path of the SQLite database file
+
+    Returns:
+        bool: True if the manifest is ready to use, False otherwise
+    """
+    global connection
+
+    try:
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with connection_lock:
+            if connection is not None:
+                connection.close()
+            connection = sqlite3.connect(str(db_path), check_same_thread=False)
+            connection.execute("""
+            CREATE TABLE IF NOT EXISTS downloaded_files (
+                file_id TEXT NOT NULL,
+                md5_checksum TEXT NOT NULL DEFAULT '',
+                name TEXT,
+                size INTEGER,
+                saved_as TEXT,
+                downloaded_at TEXT,
+                PRIMARY KEY (file_id, md5_checksum)
+            )
+            """)
+            # Identical content re-uploaded under a new file ID is a duplicate too
+            connection.execute("""
+            CREATE INDEX IF NOT EXISTS idx_downloaded_files_md5 ON downloaded_files(md5_checksum)
+            """)
+            connection.commit()
+
+        logger.info(f"Using download manifest: {db_path}")
+        return True
+    except Exception as e:
+        logger.error(f"Error opening download manifest {db_path}: {str(e)}")
+        connection = None
+        return False
+
+
+def is_manifest_open():
+    """Check whether a manifest is currently open."""
+    return connection is not None
+
+
+def find_download(file_id, md5_checksum=None):
+    """Find an earlier download of a Drive file or of identical content.
+
+    Args:
+        file_id: ID of the Drive file
+        md5_checksum: md5Checksum reported by Drive, if any
+
+    Returns:
+        dict: The matching manifest entry, or None if the file is new
+    """
+    if connection is None:
+        return None
+
+    md5_checksum = md5_checksum or ''
+    try:
+        with connection_lock:
+            row = connection.execute("""
+            SELECT file_id, md5_checksum, name, size, saved_as, downloaded_at
+            FROM downloaded_files
+            WHERE file_id = ? AND md5_checksum = ?
+            """, (file_id, md5_checksum)).fetchone()
+
+            if row is None and md5_checksum:
+                row = connection.execute("""
+                SELECT file_id, md5_checksum, name, size, saved_as, downloaded_at
+                FROM downloaded_files
+                WHERE md5_checksum = ?
+                LIMIT 1
+                """, (md5_checksum,)).fetchone()
+
+        if row is None:
+            return None
+
+        keys = ('file_id', 'md5_checksum', 'name', 'size', 'saved_as', 'downloaded_at')
+        return dict(zip(keys, row))
+    except Exception as e:
+        logger.error(f"Error reading download manifest for {file_id}: {str(e)}")
+        return None
+
+
+def record_download(file_id, md5_checksum=None, name=None, size=None, saved_as=None):
+    """Record a completed download in the manifest.
+
+    Args:
+        file_id: ID of the Drive file
+        md5_checksum: md5Checksum reported by Drive, if any
+        name: Original file name in Drive
+        size: File size in bytes
+        saved_as: Local path the file was saved to
+
+    Returns:
+        bool: True if the entry was recorded, False otherwise
+    """
+    if connection is None:
+        return False
+
+    try:
+        with connection_lock:
+            connection.execute("""
+            INSERT OR REPLACE INTO downloaded_files
+            (file_id, md5_checksum, name, size, saved_as, downloaded_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (file_id, md5_checksum or '', name,
+                  int(size) if size is not None else None,
+                  saved_as, datetime.now().isoformat()))
+            connection.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error recording {file_id} in download manifest: {str(e)}")
+        return False
+
+
+def close_manifest():
+    """Close the manifest database."""
+    global connection
+
+    with connection_lock:
+        if connection is not None:
+            connection.close()
+            connection = None
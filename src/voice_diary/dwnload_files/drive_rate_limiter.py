@@ -0,0 +1,170 @@
+"""
+Drive Rate Limiter
+
+Token-bucket rate limiter shared by all Google Drive API calls. The request
+rate adapts AIMD-style (additive increase on success, multiplicative decrease
+on quota errors), and throttled calls are retried with jittered exponential
+backoff that honours the server's Retry-After header.
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+
+from googleapiclient.errors import HttpError
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Error reasons Drive uses for quota errors returned with status 403
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to quota errors (AIMD)."""
+
+    def __init__(self, rate=10.0, min_rate=1.0, max_rate=20.0, burst=None,
+                 increase_step=0.5, decrease_factor=0.5, decrease_cooldown=1.0):
+        """
+        Args:
+            rate: Initial requests per second
+            min_rate: Lowest rate the limiter backs off to
+            max_rate: Highest rate the limiter climbs to
+            burst: Bucket capacity (defaults to one second's worth of requests)
+            increase_step: Requests per second added for each second of successes
+            decrease_factor: Rate multiplier applied on a quota error
+            decrease_cooldown: Seconds during which further quota errors do not
+                decrease the rate again (a burst of errors counts once)
+        """
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.decrease_cooldown = float(decrease_cooldown)
+
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens=1):
+        """Block until 'tokens' requests may be sent."""
+        tokens = min(float(tokens), self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+    def on_success(self):
+        """Additively increase the rate after a successful request."""
+        with self._lock:
+            # One step per rate's worth of successes, i.e. roughly per second
+            self.rate = min(self.max_rate, self.rate + self.increase_step / max(self.rate, 1.0))
+
+    def on_throttle(self):
+        """Multiplicatively decrease the rate after a quota error."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Do not let saved-up tokens fire a new burst straight away
+            self._tokens = min(self._tokens, 1.0)
+            logger.warning(f"Drive quota error, reducing request rate to {self.rate:.2f}/s")
+
+
+def is_rate_limit_error(error):
+    """Check whether an error is a Drive quota error (429 or 403 rate limit)."""
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+
+    try:
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        details = json.loads(content).get('error', {})
+    except (ValueError, AttributeError):
+        return False
+    reasons = [item.get('reason') for item in details.get('errors', [])]
+    return any(reason in RATE_LIMIT_REASONS for reason in reasons)
+
+
+def is_transient_error(error):
+    """Check whether an error is a transient server error worth retrying."""
+    return isinstance(error, HttpError) and error.resp.status in (500, 502, 503, 504)
+
+
+def get_retry_after(error):
+    """Get the Retry-After delay in seconds from an HttpError, if any."""
+    try:
+        return max(0.0, float(error.resp.get('retry-after')))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def compute_backoff(attempt, base=1.0, cap=64.0, retry_after=None):
+    """Compute the delay before retry number 'attempt' (starting at 0).
+
+    Uses "full jitter" exponential backoff, but never less than the server's
+    Retry-After value.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def call_with_backoff(call, limiter, max_retries=5, base=1.0, cap=64.0, tokens=1):
+    """Run a single Drive API call through the limiter, retrying quota errors.
+
+    Args:
+        call: Zero-argument callable performing one HTTP request
+        limiter: AdaptiveRateLimiter shared by all Drive calls
+        max_retries: Retries after quota or transient server errors
+        base: Base delay in seconds for the exponential backoff
+        cap: Maximum delay in seconds
+        tokens: Number of requests the call counts as (e.g. a batch size)
+
+    Returns:
+        The return value of 'call'
+
+    Raises:
+        The last error if all retries fail, or any non-retryable error
+    """
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            result = call()
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            if not (rate_limited or is_transient_error(e)) or attempt >= max_retries:
+                raise
+            if rate_limited:
+                limiter.on_throttle()
+            delay = compute_backoff(attempt, base, cap, get_retry_after(e))
+            logger.warning(f"Drive request failed ({e.resp.status}), retrying in {delay:.1f}s "
+                           f"(retry {attempt + 1}/{max_retries})")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        limiter.on_success()
+        return result
@@ -5,23 +5,40 @@ import sys
 import logging
 from logging.handlers import RotatingFileHandler
 import json
+import hashlib
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Any, Union
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
 import time
 from google.oauth2.credentials import Credentials
 from google.auth.exceptions import RefreshError
+import google_auth_httplib2
+import httplib2
+
+from voice_diary.dwnload_files import download_manifest
+from voice_diary.dwnload_files.drive_rate_limiter import (
+    AdaptiveRateLimiter,
+    call_with_backoff,
+    compute_backoff,
+    is_rate_limit_error
+)
 
 # Initialize paths
 SCRIPT_DIR = Path(sys._MEIPASS) if getattr(sys, 'frozen', False) else Path(__file__).parent.resolve()
 CONFIG_DIR = SCRIPT_DIR / "config_dwnload_files"
 CONFIG_FILE = CONFIG_DIR / "config_dwnld_from_gdrive.json"
 CREDENTIALS_DIR = SCRIPT_DIR / "gdrive_credentials"
+STATE_DIR = SCRIPT_DIR / "state"
 
 # Ensure directories exist
 CREDENTIALS_DIR.mkdir(exist_ok=True)
@@ -59,10 +76,121 @@ except json.JSONDecodeError:
 # Set up credentials paths
 CREDENTIALS_FILE = CREDENTIALS_DIR / CONFIG['auth']['credentials_file']
 TOKEN_FILE = CREDENTIALS_DIR / CONFIG['auth']['token_file']
+SYNC_STATE_FILE = STATE_DIR / CONFIG.get('sync', {}).get('state_file', 'gdrive_sync_state.json')
+MANIFEST_FILE = STATE_DIR / CONFIG.get('manifest', {}).get('db_file', 'download_manifest.sqlite3')
+FOLDER_CACHE_FILE = STATE_DIR / CONFIG.get('folder_cache', {}).get('cache_file', 'folder_id_cache.json')
+THROUGHPUT_FILE = STATE_DIR / CONFIG.get('planning', {}).get('throughput_file', 'download_throughput.json')
+DRY_RUN_PLAN_FILE = STATE_DIR / CONFIG.get('planning', {}).get('plan_file', 'dry_run_plan.json')
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# One rate limiter shared by every Drive call made by this module
+RATE_LIMIT_CONFIG = CONFIG.get('rate_limit', {})
+rate_limiter = AdaptiveRateLimiter(
+    rate=RATE_LIMIT_CONFIG.get('requests_per_second', 10),
+    min_rate=RATE_LIMIT_CONFIG.get('min_requests_per_second', 1),
+    max_rate=RATE_LIMIT_CONFIG.get('max_requests_per_second', 20)
+)
+
+# Maximum number of calls the Drive API accepts in one batch request
+DRIVE_BATCH_LIMIT = 100
+
+# Number of parent folders combined into one subfolder listing query
+SUBFOLDER_QUERY_CHUNK = 40
+
+# Bytes requested per chunk; also how often a resumable checkpoint is written
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Credentials shared by the per-thread Drive services (set by authenticate_google_drive)
+_drive_credentials = None
+# Parsed Drive v3 discovery document, loaded once per process
+_drive_discovery_doc = None
+# Each worker thread keeps its own Drive service, since httplib2 is not thread-safe
+_thread_local = threading.local()
+
+# Folder name -> {'id', 'resolved_at'} cache, loaded by load_folder_cache
+_folder_cache = {}
+_folder_cache_lock = threading.Lock()
+
+def call_drive_api(call, tokens=1):
+    """Make one Drive API call through the shared rate limiter.
+    
+    Quota errors (429, 403 rateLimitExceeded) and transient 5xx errors are
+    retried with jittered exponential backoff that honours Retry-After.
+    
+    Args:
+        call: Zero-argument callable performing one HTTP request
+        tokens: Number of API calls it counts as (e.g. the size of a batch)
+        
+    Returns:
+        The return value of 'call'
+    """
+    return call_with_backoff(
+        call, rate_limiter,
+        max_retries=RATE_LIMIT_CONFIG.get('max_retries', 5),
+        base=RATE_LIMIT_CONFIG.get('backoff_base_seconds', 1),
+        cap=RATE_LIMIT_CONFIG.get('backoff_max_seconds', 64),
+        tokens=tokens
+    )
+
+def execute_drive_request(request, tokens=1):
+    """Execute a Drive API request (or batch request) through the shared rate limiter."""
+    return call_drive_api(request.execute, tokens=tokens)
+
+def execute_batch(service, requests, callback):
+    """Execute Drive requests as batch requests of up to DRIVE_BATCH_LIMIT calls.
+    
+    Calls rejected inside a batch with a quota error are sent again in a
+    later batch after backing off; every other outcome is passed straight to
+    the callback.
+    
+    Args:
+        service: Google Drive API service instance
+        requests: List of (request_id, make_request) where make_request() builds the request
+        callback: Called as callback(request_id, response, exception) once per request
+    """
+    make_requests = dict(requests)
+    pending = list(make_requests)
+    max_retries = RATE_LIMIT_CONFIG.get('max_retries', 5)
+    attempt = 0
+    
+    while pending:
+        throttled = []
+        for start in range(0, len(pending), DRIVE_BATCH_LIMIT):
+            chunk = pending[start:start + DRIVE_BATCH_LIMIT]
+            reported = set()
+            
+            def batch_callback(request_id, response, exception):
+                reported.add(request_id)
+                if exception is not None and is_rate_limit_error(exception) and attempt < max_retries:
+                    throttled.append(request_id)
+                    return
+                callback(request_id, response, exception)
+            
+            batch = service.new_batch_http_request(callback=batch_callback)
+            for request_id in chunk:
+                batch.add(make_requests[request_id](), request_id=request_id)
+            
+            try:
+                execute_drive_request(batch, tokens=len(chunk))
+            except Exception as e:
+                # The whole batch failed, so report it for every call without an outcome
+                for request_id in chunk:
+                    if request_id not in reported:
+                        callback(request_id, None, e)
+        
+        if not throttled:
+            break
+        
+        rate_limiter.on_throttle()
+        delay = compute_backoff(attempt, RATE_LIMIT_CONFIG.get('backoff_base_seconds', 1),
+                                RATE_LIMIT_CONFIG.get('backoff_max_seconds', 64))
+        logger.warning(f"{len(throttled)} batched call(s) hit the Drive quota, retrying in {delay:.1f}s")
+        time.sleep(delay)
+        pending = throttled
+        attempt += 1
+
 def find_folder_by_name(service, folder_name):
     """Find a folder ID by its name in Google Drive.
     
@@ -76,11 +204,11 @@ def find_folder_by_name(service, folder_name):
     try:
         # Search for folders with the given name
         query = f"mimeType='application/vnd.google-apps.folder' and name='{folder_name}' and trashed=false"
-        results = service.files().list(
+        results = execute_drive_request(service.files().list(
             q=query,
             spaces='drive',
             fields='files(id, name)'
-        ).execute()
+        ))
         
         items = results.get('files', [])
         
@@ -97,6 +225,50 @@ def find_folder_by_name(service, folder_name):
         logger.error(f"Error finding folder '{folder_name}': {str(e)}")
         return None
 
+def find_folders_by_name(service, folder_names):
+    """Find the IDs of several folders using Drive batch requests.
+    
+    Up to DRIVE_BATCH_LIMIT lookups share one HTTP round-trip.
+    
+    Args:
+        service: Google Drive API service instance
+        folder_names: Names of the folders to find
+        
+    Returns:
+        dict: Folder name -> folder ID (None if not found or the lookup failed)
+    """
+    folder_ids = {}
+    names = list(dict.fromkeys(folder_names))
+    
+    def callback(request_id, response, exception):
+        folder_name = names[int(request_id)]
+        if exception is not None:
+            logger.error(f"Error finding folder '{folder_name}': {str(exception)}")
+            folder_ids[folder_name] = None
+            return
+        
+        items = response.get('files', [])
+        if not items:
+            logger.warning(f"No folder named '{folder_name}' found.")
+            folder_ids[folder_name] = None
+            return
+        
+        # Use the ID of the first matched folder
+        folder_ids[folder_name] = items[0]['id']
+        logger.info(f"Found folder '{folder_name}' with ID: {items[0]['id']}")
+    
+    def make_request(folder_name):
+        query = f"mimeType='application/vnd.google-apps.folder' and name='{folder_name}' and trashed=false"
+        return lambda: service.files().list(q=query, spaces='drive', fields='files(id, name)')
+    
+    execute_batch(service, [(str(index), make_request(folder_name)) for index, folder_name in enumerate(names)],
+                  callback)
+    
+    for folder_name in names:
+        folder_ids.setdefault(folder_name, None)
+    
+    return folder_ids
+
 # Configure logging based on config
 def configure_logging():
     """Configure logging with rotation based on config settings"""
@@ -170,6 +342,62 @@ def check_credentials_file() -> bool:
         return False
     return True
 
+def get_drive_discovery_document():
+    """Get the Drive v3 discovery document, parsed once per process.
+    
+    The document is read from the static copy bundled with
+    google-api-python-client, so building a service never needs a network
+    round-trip to the discovery endpoint.
+    
+    Returns:
+        dict: The discovery document, or None if no bundled copy is available
+    """
+    global _drive_discovery_doc
+    if _drive_discovery_doc is None:
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            doc = get_static_doc('drive', 'v3')
+            if doc:
+                _drive_discovery_doc = json.loads(doc)
+        except (ImportError, ValueError) as e:
+            logger.debug(f"No bundled Drive discovery document available: {str(e)}")
+    return _drive_discovery_doc
+
+def build_drive_service(creds):
+    """Build a Drive service on its own persistent authorized HTTP transport.
+    
+    The httplib2.Http instance keeps its connection to Google alive, so all
+    calls made through the returned service reuse it for the whole run.
+    
+    Args:
+        creds: Google OAuth credentials
+        
+    Returns:
+        A Google Drive API service instance
+    """
+    timeout = CONFIG.get('api', {}).get('timeout_seconds', 60)
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+    
+    discovery_doc = get_drive_discovery_document()
+    if discovery_doc is not None:
+        return build_from_document(discovery_doc, http=http)
+    return build('drive', 'v3', http=http)
+
+def credentials_expire_soon(creds):
+    """Check whether credentials expire within the configured refresh margin.
+    
+    Args:
+        creds: Google OAuth credentials
+        
+    Returns:
+        bool: True if the access token should be refreshed now
+    """
+    if not getattr(creds, 'expiry', None):
+        return False
+    margin = CONFIG.get('auth', {}).get('refresh_margin_seconds', 300)
+    # google-auth stores expiry as a naive UTC datetime
+    return (creds.expiry - datetime.utcnow()).total_seconds() < margin
+
 def authenticate_google_drive():
     """Authenticate with Google Drive API using OAuth."""
     try:
@@ -180,9 +408,10 @@ def authenticate_google_drive():
             with open(TOKEN_FILE, 'rb') as token:
                 creds = pickle.load(token)
                 
-        # If no valid credentials are available, let the user log in
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
+        # If no valid credentials are available, let the user log in. Tokens
+        # about to expire are refreshed up front rather than mid-run.
+        if not creds or not creds.valid or (creds.refresh_token and credentials_expire_soon(creds)):
+            if creds and creds.refresh_token and (creds.expired or credentials_expire_soon(creds)):
                 creds.refresh(Request())
             else:
                 if not check_credentials_file():
@@ -196,15 +425,80 @@ def authenticate_google_drive():
             with open(TOKEN_FILE, 'wb') as token:
                 pickle.dump(creds, token)
         
+        # Keep the credentials so worker threads can build their own services
+        global _drive_credentials
+        _drive_credentials = creds
+        
         # Build the service with the credentials
-        service = build('drive', 'v3', credentials=creds)
+        service = build_drive_service(creds)
         return service
     except Exception as e:
         logger.error(f"Authentication error: {str(e)}")
         raise
 
-def list_files_in_folder(service, folder_id, file_extensions=None, sort_by='createdTime'):
-    """List all files in a Google Drive folder with filtering by file extension.
+def get_thread_service(service):
+    """Get a Drive service that is safe to use from the current thread.
+    
+    The service objects returned by build() share a single httplib2.Http
+    instance, which must not be used from several threads at once. Worker
+    threads therefore build their own service from the shared credentials.
+    
+    Args:
+        service: The Drive service created by authenticate_google_drive
+        
+    Returns:
+        A Drive service owned by the calling thread, or the given service when
+        no credentials are available (e.g. a service supplied by the caller)
+    """
+    if _drive_credentials is None or threading.current_thread() is threading.main_thread():
+        return service
+    
+    thread_service = getattr(_thread_local, 'service', None)
+    if thread_service is None:
+        thread_service = build_drive_service(_drive_credentials)
+        _thread_local.service = thread_service
+    return thread_service
+
+def get_max_workers():
+    """Get the number of concurrent download workers from config (minimum 1)."""
+    try:
+        return max(1, int(CONFIG.get('download', {}).get('max_workers', 1)))
+    except (TypeError, ValueError):
+        return 1
+
+def iter_drive_files(service, page_size=None, **list_kwargs):
+    """Iterate over the results of a files().list query, following every page.
+    
+    Items are yielded as soon as their page arrives, so callers can start
+    working on the first page while later pages are still being fetched, and
+    only one page is held in memory at a time.
+    
+    Args:
+        service: Google Drive API service instance
+        page_size: Optional number of items to request per page
+        **list_kwargs: Arguments for files().list; 'fields' must include nextPageToken
+        
+    Yields:
+        dict: File resources in the order returned by the API
+    """
+    if page_size:
+        list_kwargs['pageSize'] = page_size
+    
+    page_token = None
+    while True:
+        if page_token:
+            list_kwargs['pageToken'] = page_token
+        results = execute_drive_request(service.files().list(**list_kwargs))
+        
+        for item in results.get('files', []):
+            yield item
+        
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+def iter_files_in_folder(service, folder_id, file_extensions=None, sort_by='createdTime'):
+    """Iterate over the files in a Google Drive folder, filtered by file extension.
     
     Args:
         service: Google Drive API service instance
@@ -212,45 +506,54 @@ def list_files_in_folder(service, folder_id, file_extensions=None, sort_by='crea
         file_extensions: Optional dict with 'include' list of file extensions
         sort_by: Field to sort results by (default: 'createdTime')
         
-    Returns:
-        list: List of file objects sorted by the specified field
+    Yields:
+        dict: File objects sorted by the specified field
     """
     if file_extensions is None:
         file_extensions = {"include": []}
     
+    # Filter files by extension if extension lists are provided
+    include_extensions = file_extensions.get("include", [])
+    
     query = f"'{folder_id}' in parents and trashed = false"
     
-    try:
-        results = service.files().list(
-            q=query,
-            spaces='drive',
-            fields=f'files(id, name, mimeType, {sort_by})',
-            orderBy=f"{sort_by}"
-        ).execute()
-        
-        files = results.get('files', [])
+    for file in iter_drive_files(
+        service,
+        q=query,
+        spaces='drive',
+        fields=f'nextPageToken, files(id, name, mimeType, {sort_by})',
+        orderBy=f"{sort_by}"
+    ):
+        # Skip folders
+        if file.get('mimeType') == 'application/vnd.google-apps.folder':
+            continue
+            
+        filename = file['name']
+        file_ext = os.path.splitext(filename)[1].lower()
         
-        if not files:
-            logger.info(f"No files found in folder {folder_id}.")
-            return []
+        # Only include files with specified extensions
+        if include_extensions and file_ext not in include_extensions:
+            continue
+            
+        yield file
+
+def list_files_in_folder(service, folder_id, file_extensions=None, sort_by='createdTime'):
+    """List all files in a Google Drive folder with filtering by file extension.
+    
+    Args:
+        service: Google Drive API service instance
+        folder_id: ID of the folder to list files from
+        file_extensions: Optional dict with 'include' list of file extensions
+        sort_by: Field to sort results by (default: 'createdTime')
         
-        # Filter files by extension if extension lists are provided
-        include_extensions = file_extensions.get("include", [])
+    Returns:
+        list: List of file objects sorted by the specified field
+    """
+    try:
+        filtered_files = list(iter_files_in_folder(service, folder_id, file_extensions, sort_by))
         
-        filtered_files = []
-        for file in files:
-            # Skip folders
-            if file.get('mimeType') == 'application/vnd.google-apps.folder':
-                continue
-                
-            filename = file['name']
-            file_ext = os.path.splitext(filename)[1].lower()
-            
-            # Only include files with specified extensions
-            if include_extensions and file_ext not in include_extensions:
-                continue
-                
-            filtered_files.append(file)
+        if not filtered_files:
+            logger.info(f"No files found in folder {folder_id}.")
         
         return filtered_files
         
@@ -258,14 +561,178 @@ def list_files_in_folder(service, folder_id, file_extensions=None, sort_by='crea
         logger.error(f"Error listing files in folder {folder_id}: {str(e)}")
         return []
 
-def download_file(service, file_id, file_name=None, download_dir=None):
+def get_partial_download_paths(output_path, file_id):
+    """Get the partial file and checkpoint paths used while downloading a file.
+    
+    Both are keyed by the Drive file ID rather than the (possibly timestamped)
+    output name, so an interrupted download can be resumed by a later run.
+    
+    Args:
+        output_path: Final path of the downloaded file
+        file_id: ID of the Drive file
+        
+    Returns:
+        tuple: (Path of the .part file, Path of its JSON checkpoint)
+    """
+    output_dir = Path(output_path).parent
+    return output_dir / f"{file_id}.part", output_dir / f"{file_id}.part.json"
+
+def read_download_checkpoint(checkpoint_path, part_path, file_id):
+    """Read how many bytes of a partial download can be trusted.
+    
+    Args:
+        checkpoint_path: Path of the JSON checkpoint
+        part_path: Path of the .part file
+        file_id: ID of the Drive file the checkpoint must belong to
+        
+    Returns:
+        tuple: (bytes to resume from, total size or None if unknown)
+    """
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('file_id') != file_id:
+            return 0, None
+        # Never trust more bytes than actually reached the disk
+        offset = min(int(checkpoint.get('bytes_received', 0)), part_path.stat().st_size)
+        return offset, checkpoint.get('total_size')
+    except (OSError, ValueError, TypeError):
+        return 0, None
+
+def write_download_checkpoint(checkpoint_path, file_id, bytes_received, total_size):
+    """Record the number of bytes of a partial download safely on disk.
+    
+    Args:
+        checkpoint_path: Path of the JSON checkpoint
+        file_id: ID of the Drive file
+        bytes_received: Bytes written and flushed to the .part file
+        total_size: Total size reported by Drive, or None if unknown
+    """
+    tmp_path = checkpoint_path.with_name(checkpoint_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'file_id': file_id,
+            'bytes_received': bytes_received,
+            'total_size': total_size
+        }, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def remove_file_if_exists(path):
+    """Remove a file, ignoring it if it does not exist."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def is_retryable_download_error(error):
+    """Check whether a failed download is worth resuming straight away.
+    
+    Network errors and server-side (5xx, 408, 429) responses are retried;
+    other HTTP errors such as 404 or 403 permission errors are not.
+    """
+    if isinstance(error, HttpError):
+        return error.resp.status >= 500 or error.resp.status in (408, 429)
+    return True
+
+class HashingWriter:
+    """File wrapper that feeds every chunk written to it into a hash."""
+    
+    def __init__(self, fd, hasher):
+        self._fd = fd
+        self._hasher = hasher
+    
+    def write(self, data):
+        self._hasher.update(data)
+        return self._fd.write(data)
+
+class ResumableMediaDownload(MediaIoBaseDownload):
+    """MediaIoBaseDownload that starts at a byte offset instead of the beginning.
+    
+    MediaIoBaseDownload requests "Range: bytes=<progress>-..." from its
+    progress counter, which has no public setter. This is the only place that
+    relies on it, and a test pins the behaviour so a googleapiclient upgrade
+    that changes it fails loudly instead of silently restarting downloads.
+    """
+    
+    def __init__(self, fd, request, chunksize=DEFAULT_DOWNLOAD_CHUNK_SIZE, offset=0):
+        super().__init__(fd, request, chunksize=chunksize)
+        if offset:
+            if not hasattr(self, '_progress'):
+                raise RuntimeError("This googleapiclient version does not support resuming downloads")
+            self._progress = offset
+
+def download_to_part_file(service, file_id, part_path, checkpoint_path, offset, total_size, chunk_size):
+    """Download a Drive file into its .part file, starting at 'offset'.
+    
+    The checkpoint is updated after every chunk, once the chunk is on disk.
+    The MD5 of the file is computed from the chunks as they are written, so
+    verifying the download does not need a second pass over the file. Only
+    the chunk transfers are timed, for the recorded download throughput.
+    
+    Args:
+        service: Google Drive service instance
+        file_id: ID of the file to download
+        part_path: Path of the .part file
+        checkpoint_path: Path of the JSON checkpoint
+        offset: Number of bytes already in the .part file
+        total_size: Total size from the checkpoint, or None if unknown
+        chunk_size: Bytes to request per HTTP call
+        
+    Returns:
+        tuple: (hex MD5 digest of the complete .part file, seconds spent transferring chunks)
+    """
+    hasher = hashlib.md5()
+    
+    with open(part_path, 'r+b' if offset else 'wb') as f:
+        # Bytes kept from an earlier attempt are hashed once, then only new chunks
+        remaining = offset
+        while remaining:
+            data = f.read(min(remaining, chunk_size))
+            if not data:
+                break
+            hasher.update(data)
+            remaining -= len(data)
+        
+        if total_size is not None and offset >= total_size:
+            # Everything was received before the previous attempt stopped
+            return hasher.hexdigest(), 0.0
+        
+        # Drop any bytes written after the last checkpoint
+        f.seek(offset)
+        f.truncate()
+        
+        # Get the file as media content
+        request = service.files().get_media(fileId=file_id)
+        # Starting from the checkpoint resumes the download instead of restarting it
+        downloader = ResumableMediaDownload(HashingWriter(f, hasher), request, chunksize=chunk_size,
+                                            offset=offset)
+        
+        done = False
+        transfer_start = time.monotonic()
+        while not done:
+            status, done = call_drive_api(downloader.next_chunk)
+            f.flush()
+            os.fsync(f.fileno())
+            write_download_checkpoint(checkpoint_path, file_id,
+                                      status.resumable_progress, status.total_size)
+            logger.info(f"Download {int(status.progress() * 100)}% complete.")
+        transfer_seconds = time.monotonic() - transfer_start
+    
+    return hasher.hexdigest(), transfer_seconds
+
+def download_file(service, file_id, file_name=None, download_dir=None, md5_checksum=None):
     """Download a file from Google Drive by ID.
     
+    When an md5Checksum is known the download is verified against it before
+    the file is given its final name; a corrupt download is discarded and
+    reported as failed, so the Drive original is never deleted because of it.
+    
     Args:
         service: Google Drive service instance
         file_id: ID of the file to download OR a file object with 'id' and 'name' keys
         file_name: Name of the file to save (optional if file_id is a dict) or full path to save the file to
         download_dir: Optional directory path where to save downloaded file
+        md5_checksum: Optional md5Checksum from the Drive listing (taken from file_id if it is a dict)
     
     Returns:
         dict: A dictionary with the download result information
@@ -276,6 +743,7 @@ def download_file(service, file_id, file_name=None, download_dir=None):
             file_info = file_id
             file_name = file_info.get('name')
             file_id = file_info.get('id')
+            md5_checksum = md5_checksum or file_info.get('md5Checksum')
         
         # Determine the output path
         if os.path.isabs(file_name) or '/' in file_name or '\\' in file_name:
@@ -307,18 +775,37 @@ def download_file(service, file_id, file_name=None, download_dir=None):
             
         logger.info(f"Downloading {display_name} as {output_path}")
         
-        # Create a file handler
-        with open(output_path, 'wb') as f:
-            # Get the file as media content
-            request = service.files().get_media(fileId=file_id)
-            
-            # Download the file
-            downloader = MediaIoBaseDownload(f, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                logger.info(f"Download {int(status.progress() * 100)}% complete.")
+        # Download into a partial file next to the target, resuming any earlier attempt
+        part_path, checkpoint_path = get_partial_download_paths(output_path, file_id)
+        download_config = CONFIG.get('download', {})
+        chunk_size = int(download_config.get('chunk_size_bytes', DEFAULT_DOWNLOAD_CHUNK_SIZE))
+        max_attempts = max(1, int(download_config.get('resume_attempts', 3)))
+        
+        for attempt in range(1, max_attempts + 1):
+            offset, total_size = read_download_checkpoint(checkpoint_path, part_path, file_id)
+            if offset:
+                logger.info(f"Resuming download of {display_name} from byte {offset}")
+            try:
+                md5_digest, transfer_seconds = download_to_part_file(service, file_id, part_path, checkpoint_path,
+                                                                     offset, total_size, chunk_size)
+                break
+            except Exception as e:
+                if attempt == max_attempts or not is_retryable_download_error(e):
+                    raise
+                delay = min(30, 2 ** attempt)
+                logger.warning(f"Download of {display_name} interrupted ({str(e)}), "
+                               f"retrying in {delay}s (attempt {attempt + 1}/{max_attempts})")
+                time.sleep(delay)
+        
+        # Verify the content before committing it under its final name
+        if md5_checksum and md5_digest != md5_checksum.lower():
+            remove_file_if_exists(part_path)
+            remove_file_if_exists(checkpoint_path)
+            raise ValueError(f"MD5 mismatch for {display_name}: expected {md5_checksum}, got {md5_digest}")
+        
+        # Only a complete file ever appears under its final name
+        os.replace(part_path, output_path)
+        remove_file_if_exists(checkpoint_path)
         
         logger.info(f"Download complete! Saved as: {output_path}")
         
@@ -326,7 +813,9 @@ def download_file(service, file_id, file_name=None, download_dir=None):
             "success": True,
             "original_filename": display_name,
             "saved_as": str(output_path),
-            "file_id": file_id
+            "file_id": file_id,
+            "md5_checksum": md5_digest,
+            "transfer_seconds": transfer_seconds
         }
             
     except Exception as e:
@@ -339,6 +828,137 @@ def download_file(service, file_id, file_name=None, download_dir=None):
             "error": str(e)
         }
 
+def download_to_memory(service, file_id, output_path, md5_checksum=None, max_bytes=None):
+    """Download a small Drive file into a spooled buffer instead of the downloads directory.
+    
+    The file is kept in memory (spilling to a temporary file only if it turns
+    out larger than 'max_bytes'), so it can be handed straight to a consumer
+    without a write-then-read cycle on the downloads directory. Nothing is
+    written to 'output_path' until persist_download is called.
+    
+    Args:
+        service: Google Drive service instance
+        file_id: ID of the file to download
+        output_path: Full path the file will be persisted to
+        md5_checksum: Optional md5Checksum from the Drive listing
+        max_bytes: Size up to which the buffer stays in memory
+        
+    Returns:
+        dict: The download result, with the buffer under 'buffer' and 'in_memory' set
+    """
+    output_path = Path(output_path)
+    download_config = CONFIG.get('download', {})
+    chunk_size = int(download_config.get('chunk_size_bytes', DEFAULT_DOWNLOAD_CHUNK_SIZE))
+    max_attempts = max(1, int(download_config.get('resume_attempts', 3)))
+    max_bytes = int(max_bytes or download_config.get('in_memory_max_bytes', 0))
+    
+    try:
+        logger.info(f"Downloading {output_path.name} into memory")
+        
+        for attempt in range(1, max_attempts + 1):
+            buffer = tempfile.SpooledTemporaryFile(max_size=max_bytes)
+            hasher = hashlib.md5()
+            try:
+                request = service.files().get_media(fileId=file_id)
+                downloader = MediaIoBaseDownload(HashingWriter(buffer, hasher), request, chunksize=chunk_size)
+                done = False
+                transfer_start = time.monotonic()
+                while not done:
+                    _, done = call_drive_api(downloader.next_chunk)
+                transfer_seconds = time.monotonic() - transfer_start
+                break
+            except Exception as e:
+                buffer.close()
+                if attempt == max_attempts or not is_retryable_download_error(e):
+                    raise
+                # Small files are simply fetched again from the start
+                delay = min(30, 2 ** attempt)
+                logger.warning(f"Download of {output_path.name} interrupted ({str(e)}), "
+                               f"retrying in {delay}s (attempt {attempt + 1}/{max_attempts})")
+                time.sleep(delay)
+        
+        md5_digest = hasher.hexdigest()
+        if md5_checksum and md5_digest != md5_checksum.lower():
+            buffer.close()
+            raise ValueError(f"MD5 mismatch for {output_path.name}: expected {md5_checksum}, got {md5_digest}")
+        
+        buffer.seek(0)
+        logger.info(f"Download complete! Held in memory until saved as: {output_path}")
+        
+        return {
+            "success": True,
+            "original_filename": output_path.name,
+            "saved_as": str(output_path),
+            "file_id": file_id,
+            "md5_checksum": md5_digest,
+            "transfer_seconds": transfer_seconds,
+            "buffer": buffer,
+            "in_memory": True
+        }
+    
+    except Exception as e:
+        logger.error(f"Error downloading file {output_path.name}: {str(e)}")
+        
+        return {
+            "success": False,
+            "original_filename": output_path.name,
+            "file_id": file_id,
+            "error": str(e)
+        }
+
+def persist_download(download_result):
+    """Write an in-memory download to its destination and finish it off.
+    
+    The file is written under a temporary name and then renamed, so only a
+    complete file appears in the downloads directory. After that the download
+    is recorded in the manifest and, if it was requested, the Drive original
+    is deleted. The buffer is closed in any case.
+    
+    Args:
+        download_result: Result returned for an in-memory download
+        
+    Returns:
+        bool: True if the file was saved, False otherwise
+    """
+    buffer = download_result.get('buffer')
+    if buffer is None:
+        return not download_result.get('in_memory', False)
+    
+    output_path = Path(download_result['saved_as'])
+    file_id = download_result['file_id']
+    item_name = download_result.get('item_name', output_path.name)
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path, _ = get_partial_download_paths(output_path, file_id)
+        
+        buffer.seek(0)
+        with open(part_path, 'wb') as f:
+            shutil.copyfileobj(buffer, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(part_path, output_path)
+        logger.info(f"Saved in-memory download as: {output_path}")
+    except Exception as e:
+        logger.error(f"Error saving in-memory download {item_name}: {str(e)}")
+        return False
+    finally:
+        buffer.close()
+        download_result['buffer'] = None
+    
+    download_result['in_memory'] = False
+    download_manifest.record_download(file_id, download_result.get('md5_checksum'), item_name,
+                                      download_result.get('size'), str(output_path))
+    
+    if download_result.get('delete_after_download'):
+        # The original is only deleted once the file is safely on disk
+        service = get_thread_service(download_result.get('service'))
+        download_result['deleted'] = delete_file(service, file_id, item_name)
+        if download_result['deleted'] and download_result.get('on_deleted'):
+            # Counted in the stats of the folder the file came from
+            download_result['on_deleted']()
+    
+    return True
+
 def delete_file(service, file_id, file_name=None):
     """Delete a file from Google Drive.
     
@@ -358,7 +978,7 @@ def delete_file(service, file_id, file_name=None):
         
         # Execute the deletion
         logger.info(f"Deleting file: {file_name}")
-        service.files().delete(fileId=file_id).execute()
+        execute_drive_request(service.files().delete(fileId=file_id))
         logger.info(f"File '{file_name}' deleted successfully.")
         return True
     except Exception as e:
@@ -366,9 +986,282 @@ def delete_file(service, file_id, file_name=None):
         return False
 
 
-def process_folder(service, folder_id, folder_name, parent_path="", dry_run=False):
-    """Process files in a Google Drive folder (non-recursively)."""
+def delete_files_batch(service, files):
+    """Delete several files from Google Drive using batch requests.
+    
+    Up to DRIVE_BATCH_LIMIT deletes share one HTTP round-trip; the outcome of
+    each delete is reported individually.
+    
+    Args:
+        service: Google Drive API service instance
+        files: List of (file_id, file_name) tuples
+        
+    Returns:
+        dict: File ID -> True if the file was deleted, False otherwise
+    """
+    results = {}
+    names = dict(files)
+    
+    def callback(request_id, response, exception):
+        file_name = names.get(request_id, request_id)
+        if exception is not None:
+            logger.error(f"Error deleting file '{file_name}': {str(exception)}")
+            results[request_id] = False
+        else:
+            logger.info(f"File '{file_name}' deleted successfully.")
+            results[request_id] = True
+    
+    def make_request(file_id):
+        return lambda: service.files().delete(fileId=file_id)
+    
+    logger.info(f"Deleting {len(names)} file(s) in batch requests")
+    execute_batch(service, [(file_id, make_request(file_id)) for file_id in names], callback)
+    
+    for file_id in names:
+        results.setdefault(file_id, False)
+    
+    return results
+
+def download_and_delete_file(service, item_id, item_name, file_type, output_path, delete_after_download,
+                             md5_checksum=None, size=None, in_memory=False):
+    """Download a single Drive file and optionally delete the original.
+    
+    Runs either inline or on a download worker thread. It never touches the
+    shared stats; the caller aggregates the returned outcome instead.
+    
+    With 'in_memory' the file is downloaded into a buffer (see
+    download_to_memory). Recording it in the manifest and deleting the
+    original are then left to persist_download, so the original is never
+    deleted before the file is on disk.
+    
+    Args:
+        service: Google Drive API service instance
+        item_id: ID of the file to download
+        item_name: Name of the file (for logging purposes)
+        file_type: Detected file type ("audio", "image" or "video")
+        output_path: Full path to save the file to
+        delete_after_download: Whether to delete the file from Drive after download
+        md5_checksum: md5Checksum reported by Drive, used to verify the download
+        size: File size reported by Drive, recorded in the download manifest
+        in_memory: Whether to download into memory instead of the downloads directory
+        
+    Returns:
+        dict: The download_file result with added 'item_name', 'file_type' and 'deleted' keys
+    """
+    service = get_thread_service(service)
+    try:
+        if in_memory:
+            download_result = download_to_memory(service, item_id, output_path, md5_checksum)
+        else:
+            download_result = download_file(service, item_id, str(output_path), md5_checksum=md5_checksum)
+    except Exception as e:
+        logger.error(f"Error processing file {item_name}: {str(e)}")
+        download_result = {
+            "success": False,
+            "original_filename": item_name,
+            "file_id": item_id,
+            "error": str(e)
+        }
+    
+    download_result.setdefault('file_id', item_id)
+    download_result['item_name'] = item_name
+    download_result['file_type'] = file_type
+    download_result['deleted'] = False
+    download_result['size'] = size
+    if download_result.get('success') and download_result.get('in_memory'):
+        logger.info(f"Successfully downloaded {file_type} file into memory: {item_name}")
+        
+        # Finished off by persist_download once the consumer is done with it
+        download_result['delete_after_download'] = delete_after_download
+        download_result['service'] = service
+    elif download_result.get('success'):
+        logger.info(f"Successfully downloaded {file_type} file: {item_name}")
+        
+        # Remember the download before the Drive original can be deleted
+        download_manifest.record_download(item_id, md5_checksum, item_name, size,
+                                          download_result.get('saved_as', str(output_path)))
+        
+        # Delete file from Google Drive if configured
+        if delete_after_download:
+            download_result['deleted'] = delete_file(service, item_id, item_name)
+    
+    return download_result
+
+def list_subfolders(service, parent_ids):
+    """List the direct subfolders of several Google Drive folders in one query.
+    
+    Args:
+        service: Google Drive API service instance
+        parent_ids: IDs of the parent folders
+        
+    Returns:
+        list: Folder objects with id, name and parents
+    """
+    service = get_thread_service(service)
+    parents_query = " or ".join(f"'{parent_id}' in parents" for parent_id in parent_ids)
+    query = f"({parents_query}) and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+    return list(iter_drive_files(
+        service,
+        q=query,
+        spaces='drive',
+        fields="nextPageToken, files(id, name, parents)",
+        page_size=1000
+    ))
+
+def walk_folder_trees(service, root_folders, max_depth=None):
+    """Find all subfolders below the given folders, breadth first.
+    
+    Each level of every tree is listed at once: the folders found on one level
+    are grouped into a few combined queries that run concurrently, so a tree
+    takes about one round of listing calls per level rather than one call per
+    folder.
+    
+    Args:
+        service: Google Drive API service instance
+        root_folders: List of (folder_id, folder_name) tuples to start from
+        max_depth: Optional number of levels to descend (None for no limit)
+        
+    Returns:
+        list: (folder_id, folder_path, relative_path) tuples for the root folders
+              and every subfolder, level by level. folder_path includes the
+              root folder name (e.g. 'a-daily-log/2024/05'); relative_path is
+              the path below the root folder ('' for the root itself).
+    """
+    folders = [(folder_id, folder_name, "") for folder_id, folder_name in root_folders]
+    # Root folder name and relative path of every folder found so far
+    known = {folder_id: (folder_name, "") for folder_id, folder_name in root_folders}
+    frontier = [folder_id for folder_id, _ in root_folders]
+    depth = 0
+    
+    with ThreadPoolExecutor(max_workers=get_max_workers(), thread_name_prefix="gdrive-walk") as walk_executor:
+        while frontier and (max_depth is None or depth < max_depth):
+            chunks = [frontier[i:i + SUBFOLDER_QUERY_CHUNK]
+                      for i in range(0, len(frontier), SUBFOLDER_QUERY_CHUNK)]
+            futures = {walk_executor.submit(list_subfolders, service, chunk): chunk for chunk in chunks}
+            
+            next_frontier = []
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    subfolders = future.result()
+                except Exception as e:
+                    logger.error(f"Error listing subfolders of {len(chunk)} folder(s): {str(e)}")
+                    continue
+                
+                for subfolder in subfolders:
+                    if subfolder['id'] in known:
+                        # Already reached through another parent
+                        continue
+                    parent_id = next((p for p in subfolder.get('parents', []) if p in known), None)
+                    if parent_id is None and 'root' in chunk:
+                        # Drive reports the real ID of the 'root' alias as the parent
+                        parent_id = 'root'
+                    if parent_id is None:
+                        continue
+                    
+                    root_name, parent_path = known[parent_id]
+                    relative_path = f"{parent_path}/{subfolder['name']}" if parent_path else subfolder['name']
+                    known[subfolder['id']] = (root_name, relative_path)
+                    folders.append((subfolder['id'], f"{root_name}/{relative_path}", relative_path))
+                    next_frontier.append(subfolder['id'])
+            
+            frontier = next_frontier
+            depth += 1
+    
+    logger.info(f"Found {len(folders) - len(root_folders)} subfolder(s) in {depth} level(s)")
+    return folders
+
+def process_folder(service, folder_id, folder_name, parent_path="", dry_run=False, executor=None, items=None,
+                   on_download=None, in_memory=False):
+    """Process files in a Google Drive folder (non-recursively).
+    
+    Files are saved in the downloads directory, or in 'parent_path' below it
+    when given (the folder's path below its target folder in recursive mode).
+    The folder listing is streamed page by page, so downloads start as soon as
+    the first page arrives. When 'items' is given (e.g. the files found by a
+    delta sync) those are processed instead and the folder is not listed. Downloads run on the given executor when one is
+    provided (or on a pool of 'download.max_workers' threads when that is
+    greater than 1), otherwise one after another on the calling thread. At most
+    a small multiple of the worker count is in flight at any time, which keeps
+    memory flat for very large folders.
+    
+    If 'on_download' is given it is called with each successful download
+    result as soon as that download completes (e.g. to hand the file to a
+    transcription pipeline). It may block to apply backpressure, which stops
+    new downloads from being queued until it returns.
+    
+    With 'in_memory', audio files up to 'download.in_memory_max_bytes' are
+    downloaded into memory instead (see download_to_memory). 'on_download'
+    must then call persist_download for every result marked 'in_memory'.
+    Originals it deletes are added to the returned stats as they happen, so
+    deletes still running when the folder summary is logged are only counted
+    in the stats.
+    """
+    # Count metrics
+    stats = {
+        'folder_path': folder_name,
+        'total_files': 0,
+        'processed_files': 0,
+        'downloaded_files': 0,
+        'skipped_files': 0,
+        'error_files': 0,
+        'deleted_files': 0,
+        'audio_files': 0,
+        'image_files': 0,
+        'video_files': 0,
+        'downloaded_bytes': 0,
+        'transfer_seconds': 0.0
+    }
+    if dry_run:
+        # What a real run would do, collected for the dry run plan
+        stats['planned_files'] = []
+    
+    # Downloaded files waiting to be deleted in one batch request
+    pending_deletes = []
+    
+    # persist_download reports its deletes from the consumer's threads
+    deleted_files_lock = threading.Lock()
+    
+    def count_deletes(count=1):
+        with deleted_files_lock:
+            stats['deleted_files'] += count
+    
+    def flush_deletes():
+        if pending_deletes:
+            files = pending_deletes[:]
+            pending_deletes.clear()
+            results = delete_files_batch(service, files)
+            count_deletes(sum(1 for deleted in results.values() if deleted))
+    
+    def record_result(download_result):
+        # Only ever called from this thread; apart from the delete count the stats stay on it
+        if download_result.get('success'):
+            stats['downloaded_files'] += 1
+            stats['downloaded_bytes'] += int(download_result.get('size') or 0)
+            stats['transfer_seconds'] += download_result.get('transfer_seconds') or 0.0
+            # Read before on_download, which may hand the result to a thread that persists it
+            deleted = download_result.get('deleted')
+            in_memory_result = download_result.get('in_memory')
+            if in_memory_result:
+                download_result['on_deleted'] = count_deletes
+            if on_download is not None:
+                on_download(download_result)
+            if deleted:
+                count_deletes()
+            elif batch_deletes and not in_memory_result:
+                pending_deletes.append((download_result['file_id'], download_result['item_name']))
+                if len(pending_deletes) >= delete_batch_size:
+                    flush_deletes()
+        else:
+            stats['error_files'] += 1
+    
+    own_executor = None
+    pending = set()
+    batch_deletes = False
     try:
+        # Listing may run on a folder worker thread
+        service = get_thread_service(service)
+        
         # Get sort settings from config
         sort_by = CONFIG.get('sorting', {}).get('sort_by', 'createdTime')
         sort_order = CONFIG.get('sorting', {}).get('sort_order', 'asc')
@@ -377,47 +1270,23 @@ def process_folder(service, folder_id, folder_name, parent_path="", dry_run=Fals
         order_direction = 'asc' if sort_order.lower() == 'asc' else 'desc'
         sort_param = f"{sort_by} {order_direction}"
         
-        # Only look for files (not folders) in the specified folder
-        query = f"'{folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder' and trashed = false"
-        results = service.files().list(
-            q=query,
-            fields=f"files(id, name, mimeType, size, {sort_by}, fileExtension)",
-            orderBy=sort_param,
-            pageSize=1000
-        ).execute()
-        items = results.get('files', [])
-        
-        if not items:
-            logger.info(f"No files found in folder: {folder_name}")
-            return {
-                'total_files': 0,
-                'processed_files': 0,
-                'downloaded_files': 0,
-                'skipped_files': 0,
-                'error_files': 0,
-                'deleted_files': 0,
-                'audio_files': 0,
-                'image_files': 0,
-                'video_files': 0
-            }
+        if items is None:
+            # Only look for files (not folders) in the specified folder
+            query = f"'{folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder' and trashed = false"
+            items = iter_drive_files(
+                service,
+                q=query,
+                fields=f"nextPageToken, files(id, name, mimeType, size, md5Checksum, {sort_by}, fileExtension)",
+                orderBy=sort_param,
+                page_size=1000
+            )
             
-        logger.info(f"Found {len(items)} files in folder: {folder_name}, sorted by {sort_by} {order_direction}")
-        
-        # Count metrics
-        stats = {
-            'total_files': len(items),
-            'processed_files': 0,
-            'downloaded_files': 0,
-            'skipped_files': 0,
-            'error_files': 0,
-            'deleted_files': 0,
-            'audio_files': 0,
-            'image_files': 0,
-            'video_files': 0
-        }
+            logger.info(f"Listing files in folder: {folder_name}, sorted by {sort_by} {order_direction}")
         
-        # Setup download directory - now using base downloads directory directly
+        # Setup download directory - subfolders keep their path below the target folder
         base_download_dir = Path(CONFIG['downloads_path']['downloads_dir'])
+        if parent_path:
+            base_download_dir = base_download_dir / parent_path
         
         # Get enabled file types and their configurations
         dl_audio_enabled = CONFIG.get('audio_file_types', {}).get('DL_audio_file_types', True)
@@ -428,13 +1297,38 @@ def process_folder(service, folder_id, folder_name, parent_path="", dry_run=Fals
         image_file_types = CONFIG.get('image_file_types', {}).get('include', [])
         video_file_types = CONFIG.get('video_file_types', {}).get('include', [])
         
-        # Process each file
+        delete_after_download = CONFIG.get('download', {}).get('delete_after_download', False)
+        
+        # Deletes are grouped into batch requests unless the batch size is 1
+        try:
+            delete_batch_size = min(DRIVE_BATCH_LIMIT, max(1, int(
+                CONFIG.get('download', {}).get('delete_batch_size', 1))))
+        except (TypeError, ValueError):
+            delete_batch_size = 1
+        batch_deletes = delete_after_download and delete_batch_size > 1
+        worker_deletes = delete_after_download and not batch_deletes
+        
+        # Small audio files can skip the downloads directory until they are consumed
+        try:
+            in_memory_max_bytes = int(CONFIG.get('download', {}).get('in_memory_max_bytes', 0)) if in_memory else 0
+        except (TypeError, ValueError):
+            in_memory_max_bytes = 0
+        
+        # Use a private pool if concurrency is configured but no executor was given
+        max_workers = get_max_workers()
+        if executor is None and max_workers > 1 and not dry_run:
+            own_executor = executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="gdrive-download")
+        max_in_flight = max_workers * 2
+        
+        # Process each file as its page arrives
         for item in items:
             item_id = item['id']
             item_name = item['name']
             mime_type = item.get('mimeType', '')
             created_time = item.get(sort_by, '')
             
+            stats['total_files'] += 1
             stats['processed_files'] += 1
             
             # Log file with its creation date if available
@@ -470,6 +1364,21 @@ def process_folder(service, folder_id, folder_name, parent_path="", dry_run=Fals
                 stats['skipped_files'] += 1
                 continue
             
+            # Skip files the manifest says were already downloaded
+            previous_download = download_manifest.find_download(item_id, item.get('md5Checksum'))
+            if previous_download:
+                logger.info(f"Already downloaded as {previous_download['saved_as']}, skipping file: {item_name}")
+                stats['skipped_files'] += 1
+                # A delete that failed on an earlier run can simply be retried
+                if delete_after_download and not dry_run and previous_download['file_id'] == item_id:
+                    if batch_deletes:
+                        pending_deletes.append((item_id, item_name))
+                        if len(pending_deletes) >= delete_batch_size:
+                            flush_deletes()
+                    elif delete_file(service, item_id, item_name):
+                        count_deletes()
+                continue
+            
             # Generate output path - now directly in downloads folder
             if CONFIG.get('download', {}).get('add_timestamps', False):
                 timestamp_format = CONFIG.get('download', {}).get('timestamp_format', '%Y%m%d_%H%M%S_%f')
@@ -478,31 +1387,53 @@ def process_folder(service, folder_id, folder_name, parent_path="", dry_run=Fals
             else:
                 output_path = base_download_dir / item_name
             
-            # In dry run mode, just log what would happen
+            # In dry run mode, just record what would happen
             if dry_run:
-                print(f"Would download {file_type} file: {item_name} -> {output_path}")
-                if CONFIG.get('download', {}).get('delete_after_download', False):
-                    print(f"Would delete file from Google Drive after download: {item_name}")
+                logger.info(f"Would download {file_type} file: {item_name} -> {output_path}")
+                if delete_after_download:
+                    logger.info(f"Would delete file from Google Drive after download: {item_name}")
+                stats['planned_files'].append({
+                    'file_id': item_id,
+                    'name': item_name,
+                    'folder': folder_name,
+                    'type': file_type,
+                    'size': int(item['size']) if item.get('size') is not None else None,
+                    'destination': str(output_path),
+                    'delete_after_download': bool(delete_after_download)
+                })
                 stats['downloaded_files'] += 1
                 continue
             
             # Download the file
-            try:
-                download_result = download_file(service, item_id, str(output_path))
-                
-                if download_result['success']:
-                    stats['downloaded_files'] += 1
-                    logger.info(f"Successfully downloaded {file_type} file: {item_name}")
-                    
-                    # Delete file from Google Drive if configured
-                    if CONFIG.get('download', {}).get('delete_after_download', False):
-                        delete_file(service, item_id, item_name)
-                        stats['deleted_files'] += 1
-                else:
-                    stats['error_files'] += 1
-            except Exception as e:
-                logger.error(f"Error processing file {item_name}: {str(e)}")
-                stats['error_files'] += 1
+            spool = (file_type == "audio" and item.get('size') is not None
+                     and int(item['size']) <= in_memory_max_bytes)
+            # In-memory downloads delete their original once persisted, never in a batch
+            delete_original = delete_after_download if spool else worker_deletes
+            if executor is None:
+                record_result(download_and_delete_file(
+                    service, item_id, item_name, file_type, output_path, delete_original,
+                    item.get('md5Checksum'), item.get('size'), spool))
+                continue
+            
+            pending.add(executor.submit(
+                download_and_delete_file, service, item_id, item_name, file_type,
+                output_path, delete_original, item.get('md5Checksum'), item.get('size'), spool))
+            
+            # Wait for a download slot before queuing more work
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record_result(future.result())
+        
+        # Collect the remaining downloads
+        for future in as_completed(pending):
+            record_result(future.result())
+        pending = set()
+        flush_deletes()
+        
+        if stats['total_files'] == 0:
+            logger.info(f"No files found in folder: {folder_name}")
+            return stats
         
         # Log statistics for this folder
         logger.info(f"Folder '{folder_name}' statistics:")
@@ -518,17 +1449,300 @@ def process_folder(service, folder_id, folder_name, parent_path="", dry_run=Fals
         
     except Exception as e:
         logger.exception(f"Error processing folder '{folder_name}': {str(e)}")
-        return {
-            'total_files': 0,
-            'processed_files': 0,
-            'downloaded_files': 0,
-            'skipped_files': 0,
-            'error_files': 1,
-            'deleted_files': 0,
-            'audio_files': 0,
-            'image_files': 0,
-            'video_files': 0
+        if isinstance(e, HttpError) and e.resp.status == 404:
+            # The folder is gone, so a cached ID for it must be resolved again
+            invalidate_cached_folder_id(folder_id)
+        # Downloads already queued still count towards the folder totals
+        for future in as_completed(pending):
+            record_result(future.result())
+        flush_deletes()
+        stats['error_files'] += 1
+        return stats
+    finally:
+        if own_executor is not None:
+            own_executor.shutdown(wait=True)
+
+def read_state_file(state_file):
+    """Read a JSON state file from the state directory.
+    
+    Args:
+        state_file: Path of the state file
+        
+    Returns:
+        dict: The saved state, or an empty dict if there is none or it is unreadable
+    """
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read state from {state_file}, ignoring it: {str(e)}")
+        return {}
+
+def write_state_file(state_file, state):
+    """Write a JSON state file atomically.
+    
+    Args:
+        state_file: Path of the state file
+        state: JSON-serializable dict to save
+    """
+    try:
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = state_file.with_suffix(state_file.suffix + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, state_file)
+    except OSError as e:
+        logger.error(f"Error saving state to {state_file}: {str(e)}")
+
+def load_sync_state():
+    """Load the delta sync state (saved start page token and synced folders)."""
+    return read_state_file(SYNC_STATE_FILE)
+
+def save_sync_state(state):
+    """Save the delta sync state.
+    
+    Args:
+        state: Dict with 'start_page_token' and 'folders' (synced folder IDs)
+    """
+    write_state_file(SYNC_STATE_FILE, state)
+
+def load_folder_cache():
+    """Load the cache of resolved folder IDs into memory."""
+    global _folder_cache
+    with _folder_cache_lock:
+        _folder_cache = read_state_file(FOLDER_CACHE_FILE)
+
+def save_folder_cache():
+    """Save the in-memory cache of resolved folder IDs."""
+    with _folder_cache_lock:
+        write_state_file(FOLDER_CACHE_FILE, _folder_cache)
+
+def get_cached_folder_id(folder_name):
+    """Get a cached folder ID if it has not expired.
+    
+    Args:
+        folder_name: Name of the folder
+        
+    Returns:
+        str: The cached folder ID, or None if missing or older than the TTL
+    """
+    ttl = CONFIG.get('folder_cache', {}).get('ttl_seconds', 86400)
+    with _folder_cache_lock:
+        entry = _folder_cache.get(folder_name)
+    if not entry or time.time() - entry.get('resolved_at', 0) > ttl:
+        return None
+    return entry.get('id')
+
+def cache_folder_id(folder_name, folder_id):
+    """Remember a resolved folder ID.
+    
+    Args:
+        folder_name: Name of the folder
+        folder_id: ID returned by Drive
+    """
+    with _folder_cache_lock:
+        _folder_cache[folder_name] = {'id': folder_id, 'resolved_at': time.time()}
+
+def invalidate_cached_folder_id(folder_id):
+    """Forget a cached folder ID, e.g. because Drive reported it as not found.
+    
+    Args:
+        folder_id: ID of the folder to forget
+        
+    Returns:
+        list: Names of the folders that were cached with this ID
+    """
+    with _folder_cache_lock:
+        names = [name for name, entry in _folder_cache.items() if entry.get('id') == folder_id]
+        for name in names:
+            del _folder_cache[name]
+    if names:
+        logger.warning(f"Cached folder ID {folder_id} for {', '.join(names)} is no longer valid")
+        save_folder_cache()
+    return names
+
+def resolve_folder_ids(service, folder_names):
+    """Resolve folder names to IDs, using the folder cache where possible.
+    
+    Args:
+        service: Google Drive API service instance
+        folder_names: Names of the folders to resolve
+        
+    Returns:
+        dict: Folder name -> folder ID (None if not found)
+    """
+    use_cache = CONFIG.get('folder_cache', {}).get('enabled', False)
+    
+    folder_ids = {}
+    if use_cache:
+        for folder_name in folder_names:
+            folder_id = get_cached_folder_id(folder_name)
+            if folder_id:
+                logger.info(f"Using cached ID for folder '{folder_name}': {folder_id}")
+                folder_ids[folder_name] = folder_id
+    
+    # Look up the remaining names in one batch
+    missing = [folder_name for folder_name in folder_names if folder_name not in folder_ids]
+    if missing:
+        logger.info(f"Looking for folders: {', '.join(missing)}")
+        found = find_folders_by_name(service, missing)
+        folder_ids.update(found)
+        
+        if use_cache:
+            for folder_name, folder_id in found.items():
+                if folder_id:
+                    cache_folder_id(folder_name, folder_id)
+            save_folder_cache()
+    
+    return folder_ids
+
+def load_throughput():
+    """Load the download throughput observed by earlier runs."""
+    return read_state_file(THROUGHPUT_FILE)
+
+def record_throughput(downloaded_bytes, elapsed_seconds, workers=1):
+    """Add a run's download volume and duration to the observed throughput.
+    
+    Earlier runs are decayed so the estimate follows changes in bandwidth,
+    and runs are weighted by their volume, so a run of a few tiny files
+    (dominated by per-request overhead) barely moves it.
+    
+    Args:
+        downloaded_bytes: Bytes downloaded by the run
+        elapsed_seconds: Seconds spent transferring those bytes, summed over the
+            downloads (listing, skipped files and pipeline waits not included)
+        workers: Number of downloads that ran at once; the summed seconds are
+            divided by it, so the throughput is that of the whole run
+    """
+    if downloaded_bytes <= 0 or elapsed_seconds <= 0:
+        return
+    
+    workers = max(1, workers)
+    elapsed_seconds /= workers
+    decay = CONFIG.get('planning', {}).get('throughput_decay', 0.8)
+    throughput = load_throughput()
+    total_bytes = throughput.get('bytes', 0) * decay + downloaded_bytes
+    total_seconds = throughput.get('seconds', 0) * decay + elapsed_seconds
+    
+    write_state_file(THROUGHPUT_FILE, {
+        'bytes': total_bytes,
+        'seconds': total_seconds,
+        'bytes_per_second': total_bytes / total_seconds,
+        'workers': workers,
+        'runs': throughput.get('runs', 0) + 1,
+        'updated_at': datetime.now().isoformat()
+    })
+    logger.info(f"Observed download throughput: {downloaded_bytes / elapsed_seconds / 1024:.1f} KiB/s "
+                f"(estimate now {total_bytes / total_seconds / 1024:.1f} KiB/s)")
+
+def build_dry_run_plan(folder_stats):
+    """Build the dry run plan from the files process_folder would download.
+    
+    Args:
+        folder_stats: Stats returned by process_folder in dry run mode
+        
+    Returns:
+        dict: JSON-serializable plan with every file, totals and a time estimate
+              based on the throughput observed by earlier runs (None if there is none)
+    """
+    files = [planned for stats in folder_stats for planned in stats.get('planned_files', [])]
+    
+    by_type = {}
+    for planned in files:
+        type_totals = by_type.setdefault(planned['type'], {'files': 0, 'bytes': 0})
+        type_totals['files'] += 1
+        type_totals['bytes'] += planned['size'] or 0
+    total_bytes = sum(planned['size'] or 0 for planned in files)
+    
+    throughput = load_throughput()
+    bytes_per_second = throughput.get('bytes_per_second')
+    
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'files': files,
+        'totals': {
+            'files': len(files),
+            'bytes': total_bytes,
+            # Google Docs and other native files report no size
+            'files_without_size': sum(1 for planned in files if planned['size'] is None),
+            'deletes': sum(1 for planned in files if planned['delete_after_download']),
+            'by_type': by_type
+        },
+        'estimate': {
+            'bytes_per_second': bytes_per_second,
+            'download_seconds': total_bytes / bytes_per_second if bytes_per_second else None,
+            'workers': throughput.get('workers', 1),
+            'based_on_runs': throughput.get('runs', 0)
         }
+    }
+
+def get_start_page_token(service):
+    """Get the current start page token of the Drive changes feed.
+    
+    Args:
+        service: Google Drive API service instance
+        
+    Returns:
+        str: Token marking "now" in the changes feed
+    """
+    response = execute_drive_request(service.changes().getStartPageToken())
+    return response.get('startPageToken')
+
+def collect_changed_files(service, page_token, folder_ids):
+    """Collect files added to the watched folders since a start page token.
+    
+    Only the changes since the checkpoint are read, so the API work is
+    proportional to the number of changes rather than the folder sizes.
+    
+    Args:
+        service: Google Drive API service instance
+        page_token: Start page token saved by the previous run
+        folder_ids: IDs of the watched folders
+        
+    Returns:
+        tuple: (dict of folder ID -> list of file objects sorted as configured,
+                new start page token to save for the next run)
+    """
+    sort_by = CONFIG.get('sorting', {}).get('sort_by', 'createdTime')
+    sort_order = CONFIG.get('sorting', {}).get('sort_order', 'asc')
+    
+    watched = set(folder_ids)
+    changed_files = {folder_id: {} for folder_id in folder_ids}
+    new_start_page_token = None
+    
+    while page_token:
+        response = execute_drive_request(service.changes().list(
+            pageToken=page_token,
+            spaces='drive',
+            includeRemoved=False,
+            pageSize=1000,
+            fields=("nextPageToken, newStartPageToken, "
+                    f"changes(fileId, removed, file(id, name, mimeType, size, md5Checksum, {sort_by}, fileExtension, parents, trashed))")
+        ))
+        
+        for change in response.get('changes', []):
+            file = change.get('file')
+            if change.get('removed') or not file or file.get('trashed'):
+                continue
+            if file.get('mimeType') == 'application/vnd.google-apps.folder':
+                continue
+            
+            for parent_id in file.get('parents', []):
+                if parent_id in watched:
+                    # A file changed several times only needs processing once
+                    changed_files[parent_id][file['id']] = file
+        
+        new_start_page_token = response.get('newStartPageToken', new_start_page_token)
+        page_token = response.get('nextPageToken')
+    
+    reverse = sort_order.lower() != 'asc'
+    changed_files = {
+        folder_id: sorted(files.values(), key=lambda f: f.get(sort_by, ''), reverse=reverse)
+        for folder_id, files in changed_files.items()
+    }
+    return changed_files, new_start_page_token
 
 def generate_filename_with_timestamp(filename: str, timestamp_format: Optional[str] = None) -> str:
     """
@@ -547,11 +1761,32 @@ def generate_filename_with_timestamp(filename: str, timestamp_format: Optional[s
     timestamp = datetime.now().strftime(timestamp_format)
     return f"{timestamp}_{filename}"
 
-def main():
-    """Main function to process Google Drive files."""
+def open_download_manifest():
+    """Open the download manifest if it is enabled in config.
+    
+    Returns:
+        bool: True if the manifest was opened by this call
+    """
+    if not CONFIG.get('manifest', {}).get('enabled', False):
+        return False
+    return download_manifest.open_manifest(MANIFEST_FILE)
+
+def main(on_download=None, in_memory=False):
+    """Main function to process Google Drive files.
+    
+    A download manifest opened by the caller beforehand is used and left open,
+    so results handed to 'on_download' can still be recorded after main returns.
+    
+    Args:
+        on_download: Optional callback receiving each successful download
+            result as soon as it completes (see process_folder)
+        in_memory: Whether small audio files may be downloaded into memory
+            for 'on_download' (see process_folder)
+    """
     if not check_credentials_file():
         return
     
+    own_manifest = False
     try:
         # Check if any file downloads are enabled
         dl_audio_enabled = CONFIG.get('audio_file_types', {}).get('DL_audio_file_types', True)
@@ -563,6 +1798,10 @@ def main():
             print("All file downloads are disabled in configuration. No files will be downloaded.")
             return
             
+        # Open the manifest of files downloaded by earlier runs
+        if not download_manifest.is_manifest_open():
+            own_manifest = open_download_manifest()
+        
         # Authenticate with Google Drive
         service = authenticate_google_drive()
         if not service:
@@ -576,18 +1815,23 @@ def main():
         dry_run = CONFIG.get('dry_run', False)
         if dry_run:
             logger.info("Running in DRY RUN mode - no files will be downloaded or deleted")
-            print("\n=== DRY RUN MODE - NO FILES WILL BE DOWNLOADED OR DELETED ===\n")
+            # stdout is kept for the JSON plan
+            print("\n=== DRY RUN MODE - NO FILES WILL BE DOWNLOADED OR DELETED ===\n", file=sys.stderr)
+        
+        # Resolve each target folder to its Drive ID, from the cache or in one batch lookup
+        if CONFIG.get('folder_cache', {}).get('enabled', False):
+            load_folder_cache()
+        named_folders = [folder_name for folder_name in target_folders if folder_name.lower() != 'root']
+        found_folder_ids = resolve_folder_ids(service, named_folders) if named_folders else {}
         
-        # Process each target folder
+        folders_to_process = []
         for folder_name in target_folders:
             if folder_name.lower() == 'root':
                 # Root folder has a special ID
                 folder_id = 'root'
                 logger.info(f"Processing root folder")
             else:
-                # Find folder by name
-                logger.info(f"Looking for folder: {folder_name}")
-                folder_id = find_folder_by_name(service, folder_name)
+                folder_id = found_folder_ids.get(folder_name)
                 
                 if not folder_id:
                     logger.warning(f"Folder '{folder_name}' not found. Skipping.")
@@ -595,13 +1839,101 @@ def main():
                 
                 logger.info(f"Processing folder: {folder_name} (ID: {folder_id})")
             
-            # Process files in the folder
-            process_folder(service, folder_id, folder_name, dry_run=dry_run)
+            folders_to_process.append((folder_id, folder_name))
+        
+        # In recursive mode every subfolder is processed too, keeping its path
+        if CONFIG['folders'].get('recursive', False):
+            max_depth = CONFIG['folders'].get('max_depth')
+            folders_to_process = walk_folder_trees(service, folders_to_process, max_depth)
+        else:
+            folders_to_process = [(folder_id, folder_name, "") for folder_id, folder_name in folders_to_process]
+        
+        # In delta sync mode only files changed since the last checkpoint are processed
+        delta_sync = CONFIG.get('sync', {}).get('delta_sync', False)
+        folder_items = {}
+        new_start_page_token = None
+        if delta_sync:
+            sync_state = load_sync_state()
+            saved_token = sync_state.get('start_page_token')
+            synced_folders = set(sync_state.get('folders', []))
+            
+            if saved_token:
+                # Changes report real parent IDs, so resolve the 'root' alias first
+                watched_ids = {}
+                for folder_id, _, _ in folders_to_process:
+                    if folder_id not in synced_folders:
+                        continue
+                    if folder_id == 'root':
+                        watched_ids[execute_drive_request(service.files().get(fileId='root', fields='id'))['id']] = folder_id
+                    else:
+                        watched_ids[folder_id] = folder_id
+                
+                changed_files, new_start_page_token = collect_changed_files(service, saved_token, list(watched_ids))
+                for watched_id, files in changed_files.items():
+                    folder_items[watched_ids[watched_id]] = files
+                logger.info(f"Delta sync: {sum(len(files) for files in changed_files.values())} "
+                            f"changed file(s) in {len(watched_ids)} synced folder(s)")
+            else:
+                # Take the checkpoint before listing, so nothing added meanwhile is missed
+                new_start_page_token = get_start_page_token(service)
+                logger.info("Delta sync: no checkpoint saved yet, doing a full listing")
+        
+        max_workers = get_max_workers()
+        folder_stats = []
+        if max_workers > 1 and not dry_run:
+            # All folders share one bounded pool of download workers
+            logger.info(f"Downloading with up to {max_workers} concurrent workers")
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gdrive-download") as download_executor, \
+                    ThreadPoolExecutor(max_workers=max(1, min(len(folders_to_process), max_workers)),
+                                       thread_name_prefix="gdrive-folder") as folder_executor:
+                folder_futures = [
+                    folder_executor.submit(process_folder, service, folder_id, folder_name, parent_path,
+                                           dry_run=dry_run, executor=download_executor,
+                                           items=folder_items.get(folder_id), on_download=on_download,
+                                           in_memory=in_memory)
+                    for folder_id, folder_name, parent_path in folders_to_process
+                ]
+                for future in folder_futures:
+                    folder_stats.append(future.result())
+        else:
+            # Process files in each folder one after another
+            for folder_id, folder_name, parent_path in folders_to_process:
+                folder_stats.append(process_folder(service, folder_id, folder_name, parent_path, dry_run=dry_run,
+                                                   items=folder_items.get(folder_id), on_download=on_download,
+                                                   in_memory=in_memory))
+        
+        if dry_run:
+            plan = build_dry_run_plan(folder_stats)
+            write_state_file(DRY_RUN_PLAN_FILE, plan)
+            print(json.dumps(plan, indent=2))
+            logger.info(f"Dry run plan: {plan['totals']['files']} file(s), {plan['totals']['bytes']} bytes, "
+                        f"saved to {DRY_RUN_PLAN_FILE}")
+        else:
+            # Parallel downloads overlap, so their summed transfer time is spread over the workers
+            downloaded_files = sum(stats['downloaded_files'] for stats in folder_stats)
+            record_throughput(sum(stats['downloaded_bytes'] for stats in folder_stats),
+                              sum(stats['transfer_seconds'] for stats in folder_stats),
+                              workers=min(max_workers, downloaded_files))
+        
+        if delta_sync and new_start_page_token and not dry_run:
+            if any(stats['error_files'] for stats in folder_stats):
+                # Keep the old checkpoint so the failed files are seen again next run
+                logger.warning("Delta sync: some files failed, keeping the previous checkpoint")
+            else:
+                save_sync_state({
+                    'start_page_token': new_start_page_token,
+                    'folders': [folder_id for folder_id, _, _ in folders_to_process],
+                    'saved_at': datetime.now().isoformat()
+                })
+                logger.info("Delta sync: checkpoint saved")
         
         logger.info("Google Drive download process completed.")
         
     except Exception as e:
         logger.exception(f"An error occurred during the download process: {str(e)}")
+    finally:
+        if own_manifest:
+            download_manifest.close_manifest()
 
 
 if __name__ == "__main__":
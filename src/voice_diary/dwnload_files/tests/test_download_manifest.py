@@ -0,0 +1,69 @@
+"""Unit tests for download_manifest module."""
+import unittest
+import tempfile
+from pathlib import Path
+
+from voice_diary.dwnload_files import download_manifest
+
+
+class TestDownloadManifest(unittest.TestCase):
+    """Tests for the persistent download manifest."""
+    
+    def setUp(self):
+        """Open a manifest in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp_dir.name) / 'state' / 'manifest.sqlite3'
+        self.assertTrue(download_manifest.open_manifest(self.db_path))
+    
+    def tearDown(self):
+        """Close the manifest and remove the temporary directory."""
+        download_manifest.close_manifest()
+        self.tmp_dir.cleanup()
+    
+    def test_unknown_file_is_not_found(self):
+        """Test a file that was never downloaded is reported as new."""
+        self.assertIsNone(download_manifest.find_download('file1_id', 'abc'))
+    
+    def test_recorded_file_is_found(self):
+        """Test a recorded download is found by file ID and checksum."""
+        download_manifest.record_download('file1_id', 'abc', 'memo.mp3', '1234', '/downloads/memo.mp3')
+        
+        entry = download_manifest.find_download('file1_id', 'abc')
+        
+        self.assertEqual(entry['saved_as'], '/downloads/memo.mp3')
+        self.assertEqual(entry['size'], 1234)
+    
+    def test_identical_content_is_found(self):
+        """Test a re-upload with the same checksum counts as already downloaded."""
+        download_manifest.record_download('file1_id', 'abc', 'memo.mp3')
+        
+        entry = download_manifest.find_download('file2_id', 'abc')
+        
+        self.assertEqual(entry['file_id'], 'file1_id')
+    
+    def test_changed_content_is_not_found(self):
+        """Test a file whose content changed is downloaded again."""
+        download_manifest.record_download('file1_id', 'abc', 'memo.mp3')
+        
+        self.assertIsNone(download_manifest.find_download('file1_id', 'def'))
+    
+    def test_manifest_persists_between_runs(self):
+        """Test entries survive closing and reopening the manifest."""
+        download_manifest.record_download('file1_id', 'abc', 'memo.mp3')
+        download_manifest.close_manifest()
+        
+        download_manifest.open_manifest(self.db_path)
+        
+        self.assertIsNotNone(download_manifest.find_download('file1_id', 'abc'))
+    
+    def test_closed_manifest_finds_nothing(self):
+        """Test lookups are no-ops when no manifest is open."""
+        download_manifest.record_download('file1_id', 'abc', 'memo.mp3')
+        download_manifest.close_manifest()
+        
+        self.assertIsNone(download_manifest.find_download('file1_id', 'abc'))
+        self.assertFalse(download_manifest.record_download('file2_id', 'def'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Unit tests for drive_rate_limiter module."""
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from voice_diary.dwnload_files.drive_rate_limiter import (
+    AdaptiveRateLimiter,
+    call_with_backoff,
+    compute_backoff,
+    get_retry_after,
+    is_rate_limit_error
+)
+
+
+def make_http_error(status, reason=None, headers=None):
+    """Build an HttpError like the ones returned by the Drive API."""
+    resp = httplib2.Response(dict({'status': status}, **(headers or {})))
+    content = json.dumps({'error': {'errors': [{'reason': reason}] if reason else []}}).encode('utf-8')
+    return HttpError(resp, content)
+
+
+class TestRateLimitErrors(unittest.TestCase):
+    """Tests for classifying Drive errors."""
+    
+    def test_is_rate_limit_error(self):
+        """Test 429s and 403 quota errors are rate limit errors, other errors are not."""
+        self.assertTrue(is_rate_limit_error(make_http_error(429)))
+        self.assertTrue(is_rate_limit_error(make_http_error(403, 'rateLimitExceeded')))
+        self.assertTrue(is_rate_limit_error(make_http_error(403, 'userRateLimitExceeded')))
+        self.assertFalse(is_rate_limit_error(make_http_error(403, 'insufficientPermissions')))
+        self.assertFalse(is_rate_limit_error(make_http_error(404)))
+        self.assertFalse(is_rate_limit_error(ValueError("not an HTTP error")))
+    
+    def test_backoff_honours_retry_after(self):
+        """Test the backoff never undercuts the server's Retry-After value."""
+        error = make_http_error(429, headers={'retry-after': '7'})
+        
+        self.assertEqual(get_retry_after(error), 7.0)
+        self.assertGreaterEqual(compute_backoff(0, base=1, cap=2, retry_after=7.0), 7.0)
+        self.assertLessEqual(compute_backoff(10, base=1, cap=2), 2)
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    """Tests for the AIMD token bucket."""
+    
+    def test_rate_adapts(self):
+        """Test quota errors halve the rate once per burst and successes raise it again."""
+        limiter = AdaptiveRateLimiter(rate=10, min_rate=1, max_rate=20)
+        
+        limiter.on_throttle()
+        limiter.on_throttle()
+        self.assertEqual(limiter.rate, 5)
+        
+        for _ in range(100):
+            limiter.on_success()
+        self.assertGreater(limiter.rate, 5)
+        self.assertLessEqual(limiter.rate, 20)
+    
+    @patch('voice_diary.dwnload_files.drive_rate_limiter.time.sleep')
+    def test_acquire_waits_for_tokens(self, mock_sleep):
+        """Test acquiring beyond the burst waits for the bucket to refill."""
+        limiter = AdaptiveRateLimiter(rate=2, burst=2)
+        
+        limiter.acquire()
+        limiter.acquire()
+        with patch('voice_diary.dwnload_files.drive_rate_limiter.time.monotonic',
+                   side_effect=[limiter._last_refill, limiter._last_refill + 1.0]):
+            limiter.acquire()
+        
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.5, places=3)
+
+
+class TestCallWithBackoff(unittest.TestCase):
+    """Tests for retrying calls through the limiter."""
+    
+    @patch('voice_diary.dwnload_files.drive_rate_limiter.time.sleep')
+    def test_retries_rate_limited_calls(self, mock_sleep):
+        """Test a throttled call is retried and slows the limiter down."""
+        limiter = AdaptiveRateLimiter(rate=10)
+        call = MagicMock(side_effect=[make_http_error(429), 'ok'])
+        
+        self.assertEqual(call_with_backoff(call, limiter), 'ok')
+        self.assertEqual(call.call_count, 2)
+        self.assertLess(limiter.rate, 10)
+        mock_sleep.assert_called_once()
+    
+    @patch('voice_diary.dwnload_files.drive_rate_limiter.time.sleep')
+    def test_does_not_retry_other_errors(self, mock_sleep):
+        """Test errors other than quota or server errors are raised immediately."""
+        limiter = AdaptiveRateLimiter(rate=10)
+        call = MagicMock(side_effect=make_http_error(404))
+        
+        with self.assertRaises(HttpError):
+            call_with_backoff(call, limiter)
+        self.assertEqual(call.call_count, 1)
+        mock_sleep.assert_not_called()
+    
+    @patch('voice_diary.dwnload_files.drive_rate_limiter.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        """Test the last error is raised once all retries are used."""
+        limiter = AdaptiveRateLimiter(rate=10)
+        call = MagicMock(side_effect=make_http_error(503))
+        
+        with self.assertRaises(HttpError):
+            call_with_backoff(call, limiter, max_retries=2)
+        self.assertEqual(call.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,19 @@
 import unittest
 from unittest.mock import patch, mock_open, MagicMock, ANY, call
 import json
+import hashlib
 import io
 import pickle
 import os
 import sys
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
+import tempfile
+import httplib2
+from googleapiclient.errors import HttpError
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Import functions from the module to test
 # We're using direct imports for testability without modifying the module
@@ -21,7 +27,22 @@ from voice_diary.dwnload_files.dwnload_files import (
     delete_file,
     process_folder,
     configure_logging,
-    generate_filename_with_timestamp
+    generate_filename_with_timestamp,
+    collect_changed_files,
+    delete_files_batch,
+    find_folders_by_name,
+    resolve_folder_ids,
+    cache_folder_id,
+    load_folder_cache,
+    invalidate_cached_folder_id,
+    build_drive_service,
+    credentials_expire_soon,
+    walk_folder_trees,
+    download_to_memory,
+    persist_download,
+    record_throughput,
+    build_dry_run_plan,
+    ResumableMediaDownload
 )
 
 class TestConfigAndPathSetup(unittest.TestCase):
@@ -92,6 +113,28 @@ class TestAuthAndCredentials(unittest.TestCase):
         # Just check that the function exists and is callable
         self.assertTrue(callable(authenticate_google_drive))
 
+    
+    def test_credentials_expire_soon(self):
+        """Test tokens close to expiry are refreshed proactively."""
+        creds = MagicMock()
+        
+        creds.expiry = datetime.utcnow() + timedelta(seconds=60)
+        self.assertTrue(credentials_expire_soon(creds))
+        
+        creds.expiry = datetime.utcnow() + timedelta(hours=1)
+        self.assertFalse(credentials_expire_soon(creds))
+        
+        creds.expiry = None
+        self.assertFalse(credentials_expire_soon(creds))
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.build')
+    def test_build_drive_service_uses_bundled_discovery(self, mock_build):
+        """Test services are built without fetching the discovery document."""
+        service = build_drive_service(MagicMock())
+        
+        # Assert the bundled document was used and the service is usable
+        mock_build.assert_not_called()
+        self.assertTrue(hasattr(service, 'files'))
 
 class TestGDriveFolderAndFileOperations(unittest.TestCase):
     """Tests for Google Drive folder and file operations."""
@@ -160,9 +203,31 @@ class TestGDriveFolderAndFileOperations(unittest.TestCase):
         mock_service.files().list.assert_called_with(
             q="'test_folder_id' in parents and trashed = false",
             spaces='drive',
-            fields='files(id, name, mimeType)'
+            fields='nextPageToken, files(id, name, mimeType, createdTime)',
+            orderBy='createdTime'
         )
     
+    def test_list_files_in_folder_follows_pages(self):
+        """Test listing files in a folder across several result pages."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        
+        # Mock two pages of files list responses
+        mock_service.files().list().execute.side_effect = [
+            {'files': [{'id': 'file1_id', 'name': 'file1.mp3', 'mimeType': 'audio/mp3'}],
+             'nextPageToken': 'page2'},
+            {'files': [{'id': 'file2_id', 'name': 'file2.wav', 'mimeType': 'audio/wav'}]}
+        ]
+        
+        # Call the function
+        result = list_files_in_folder(mock_service, 'test_folder_id')
+        
+        # Assert files from both pages were returned
+        self.assertEqual([f['id'] for f in result], ['file1_id', 'file2_id'])
+        
+        # Verify the second request asked for the next page
+        self.assertEqual(mock_service.files().list.call_args.kwargs['pageToken'], 'page2')
+    
     def test_list_files_in_folder_with_extensions(self):
         """Test listing files in a folder with extension filtering."""
         # Mock Google Drive service
@@ -219,6 +284,139 @@ class TestGDriveFolderAndFileOperations(unittest.TestCase):
             self.assertEqual(result['original_filename'], file_name)
             self.assertEqual(result['file_id'], file_id)
     
+    @patch('voice_diary.dwnload_files.dwnload_files.ResumableMediaDownload')
+    def test_download_file_resumes_partial_download(self, mock_downloader_class):
+        """Test an interrupted download resumes from its checkpoint and is renamed atomically."""
+        content = b'0123456789'
+        
+        class FakeDownloader:
+            """Writes the remaining bytes from the requested range in one chunk."""
+            def __init__(self, fd, request, chunksize, offset=0):
+                self.fd = fd
+                self._progress = offset
+            
+            def next_chunk(self):
+                self.fd.write(content[self._progress:])
+                self.started_at = self._progress
+                self._progress = len(content)
+                status = MagicMock(resumable_progress=len(content), total_size=len(content))
+                status.progress.return_value = 1.0
+                return status, True
+        
+        downloaders = []
+        mock_downloader_class.side_effect = lambda *args, **kwargs: downloaders.append(
+            FakeDownloader(*args, **kwargs)) or downloaders[-1]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            output_path = tmp_dir / 'memo.mp3'
+            
+            # Leave a partial download with 4 confirmed bytes (plus 2 unconfirmed ones)
+            (tmp_dir / 'file1_id.part').write_bytes(content[:6])
+            (tmp_dir / 'file1_id.part.json').write_text(json.dumps(
+                {'file_id': 'file1_id', 'bytes_received': 4, 'total_size': len(content)}))
+            
+            result = download_file(MagicMock(), 'file1_id', str(output_path),
+                                   md5_checksum=hashlib.md5(content).hexdigest())
+            
+            # Assert the download continued from the checkpoint and verified the whole file
+            self.assertTrue(result['success'])
+            self.assertGreaterEqual(result['transfer_seconds'], 0.0)
+            self.assertEqual(downloaders[0].started_at, 4)
+            self.assertEqual(output_path.read_bytes(), content)
+            self.assertFalse((tmp_dir / 'file1_id.part').exists())
+            self.assertFalse((tmp_dir / 'file1_id.part.json').exists())
+    
+    def test_resumable_media_download_requests_from_offset(self):
+        """Test the resumed download asks Drive for the bytes after the offset only."""
+        http = MagicMock()
+        http.request.return_value = (
+            httplib2.Response({'status': 206, 'content-range': 'bytes 4-9/10'}), b'456789')
+        request = MagicMock(uri='https://www.googleapis.com/drive/v3/files/file1_id?alt=media',
+                            headers={}, http=http)
+        fd = io.BytesIO()
+        
+        downloader = ResumableMediaDownload(fd, request, chunksize=1024, offset=4)
+        status, done = downloader.next_chunk()
+        
+        # Assert the Range header starts at the offset and progress counts the earlier bytes
+        self.assertEqual(http.request.call_args.kwargs['headers']['range'], 'bytes=4-1027')
+        self.assertTrue(done)
+        self.assertEqual(status.resumable_progress, 10)
+        self.assertEqual(fd.getvalue(), b'456789')
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.ResumableMediaDownload')
+    def test_download_file_rejects_checksum_mismatch(self, mock_downloader_class):
+        """Test a download whose MD5 does not match Drive's checksum is discarded."""
+        def fake_downloader(fd, request, chunksize, offset=0):
+            downloader = MagicMock()
+            status = MagicMock(resumable_progress=4, total_size=4)
+            status.progress.return_value = 1.0
+            downloader.next_chunk.side_effect = lambda: (fd.write(b'data'), (status, True))[1]
+            return downloader
+        mock_downloader_class.side_effect = fake_downloader
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / 'memo.mp3'
+            
+            result = download_file(MagicMock(), 'file1_id', str(output_path),
+                                   md5_checksum=hashlib.md5(b'other').hexdigest())
+            
+            # Assert nothing was committed and the failure was reported
+            self.assertFalse(result['success'])
+            self.assertIn('MD5 mismatch', result['error'])
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.download_manifest')
+    @patch('voice_diary.dwnload_files.dwnload_files.MediaIoBaseDownload')
+    def test_download_to_memory_then_persist(self, mock_downloader_class, mock_manifest):
+        """Test a small file is held in memory and only written when persisted."""
+        content = b'small memo'
+        
+        def fake_downloader(fd, request, chunksize):
+            downloader = MagicMock()
+            downloader.next_chunk.side_effect = lambda: (fd.write(content), (MagicMock(), True))[1]
+            return downloader
+        mock_downloader_class.side_effect = fake_downloader
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / 'memo.mp3'
+            
+            result = download_to_memory(MagicMock(), 'file1_id', output_path,
+                                        md5_checksum=hashlib.md5(content).hexdigest(), max_bytes=1024)
+            
+            # Assert the content is in the buffer and nothing was written yet
+            self.assertTrue(result['success'])
+            self.assertTrue(result['in_memory'])
+            self.assertEqual(result['buffer'].read(), content)
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
+            
+            # Persist it without deleting the original
+            self.assertTrue(persist_download(result))
+            
+            # Assert the file was written, recorded and the buffer released
+            self.assertEqual(output_path.read_bytes(), content)
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [output_path])
+            self.assertIsNone(result['buffer'])
+            mock_manifest.record_download.assert_called_once()
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.MediaIoBaseDownload')
+    def test_download_to_memory_rejects_checksum_mismatch(self, mock_downloader_class):
+        """Test an in-memory download whose MD5 does not match is reported as failed."""
+        def fake_downloader(fd, request, chunksize):
+            downloader = MagicMock()
+            downloader.next_chunk.side_effect = lambda: (fd.write(b'data'), (MagicMock(), True))[1]
+            return downloader
+        mock_downloader_class.side_effect = fake_downloader
+        
+        result = download_to_memory(MagicMock(), 'file1_id', '/fake/memo.mp3',
+                                    md5_checksum=hashlib.md5(b'other').hexdigest(), max_bytes=1024)
+        
+        # Assert the failure was reported without a buffer
+        self.assertFalse(result['success'])
+        self.assertIn('MD5 mismatch', result['error'])
+        self.assertNotIn('buffer', result)
+    
     def test_delete_file(self):
         """Test deleting a file from Google Drive."""
         # Mock Google Drive service
@@ -254,6 +452,115 @@ class TestGDriveFolderAndFileOperations(unittest.TestCase):
         # Verify delete was called with the correct ID
         mock_service.files().delete.assert_called_with(fileId='test_file_id')
     
+    def test_delete_files_batch(self):
+        """Test deleting several files in one batch request."""
+        # Mock Google Drive service whose batch reports one failed delete
+        mock_service = MagicMock()
+        
+        def new_batch(callback):
+            batch = MagicMock()
+            added = []
+            batch.add.side_effect = lambda request, request_id: added.append(request_id)
+            batch.execute.side_effect = lambda: [
+                callback(request_id, None, Exception("404") if request_id == 'file2_id' else None)
+                for request_id in added
+            ]
+            return batch
+        mock_service.new_batch_http_request.side_effect = new_batch
+        
+        # Call the function
+        result = delete_files_batch(mock_service, [('file1_id', 'a.mp3'), ('file2_id', 'b.mp3')])
+        
+        # Assert per-file outcomes and a single batch round-trip
+        self.assertEqual(result, {'file1_id': True, 'file2_id': False})
+        mock_service.new_batch_http_request.assert_called_once()
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.time.sleep')
+    def test_delete_files_batch_retries_throttled_calls(self, mock_sleep):
+        """Test calls rejected with a quota error inside a batch are sent again."""
+        # Mock Google Drive service whose first batch throttles one delete
+        mock_service = MagicMock()
+        throttled = HttpError(httplib2.Response({'status': 429}), b'{}')
+        batches = []
+        
+        def new_batch(callback):
+            batch = MagicMock()
+            added = []
+            first = not batches
+            batch.add.side_effect = lambda request, request_id: added.append(request_id)
+            batch.execute.side_effect = lambda: [
+                callback(request_id, None, throttled if first and request_id == 'file2_id' else None)
+                for request_id in added
+            ]
+            batches.append(added)
+            return batch
+        mock_service.new_batch_http_request.side_effect = new_batch
+        
+        # Call the function
+        result = delete_files_batch(mock_service, [('file1_id', 'a.mp3'), ('file2_id', 'b.mp3')])
+        
+        # Assert only the throttled delete was retried and both succeeded
+        self.assertEqual(result, {'file1_id': True, 'file2_id': True})
+        self.assertEqual(batches, [['file1_id', 'file2_id'], ['file2_id']])
+        mock_sleep.assert_called_once()
+    
+    def test_find_folders_by_name(self):
+        """Test looking up several folders in one batch request."""
+        # Mock Google Drive service whose batch answers each lookup
+        mock_service = MagicMock()
+        responses = [{'files': [{'id': 'folder1_id', 'name': 'One'}]}, {'files': []}]
+        
+        def new_batch(callback):
+            batch = MagicMock()
+            added = []
+            batch.add.side_effect = lambda request, request_id: added.append(request_id)
+            batch.execute.side_effect = lambda: [
+                callback(request_id, responses[int(request_id)], None) for request_id in added
+            ]
+            return batch
+        mock_service.new_batch_http_request.side_effect = new_batch
+        
+        # Call the function
+        result = find_folders_by_name(mock_service, ['One', 'Missing'])
+        
+        # Assert found and missing folders are reported
+        self.assertEqual(result, {'One': 'folder1_id', 'Missing': None})
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.list_subfolders')
+    def test_walk_folder_trees(self, mock_list_subfolders):
+        """Test walking folder trees level by level."""
+        children = {
+            'root_id': [{'id': 'year_id', 'name': '2024', 'parents': ['root_id']}],
+            'year_id': [{'id': 'month_id', 'name': '05', 'parents': ['year_id']}],
+            'month_id': []
+        }
+        mock_list_subfolders.side_effect = lambda service, parent_ids: [
+            child for parent_id in parent_ids for child in children[parent_id]
+        ]
+        
+        # Call the function
+        result = walk_folder_trees(MagicMock(), [('root_id', 'a-daily-log')])
+        
+        # Assert every level was listed once and paths were kept
+        self.assertEqual(result, [
+            ('root_id', 'a-daily-log', ''),
+            ('year_id', 'a-daily-log/2024', '2024'),
+            ('month_id', 'a-daily-log/2024/05', '2024/05')
+        ])
+        self.assertEqual(mock_list_subfolders.call_count, 3)
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.list_subfolders')
+    def test_walk_folder_trees_max_depth(self, mock_list_subfolders):
+        """Test that the walk stops at the depth limit."""
+        mock_list_subfolders.return_value = [{'id': 'year_id', 'name': '2024', 'parents': ['root_id']}]
+        
+        # Call the function with a depth limit of one level
+        result = walk_folder_trees(MagicMock(), [('root_id', 'a-daily-log')], max_depth=1)
+        
+        # Assert only the first level was listed
+        self.assertEqual([folder_id for folder_id, _, _ in result], ['root_id', 'year_id'])
+        mock_list_subfolders.assert_called_once()
+    
     def test_generate_filename_with_timestamp(self):
         """Test generating filename with timestamp."""
         # Test with a timestamp format
@@ -305,7 +612,8 @@ class TestProcessFolder(unittest.TestCase):
         # Verify list files was called with the correct query
         mock_service.files().list.assert_called_with(
             q="'test_folder_id' in parents and mimeType != 'application/vnd.google-apps.folder' and trashed = false",
-            fields="files(id, name, mimeType, size, modifiedTime, fileExtension)",
+            fields=ANY,
+            orderBy=ANY,
             pageSize=1000
         )
     
@@ -402,6 +710,472 @@ class TestProcessFolder(unittest.TestCase):
         # Verify delete_file was called
         mock_delete_file.assert_called_once_with(mock_service, 'file1_id', 'file1.mp3')
 
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    @patch('voice_diary.dwnload_files.dwnload_files.delete_file')
+    def test_process_folder_with_executor(self, mock_delete_file, mock_download_file, mock_config):
+        """Test concurrent downloads keep the stats consistent."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        
+        # Mock files list response with several audio files
+        mock_files = {
+            'files': [
+                {'id': f'file{i}_id', 'name': f'file{i}.mp3', 'mimeType': 'audio/mp3'}
+                for i in range(8)
+            ]
+        }
+        mock_service.files().list().execute.return_value = mock_files
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': True}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        
+        # Fail the download of one file
+        mock_download_file.side_effect = lambda service, file_id, path, **kwargs: {
+            'success': file_id != 'file3_id'
+        }
+        
+        # Call the function with a shared executor
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            result = process_folder(mock_service, 'test_folder_id', 'TestFolder', executor=executor)
+        
+        # Assert every file was accounted for exactly once
+        self.assertEqual(result['total_files'], 8)
+        self.assertEqual(result['downloaded_files'], 7)
+        self.assertEqual(result['error_files'], 1)
+        self.assertEqual(result['deleted_files'], 7)
+        self.assertEqual(mock_download_file.call_count, 8)
+        self.assertEqual(mock_delete_file.call_count, 7)
+
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    @patch('voice_diary.dwnload_files.dwnload_files.delete_file')
+    def test_process_folder_does_not_count_failed_delete(self, mock_delete_file, mock_download_file, mock_config):
+        """Test a failed single-file delete is not counted as deleted."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        mock_service.files().list().execute.return_value = {
+            'files': [
+                {'id': 'file1_id', 'name': 'file1.mp3', 'mimeType': 'audio/mp3'}
+            ]
+        }
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': True, 'delete_batch_size': 1}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_download_file.return_value = {'success': True}
+        
+        # The delete fails
+        mock_delete_file.return_value = False
+        
+        # Call the function
+        result = process_folder(mock_service, 'test_folder_id', 'TestFolder')
+        
+        # Assert the file was downloaded but not counted as deleted
+        mock_delete_file.assert_called_once_with(mock_service, 'file1_id', 'file1.mp3')
+        self.assertEqual(result['downloaded_files'], 1)
+        self.assertEqual(result['deleted_files'], 0)
+        
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    @patch('voice_diary.dwnload_files.dwnload_files.delete_files_batch')
+    def test_process_folder_with_batched_deletes(self, mock_delete_files_batch, mock_download_file, mock_config):
+        """Test deletes are grouped into batches and counted per file."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        mock_service.files().list().execute.return_value = {
+            'files': [
+                {'id': f'file{i}_id', 'name': f'file{i}.mp3', 'mimeType': 'audio/mp3'}
+                for i in range(3)
+            ]
+        }
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': True, 'delete_batch_size': 100}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_download_file.side_effect = lambda service, file_id, path, **kwargs: {'success': True, 'file_id': file_id}
+        
+        # One of the deletes fails
+        mock_delete_files_batch.side_effect = lambda service, files: {
+            file_id: file_id != 'file1_id' for file_id, _ in files
+        }
+        
+        # Call the function
+        result = process_folder(mock_service, 'test_folder_id', 'TestFolder')
+        
+        # Assert a single batch was sent and only successful deletes were counted
+        mock_delete_files_batch.assert_called_once()
+        self.assertEqual(len(mock_delete_files_batch.call_args[0][1]), 3)
+        self.assertEqual(result['downloaded_files'], 3)
+        self.assertEqual(result['deleted_files'], 2)
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_to_memory')
+    @patch('voice_diary.dwnload_files.dwnload_files.delete_file')
+    @patch('voice_diary.dwnload_files.dwnload_files.delete_files_batch')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_manifest')
+    def test_process_folder_counts_deletes_of_persisted_downloads(
+            self, mock_manifest, mock_delete_files_batch, mock_delete_file, mock_download_to_memory, mock_config):
+        """Test originals deleted by persist_download are counted once and never batch-deleted again."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mock_config.get.side_effect = lambda key, default=None: {
+                'audio_file_types': {'include': ['.mp3']},
+                'download': {'add_timestamps': False, 'delete_after_download': True, 'delete_batch_size': 100,
+                             'in_memory_max_bytes': 1024}
+            }.get(key, default)
+            mock_config.__getitem__.return_value = {'downloads_dir': tmp_dir}
+            mock_manifest.find_download.return_value = None
+            mock_download_to_memory.side_effect = lambda service, file_id, output_path, md5_checksum: {
+                'success': True, 'saved_as': str(output_path), 'file_id': file_id,
+                'buffer': io.BytesIO(b'memo'), 'in_memory': True
+            }
+            # The second original cannot be deleted
+            mock_delete_file.side_effect = lambda service, file_id, file_name: file_id == 'file1_id'
+            
+            # The consumer persists each download before on_download returns
+            items = [
+                {'id': 'file1_id', 'name': 'file1.mp3', 'size': '4'},
+                {'id': 'file2_id', 'name': 'file2.mp3', 'size': '4'}
+            ]
+            result = process_folder(MagicMock(), 'test_folder_id', 'TestFolder', items=items,
+                                    on_download=persist_download, in_memory=True)
+            
+            # Assert each original was deleted once, by persist_download, and counted
+            self.assertEqual(mock_delete_file.call_count, 2)
+            mock_delete_files_batch.assert_not_called()
+            self.assertEqual(result['downloaded_files'], 2)
+            self.assertEqual(result['deleted_files'], 1)
+            self.assertEqual(sorted(os.listdir(tmp_dir)), ['file1.mp3', 'file2.mp3'])
+
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_manifest')
+    def test_process_folder_skips_manifest_entries(self, mock_manifest, mock_download_file, mock_config):
+        """Test files found in the download manifest are not downloaded again."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        mock_service.files().list().execute.return_value = {
+            'files': [
+                {'id': 'file1_id', 'name': 'file1.mp3', 'md5Checksum': 'abc'},
+                {'id': 'file2_id', 'name': 'file2.mp3', 'md5Checksum': 'def'}
+            ]
+        }
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': False}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_download_file.return_value = {'success': True}
+        
+        # The first file was downloaded by an earlier run
+        mock_manifest.find_download.side_effect = lambda file_id, md5: (
+            {'file_id': 'file1_id', 'saved_as': '/fake/downloads/path/file1.mp3'} if md5 == 'abc' else None
+        )
+        
+        # Call the function
+        result = process_folder(mock_service, 'test_folder_id', 'TestFolder')
+        
+        # Assert only the new file was downloaded and recorded
+        self.assertEqual(result['downloaded_files'], 1)
+        self.assertEqual(result['skipped_files'], 1)
+        mock_download_file.assert_called_once()
+        mock_manifest.record_download.assert_called_once_with(
+            'file2_id', 'def', 'file2.mp3', None, ANY)
+
+class TestDeltaSync(unittest.TestCase):
+    """Tests for delta sync through the Drive changes feed."""
+    
+    def test_collect_changed_files(self):
+        """Test collecting new files in watched folders from the changes feed."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        
+        # Mock two pages of changes
+        mock_service.changes().list().execute.side_effect = [
+            {
+                'changes': [
+                    {'fileId': 'file2_id', 'file': {'id': 'file2_id', 'name': 'b.mp3', 'parents': ['folder_id'],
+                                                    'createdTime': '2025-01-02T00:00:00Z'}},
+                    {'fileId': 'other_id', 'file': {'id': 'other_id', 'name': 'c.mp3', 'parents': ['other_folder']}},
+                    {'fileId': 'gone_id', 'removed': True}
+                ],
+                'nextPageToken': 'page2'
+            },
+            {
+                'changes': [
+                    {'fileId': 'file1_id', 'file': {'id': 'file1_id', 'name': 'a.mp3', 'parents': ['folder_id'],
+                                                    'createdTime': '2025-01-01T00:00:00Z'}},
+                    {'fileId': 'trashed_id', 'file': {'id': 'trashed_id', 'name': 'd.mp3', 'parents': ['folder_id'],
+                                                      'trashed': True}}
+                ],
+                'newStartPageToken': 'new_token'
+            }
+        ]
+        
+        # Call the function
+        changed_files, new_token = collect_changed_files(mock_service, 'old_token', ['folder_id'])
+        
+        # Assert only live files in the watched folder were returned, in creation order
+        self.assertEqual([f['id'] for f in changed_files['folder_id']], ['file1_id', 'file2_id'])
+        self.assertEqual(new_token, 'new_token')
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    def test_process_folder_with_items(self, mock_download_file, mock_config):
+        """Test processing given items without listing the folder."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': False}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_download_file.return_value = {'success': True}
+        
+        # Call the function with pre-collected items
+        items = [{'id': 'file1_id', 'name': 'file1.mp3', 'mimeType': 'audio/mp3'}]
+        result = process_folder(mock_service, 'test_folder_id', 'TestFolder', items=items)
+        
+        # Assert the items were downloaded and the folder was not listed
+        self.assertEqual(result['total_files'], 1)
+        self.assertEqual(result['downloaded_files'], 1)
+        mock_service.files().list.assert_not_called()
+
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    def test_process_folder_calls_on_download(self, mock_download_file, mock_config):
+        """Test that each completed download is handed to the on_download callback."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': False}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_download_file.side_effect = lambda *args, **kwargs: (
+            {'success': True, 'saved_as': '/fake/downloads/path/file1.mp3'}
+            if args[1] == 'file1_id' else {'success': False, 'error': 'boom'}
+        )
+        on_download = MagicMock()
+        
+        # Call the function with one good and one failing download
+        items = [
+            {'id': 'file1_id', 'name': 'file1.mp3', 'mimeType': 'audio/mp3'},
+            {'id': 'file2_id', 'name': 'file2.mp3', 'mimeType': 'audio/mp3'}
+        ]
+        process_folder(mock_service, 'test_folder_id', 'TestFolder', items=items, on_download=on_download)
+        
+        # Assert only the successful download was passed on, with its file type
+        on_download.assert_called_once()
+        download_result = on_download.call_args[0][0]
+        self.assertEqual(download_result['saved_as'], '/fake/downloads/path/file1.mp3')
+        self.assertEqual(download_result['file_type'], 'audio')
+
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    def test_process_folder_keeps_subfolder_path(self, mock_download_file, mock_config):
+        """Test that files from a subfolder are saved under its path."""
+        # Mock Google Drive service
+        mock_service = MagicMock()
+        
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': False}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_download_file.return_value = {'success': True}
+        
+        # Call the function for a subfolder
+        items = [{'id': 'file1_id', 'name': 'file1.mp3', 'mimeType': 'audio/mp3'}]
+        result = process_folder(mock_service, 'month_id', 'a-daily-log/2024/05', '2024/05', items=items)
+        
+        # Assert the file went below the subfolder path and the path is in the stats
+        saved_path = mock_download_file.call_args[0][2]
+        self.assertEqual(Path(saved_path), Path('/fake/downloads/path/2024/05/file1.mp3'))
+        self.assertEqual(result['folder_path'], 'a-daily-log/2024/05')
+
+class TestFolderCache(unittest.TestCase):
+    """Tests for the persistent folder ID cache."""
+    
+    def setUp(self):
+        """Point the cache at a temporary state directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        state_dir = Path(self.tmp_dir.name)
+        patchers = [
+            patch('voice_diary.dwnload_files.dwnload_files.STATE_DIR', state_dir),
+            patch('voice_diary.dwnload_files.dwnload_files.FOLDER_CACHE_FILE', state_dir / 'folder_id_cache.json'),
+            patch.dict('voice_diary.dwnload_files.dwnload_files.CONFIG',
+                       {'folder_cache': {'enabled': True, 'ttl_seconds': 3600}})
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        load_folder_cache()
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.find_folders_by_name')
+    def test_resolve_folder_ids_uses_cache(self, mock_find_folders_by_name):
+        """Test cached folders are not looked up again, even by a later run."""
+        mock_find_folders_by_name.return_value = {'One': 'folder1_id'}
+        
+        # First run looks the folder up and caches it
+        self.assertEqual(resolve_folder_ids(MagicMock(), ['One']), {'One': 'folder1_id'})
+        
+        # A later run reads the cache from disk
+        load_folder_cache()
+        self.assertEqual(resolve_folder_ids(MagicMock(), ['One']), {'One': 'folder1_id'})
+        mock_find_folders_by_name.assert_called_once()
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.find_folders_by_name')
+    def test_expired_entries_are_looked_up(self, mock_find_folders_by_name):
+        """Test cache entries older than the TTL are resolved again."""
+        mock_find_folders_by_name.return_value = {'One': 'new_folder_id'}
+        cache_folder_id('One', 'old_folder_id')
+        
+        with patch('voice_diary.dwnload_files.dwnload_files.time.time', return_value=time.time() + 7200):
+            result = resolve_folder_ids(MagicMock(), ['One'])
+        
+        self.assertEqual(result, {'One': 'new_folder_id'})
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.find_folders_by_name')
+    def test_invalidated_entries_are_looked_up(self, mock_find_folders_by_name):
+        """Test a folder ID reported as not found is resolved again."""
+        mock_find_folders_by_name.return_value = {'One': 'new_folder_id'}
+        cache_folder_id('One', 'old_folder_id')
+        
+        self.assertEqual(invalidate_cached_folder_id('old_folder_id'), ['One'])
+        
+        self.assertEqual(resolve_folder_ids(MagicMock(), ['One']), {'One': 'new_folder_id'})
+
+class TestDryRunPlan(unittest.TestCase):
+    """Tests for the dry run plan and the recorded download throughput."""
+    
+    def setUp(self):
+        """Point the throughput record at a temporary state directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        state_dir = Path(self.tmp_dir.name)
+        patchers = [
+            patch('voice_diary.dwnload_files.dwnload_files.STATE_DIR', state_dir),
+            patch('voice_diary.dwnload_files.dwnload_files.THROUGHPUT_FILE', state_dir / 'download_throughput.json')
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    def test_process_folder_dry_run_plans_files(self, mock_download_file, mock_config):
+        """Test that a dry run records each file it would download."""
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': True}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        
+        # Call the function in dry run mode
+        items = [{'id': 'file1_id', 'name': 'file1.mp3', 'mimeType': 'audio/mp3', 'size': '2048'}]
+        result = process_folder(MagicMock(), 'test_folder_id', 'TestFolder', dry_run=True, items=items)
+        
+        # Assert nothing was downloaded and the file is in the plan
+        mock_download_file.assert_not_called()
+        self.assertEqual(result['planned_files'], [{
+            'file_id': 'file1_id',
+            'name': 'file1.mp3',
+            'folder': 'TestFolder',
+            'type': 'audio',
+            'size': 2048,
+            'destination': str(Path('/fake/downloads/path/file1.mp3')),
+            'delete_after_download': True
+        }])
+    
+    @patch('voice_diary.dwnload_files.dwnload_files.CONFIG')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_file')
+    @patch('voice_diary.dwnload_files.dwnload_files.download_manifest')
+    def test_process_folder_sums_transfer_time(self, mock_manifest, mock_download_file, mock_config):
+        """Test throughput is based on the time spent in transfers, not the whole folder."""
+        mock_config.get.side_effect = lambda key, default=None: {
+            'audio_file_types': {'include': ['.mp3']},
+            'download': {'add_timestamps': False, 'delete_after_download': False}
+        }.get(key, default)
+        mock_config.__getitem__.return_value = {'downloads_dir': '/fake/downloads/path'}
+        mock_manifest.find_download.return_value = None
+        mock_download_file.side_effect = lambda service, file_id, path, **kwargs: {
+            'success': True, 'transfer_seconds': 1.5 if file_id == 'file1_id' else 0.5
+        }
+        
+        items = [
+            {'id': 'file1_id', 'name': 'file1.mp3', 'size': '3000'},
+            {'id': 'file2_id', 'name': 'file2.mp3', 'size': '1000'}
+        ]
+        result = process_folder(MagicMock(), 'test_folder_id', 'TestFolder', items=items)
+        
+        # Assert the transfer durations of both downloads were added up
+        self.assertEqual(result['downloaded_bytes'], 4000)
+        self.assertAlmostEqual(result['transfer_seconds'], 2.0)
+    
+    def test_build_dry_run_plan_without_throughput(self):
+        """Test the plan totals when no throughput has been recorded yet."""
+        folder_stats = [{'planned_files': [
+            {'type': 'audio', 'size': 1000, 'delete_after_download': True},
+            {'type': 'image', 'size': None, 'delete_after_download': False}
+        ]}]
+        
+        plan = build_dry_run_plan(folder_stats)
+        
+        # Assert the totals and that no time is estimated
+        self.assertEqual(plan['totals']['files'], 2)
+        self.assertEqual(plan['totals']['bytes'], 1000)
+        self.assertEqual(plan['totals']['files_without_size'], 1)
+        self.assertEqual(plan['totals']['deletes'], 1)
+        self.assertEqual(plan['totals']['by_type']['audio'], {'files': 1, 'bytes': 1000})
+        self.assertIsNone(plan['estimate']['download_seconds'])
+    
+    def test_build_dry_run_plan_uses_recorded_throughput(self):
+        """Test the time estimate uses the throughput of earlier runs."""
+        record_throughput(4000, 2.0)
+        folder_stats = [{'planned_files': [
+            {'type': 'audio', 'size': 6000, 'delete_after_download': False}
+        ]}]
+        
+        plan = build_dry_run_plan(folder_stats)
+        
+        # Assert 6000 bytes at 2000 bytes/s take 3 seconds
+        self.assertEqual(plan['estimate']['bytes_per_second'], 2000)
+        self.assertAlmostEqual(plan['estimate']['download_seconds'], 3.0)
+        self.assertEqual(plan['estimate']['based_on_runs'], 1)
+    
+    def test_record_throughput_spreads_parallel_transfers_over_workers(self):
+        """Test the summed transfer time of parallel downloads is divided by the worker count."""
+        # Four workers spent 8 seconds in transfers between them, 2 seconds of wall time
+        record_throughput(4000, 8.0, workers=4)
+        folder_stats = [{'planned_files': [
+            {'type': 'audio', 'size': 6000, 'delete_after_download': False}
+        ]}]
+        
+        plan = build_dry_run_plan(folder_stats)
+        
+        # Assert the estimate uses the run's combined throughput
+        self.assertEqual(plan['estimate']['bytes_per_second'], 2000)
+        self.assertAlmostEqual(plan['estimate']['download_seconds'], 3.0)
+        self.assertEqual(plan['estimate']['workers'], 4)
+    
+    def test_record_throughput_ignores_empty_runs(self):
+        """Test that runs without downloads leave the throughput unchanged."""
+        record_throughput(0, 5.0)
+        
+        # Assert nothing was recorded
+        self.assertFalse((Path(self.tmp_dir.name) / 'download_throughput.json').exists())
+
 
 class TestLoggingConfiguration(unittest.TestCase):
     """Tests for the logging configuration."""
@@ -0,0 +1 @@
+"""Voice Diary package."""
\ No newline at end of file
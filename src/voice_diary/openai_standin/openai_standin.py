@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+OpenAI Stand-in Server
+
+A local, OpenAI-compatible HTTP server for load-testing the transcription and
+summarizing scripts without the real endpoints or any spend. It implements:
+- POST /v1/audio/transcriptions
+- POST /v1/chat/completions
+- the Assistants endpoints used by agent_summarize_day (assistants, threads,
+  messages and runs)
+
+Responses are deterministic: the same audio or prompt always gives the same
+text. Latency follows a configurable distribution per endpoint, and 429 and
+500 errors are injected at configurable rates, both drawn from a seeded
+random generator so benchmark runs can be repeated. GET /stats reports
+request counts, injected errors and the peak number of concurrent requests.
+
+Point a script at it through its api_endpoint setting, e.g.
+http://127.0.0.1:8765/v1/chat/completions; the OpenAI clients use the part up
+to /v1 as their base URL. Any API key is accepted.
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import logging
+import threading
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# Constants
+SCRIPT_DIR = Path(sys._MEIPASS) if getattr(sys, 'frozen', False) else Path(__file__).resolve().parent
+CONFIG_PATH = SCRIPT_DIR / "openai_standin_config" / "openai_standin_config.json"
+
+# Words the deterministic transcripts and replies are made of
+VOCABULARY = (
+    "today morning walked coffee meeting project idea remember call family friend write plan "
+    "finished started tomorrow evening worked read garden weather quiet busy tired happy "
+    "thought about the a and to of in for with on was it this that we I some then later"
+).split()
+
+# Rough audio bytes per spoken word, used to size transcripts to the upload
+BYTES_PER_WORD = 4000
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Server state shared by the request threads
+_state = {
+    'assistants': {},
+    'threads': {},
+    'messages': {},
+    'runs': {},
+    'stats': {'requests': {}, 'errors': {'429': 0, '500': 0}, 'in_flight': 0, 'peak_in_flight': 0},
+}
+_state_lock = threading.RLock()
+
+# Seeded generator for latencies and injected errors
+_random = random.Random(0)
+_random_lock = threading.Lock()
+
+
+def load_config(config_path=CONFIG_PATH):
+    """Load the stand-in configuration from its JSON file."""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading configuration: {str(e)}")
+        sys.exit(1)
+
+
+def reset_state(seed=0):
+    """Clear all assistants, threads and statistics and reseed the random generator."""
+    global _random
+
+    with _state_lock:
+        for key in ('assistants', 'threads', 'messages', 'runs'):
+            _state[key] = {}
+        _state['stats'] = {'requests': {}, 'errors': {'429': 0, '500': 0}, 'in_flight': 0, 'peak_in_flight': 0}
+    with _random_lock:
+        _random = random.Random(seed)
+
+
+def sample_latency(spec, size_bytes=0):
+    """Draw a response time in seconds from an endpoint's latency settings.
+
+    Args:
+        spec: Latency settings: 'distribution' ('fixed', 'uniform', 'normal',
+            'lognormal' or 'exponential') with its parameters, optional
+            'seconds_per_mb' added per megabyte of request body, and
+            'min_seconds'/'max_seconds' bounds
+        size_bytes: Size of the request body
+
+    Returns:
+        float: Latency in seconds
+    """
+    distribution = spec.get('distribution', 'fixed')
+    min_seconds = spec.get('min_seconds', 0.0)
+    max_seconds = spec.get('max_seconds', math.inf)
+
+    with _random_lock:
+        if distribution == 'uniform':
+            value = _random.uniform(min_seconds, spec.get('max_seconds', min_seconds))
+        elif distribution == 'normal':
+            value = _random.gauss(spec.get('mean_seconds', 1.0), spec.get('stddev_seconds', 0.0))
+        elif distribution == 'lognormal':
+            value = _random.lognormvariate(math.log(spec.get('median_seconds', 1.0)), spec.get('sigma', 0.0))
+        elif distribution == 'exponential':
+            value = _random.expovariate(1.0 / spec.get('mean_seconds', 1.0))
+        else:
+            value = spec.get('seconds', 0.0)
+
+    value += spec.get('seconds_per_mb', 0.0) * size_bytes / 1_000_000
+    return min(max(value, min_seconds), max_seconds)
+
+
+def draw_error(errors_config, endpoint):
+    """Decide whether to fail a request with an injected error.
+
+    Returns:
+        int: 429 or 500, or None to answer normally
+    """
+    if endpoint not in errors_config.get('endpoints', []):
+        return None
+
+    with _random_lock:
+        draw = _random.random()
+    if draw < errors_config.get('rate_429', 0.0):
+        return 429
+    if draw < errors_config.get('rate_429', 0.0) + errors_config.get('rate_500', 0.0):
+        return 500
+    return None
+
+
+def deterministic_text(seed_bytes, word_count):
+    """Build text that depends only on 'seed_bytes', so equal inputs get equal outputs."""
+    rng = random.Random(hashlib.sha256(seed_bytes).digest())
+    words = [rng.choice(VOCABULARY) for _ in range(max(1, word_count))]
+    sentences = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    return " ".join(sentence[0].upper() + sentence[1:] + "." for sentence in sentences)
+
+
+def count_tokens(text):
+    """Estimate the number of tokens in a text (about four characters each)."""
+    return max(1, len(text) // 4)
+
+
+def new_id(prefix):
+    """Create an OpenAI-style object ID."""
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def parse_multipart(content_type, body):
+    """Parse a multipart/form-data body into form fields and uploaded files.
+
+    Returns:
+        tuple: (dict of field name -> str, dict of field name -> (file name, bytes))
+    """
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body
+    )
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        file_name = part.get_filename()
+        payload = part.get_payload(decode=True) or b""
+        if file_name is not None:
+            files[name] = (file_name, payload)
+        else:
+            fields[name] = payload.decode('utf-8', errors='replace')
+    return fields, files
+
+
+def create_transcription(request):
+    """POST /v1/audio/transcriptions: a transcript sized to and seeded by the audio bytes."""
+    fields, files = parse_multipart(request['content_type'], request['body'])
+    if 'file' not in files:
+        return 400, error_body("Missing 'file' in the request", 'invalid_request_error')
+
+    file_name, audio = files['file']
+    text = deterministic_text(audio, len(audio) // BYTES_PER_WORD + 3)
+    if fields.get('response_format') == 'text':
+        return 200, text
+    return 200, {'text': text}
+
+
+def create_chat_completion(request):
+    """POST /v1/chat/completions: a reply seeded by the model and messages."""
+    payload = json.loads(request['body'] or b"{}")
+    messages = payload.get('messages', [])
+    prompt = json.dumps(messages, sort_keys=True)
+    max_tokens = payload.get('max_tokens') or 300
+    content = deterministic_text(f"{payload.get('model')}|{prompt}".encode('utf-8'), min(max_tokens, 300) // 2)
+
+    prompt_tokens = count_tokens(prompt)
+    completion_tokens = count_tokens(content)
+    return 200, {
+        'id': new_id('chatcmpl'),
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': payload.get('model', 'stand-in'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'logprobs': None,
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+
+def create_assistant(request):
+    """POST /v1/assistants"""
+    payload = json.loads(request['body'] or b"{}")
+    assistant = {
+        'id': new_id('asst'),
+        'object': 'assistant',
+        'created_at': int(time.time()),
+        'name': payload.get('name'),
+        'description': payload.get('description'),
+        'model': payload.get('model', 'stand-in'),
+        'instructions': payload.get('instructions'),
+        'tools': payload.get('tools', []),
+        'metadata': payload.get('metadata', {})
+    }
+    with _state_lock:
+        _state['assistants'][assistant['id']] = assistant
+    return 200, assistant
+
+
+def get_assistant(assistant_id):
+    """Get an assistant, creating it if the ID is unknown (e.g. one made on the real API)."""
+    with _state_lock:
+        if assistant_id not in _state['assistants']:
+            _state['assistants'][assistant_id] = {
+                'id': assistant_id, 'object': 'assistant', 'created_at': int(time.time()),
+                'name': None, 'description': None, 'model': 'stand-in', 'instructions': None,
+                'tools': [], 'metadata': {}
+            }
+        return _state['assistants'][assistant_id]
+
+
+def retrieve_assistant(request, assistant_id):
+    """GET /v1/assistants/{assistant_id}"""
+    return 200, get_assistant(assistant_id)
+
+
+def get_thread(thread_id, created_at=None):
+    """Get a thread, creating it if the ID is unknown (e.g. one saved from the real API)."""
+    with _state_lock:
+        if thread_id not in _state['threads']:
+            _state['threads'][thread_id] = {
+                'id': thread_id,
+                'object': 'thread',
+                'created_at': created_at or int(time.time()),
+                'metadata': {}
+            }
+            _state['messages'][thread_id] = []
+        return _state['threads'][thread_id]
+
+
+def create_thread(request):
+    """POST /v1/threads"""
+    thread = get_thread(new_id('thread'))
+    payload = json.loads(request['body'] or b"{}")
+    for message in payload.get('messages', []):
+        add_message(thread['id'], message.get('role', 'user'), message.get('content', ''))
+    return 200, thread
+
+
+def retrieve_thread(request, thread_id):
+    """GET /v1/threads/{thread_id}"""
+    return 200, get_thread(thread_id)
+
+
+def add_message(thread_id, role, content, assistant_id=None, run_id=None):
+    """Append a message to a thread."""
+    get_thread(thread_id)
+    if isinstance(content, list):
+        content = " ".join(part.get('text', '') for part in content if isinstance(part, dict))
+    message = {
+        'id': new_id('msg'),
+        'object': 'thread.message',
+        'created_at': int(time.time()),
+        'thread_id': thread_id,
+        'role': role,
+        'content': [{'type': 'text', 'text': {'value': content, 'annotations': []}}],
+        'assistant_id': assistant_id,
+        'run_id': run_id,
+        'attachments': [],
+        'metadata': {}
+    }
+    with _state_lock:
+        _state['messages'][thread_id].append(message)
+    return message
+
+
+def create_message(request, thread_id):
+    """POST /v1/threads/{thread_id}/messages"""
+    payload = json.loads(request['body'] or b"{}")
+    return 200, add_message(thread_id, payload.get('role', 'user'), payload.get('content', ''))
+
+
+def list_messages(request, thread_id):
+    """GET /v1/threads/{thread_id}/messages (newest first unless order=asc)"""
+    get_thread(thread_id)
+    query = parse_qs(request['query'])
+    limit = int(query.get('limit', ['20'])[0])
+    with _state_lock:
+        messages = list(_state['messages'][thread_id])
+    if query.get('order', ['desc'])[0] != 'asc':
+        messages.reverse()
+    messages = messages[:limit]
+    return 200, {
+        'object': 'list',
+        'data': messages,
+        'first_id': messages[0]['id'] if messages else None,
+        'last_id': messages[-1]['id'] if messages else None,
+        'has_more': False
+    }
+
+
+def create_run(request, thread_id):
+    """POST /v1/threads/{thread_id}/runs: completes after a time drawn from the 'run_duration' settings."""
+    payload = json.loads(request['body'] or b"{}")
+    assistant = get_assistant(payload.get('assistant_id', ''))
+    get_thread(thread_id)
+    now = time.time()
+    run = {
+        'id': new_id('run'),
+        'object': 'thread.run',
+        'created_at': int(now),
+        'thread_id': thread_id,
+        'assistant_id': assistant['id'],
+        'status': 'queued',
+        'model': payload.get('model') or assistant['model'],
+        'instructions': payload.get('instructions') or assistant['instructions'],
+        'tools': [],
+        'metadata': {},
+        'usage': None,
+        'started_at': None,
+        'completed_at': None,
+        'last_error': None
+    }
+    with _state_lock:
+        _state['runs'][run['id']] = {
+            'run': run,
+            'completes_at': now + sample_latency(request['config'].get('latency', {}).get('run_duration', {}))
+        }
+    return 200, dict(run)
+
+
+def retrieve_run(request, thread_id, run_id):
+    """GET /v1/threads/{thread_id}/runs/{run_id}: moves the run along as its time passes."""
+    with _state_lock:
+        entry = _state['runs'].get(run_id)
+    if entry is None or entry['run']['thread_id'] != thread_id:
+        return 404, error_body(f"No run found with id '{run_id}'.", 'invalid_request_error')
+
+    run = entry['run']
+    now = time.time()
+    # Held throughout, so concurrent polls complete a run only once
+    with _state_lock:
+        if run['status'] == 'queued':
+            run.update(status='in_progress', started_at=int(now))
+        if run['status'] == 'in_progress' and now >= entry['completes_at']:
+            prompt = json.dumps([message['content'] for message in _state['messages'][thread_id]])
+            prompt = f"{run['instructions']}|{prompt}"
+            content = deterministic_text(prompt.encode('utf-8'), 150)
+            add_message(thread_id, 'assistant', content, assistant_id=run['assistant_id'], run_id=run_id)
+            prompt_tokens = count_tokens(prompt)
+            completion_tokens = count_tokens(content)
+            run.update(status='completed', completed_at=int(now), usage={
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            })
+        return 200, dict(run)
+
+
+def error_body(message, error_type, code=None):
+    """Build an OpenAI-style error response body."""
+    return {'error': {'message': message, 'type': error_type, 'param': None, 'code': code}}
+
+
+# (method, path pattern, latency and error group, handler)
+ROUTES = [
+    ('POST', re.compile(r'/v1/audio/transcriptions'), 'transcriptions', create_transcription),
+    ('POST', re.compile(r'/v1/chat/completions'), 'chat_completions', create_chat_completion),
+    ('POST', re.compile(r'/v1/assistants'), 'assistants', create_assistant),
+    ('GET', re.compile(r'/v1/assistants/([^/]+)'), 'assistants', retrieve_assistant),
+    ('POST', re.compile(r'/v1/threads'), 'assistants', create_thread),
+    ('GET', re.compile(r'/v1/threads/([^/]+)'), 'assistants', retrieve_thread),
+    ('POST', re.compile(r'/v1/threads/([^/]+)/messages'), 'assistants', create_message),
+    ('GET', re.compile(r'/v1/threads/([^/]+)/messages'), 'assistants', list_messages),
+    ('POST', re.compile(r'/v1/threads/([^/]+)/runs'), 'runs', create_run),
+    ('GET', re.compile(r'/v1/threads/([^/]+)/runs/([^/]+)'), 'runs', retrieve_run),
+]
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the endpoint handlers, adding latency and injected errors."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "OpenAIStandIn/1.0"
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+
+        if method == 'GET' and path == '/stats':
+            with _state_lock:
+                stats = json.loads(json.dumps(_state['stats']))
+            return self.send_json(200, stats)
+
+        for route_method, pattern, endpoint, handler in ROUTES:
+            match = pattern.fullmatch(path)
+            if route_method == method and match:
+                break
+        else:
+            return self.send_json(404, error_body(f"Unknown endpoint {method} {path}", 'invalid_request_error'))
+
+        config = self.server.config
+        with _state_lock:
+            stats = _state['stats']
+            stats['requests'][endpoint] = stats['requests'].get(endpoint, 0) + 1
+            stats['in_flight'] += 1
+            stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+        try:
+            time.sleep(sample_latency(config.get('latency', {}).get(endpoint, {}), len(body)))
+
+            errors_config = config.get('errors', {})
+            error_status = draw_error(errors_config, endpoint)
+            if error_status is not None:
+                with _state_lock:
+                    _state['stats']['errors'][str(error_status)] += 1
+                if error_status == 429:
+                    return self.send_json(429, error_body("Rate limit reached (injected by the stand-in server)",
+                                                          'requests', 'rate_limit_exceeded'),
+                                          {'Retry-After': str(errors_config.get('retry_after_seconds', 1))})
+                return self.send_json(500, error_body("Internal server error (injected by the stand-in server)",
+                                                      'server_error'))
+
+            request = {
+                'body': body,
+                'query': url.query,
+                'content_type': self.headers.get('Content-Type', ''),
+                'config': config
+            }
+            status, payload = handler(request, *match.groups())
+            return self.send_json(status, payload)
+        except Exception as e:
+            logger.error(f"Error handling {method} {path}: {str(e)}")
+            return self.send_json(400, error_body(str(e), 'invalid_request_error'))
+        finally:
+            with _state_lock:
+                _state['stats']['in_flight'] -= 1
+
+    def send_json(self, status, payload, headers=None):
+        if isinstance(payload, str):
+            data, content_type = payload.encode('utf-8'), 'text/plain; charset=utf-8'
+        else:
+            data, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+def create_server(config, host=None, port=None):
+    """Create the stand-in server (not yet serving).
+
+    Args:
+        config: The stand-in configuration
+        host: Address to listen on (defaults to the config, then 127.0.0.1)
+        port: Port to listen on (defaults to the config, then 8765; 0 picks a free port)
+
+    Returns:
+        ThreadingHTTPServer: The server, with the configuration as its 'config' attribute
+    """
+    server_config = config.get('server', {})
+    host = host if host is not None else server_config.get('host', '127.0.0.1')
+    port = port if port is not None else server_config.get('port', 8765)
+
+    reset_state(config.get('seed', 0))
+    server = ThreadingHTTPServer((host, port), StandInRequestHandler)
+    server.daemon_threads = True
+    server.config = config
+    return server
+
+
+def main():
+    """Entry point for the script when run directly."""
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stand-in server for benchmarking")
+    parser.add_argument("--config", default=str(CONFIG_PATH), help="Path to the stand-in config file")
+    parser.add_argument("--host", help="Address to listen on")
+    parser.add_argument("--port", type=int, help="Port to listen on")
+    parser.add_argument("--seed", type=int, help="Seed for latencies and injected errors")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    logging.basicConfig(level=config.get('logging', {}).get('level', 'INFO'),
+                        format=config.get('logging', {}).get('format', '%(asctime)s - %(levelname)s - %(message)s'))
+    if args.seed is not None:
+        config['seed'] = args.seed
+
+    server = create_server(config, args.host, args.port)
+    host, port = server.server_address[:2]
+    logger.info(f"OpenAI stand-in listening on http://{host}:{port}/v1 (seed {config.get('seed', 0)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping OpenAI stand-in")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Unit tests for openai_standin module."""
+import unittest
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from voice_diary.openai_standin.openai_standin import create_server
+
+# No latency and no injected errors, so the routes answer at once
+TEST_CONFIG = {
+    "server": {"host": "127.0.0.1", "port": 0},
+    "seed": 1,
+    "latency": {"run_duration": {"distribution": "fixed", "seconds": 0.0}},
+    "errors": {"rate_429": 0.0, "rate_500": 0.0, "endpoints": []},
+}
+
+
+def multipart_body(fields, files, boundary="standin-test-boundary"):
+    """Build a multipart/form-data body and its content type."""
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (file_name, data) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{file_name}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class StandInTestCase(unittest.TestCase):
+    """Runs a stand-in server on a free port for the test."""
+    
+    def start_server(self, config):
+        server = create_server(config)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+    
+    def request(self, method, path, payload=None, body=None, content_type='application/json'):
+        """Send a request and get (status, headers, decoded body)."""
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if body is not None:
+            request.add_header('Content-Type', content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                status, headers, data = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, data = e.code, e.headers, e.read()
+        if headers.get('Content-Type', '').startswith('application/json'):
+            return status, headers, json.loads(data)
+        return status, headers, data.decode('utf-8')
+
+
+class TestStandInServer(StandInTestCase):
+    """Tests for the routes of the stand-in server."""
+    
+    def setUp(self):
+        self.start_server(TEST_CONFIG)
+    
+    def test_transcription_is_deterministic(self):
+        """Test the same audio always gets the same transcript."""
+        body, content_type = multipart_body({"model": "whisper-1"}, {"file": ("memo.mp3", b'\x01' * 20000)})
+        
+        status, _, first = self.request('POST', '/v1/audio/transcriptions', body=body, content_type=content_type)
+        _, _, second = self.request('POST', '/v1/audio/transcriptions', body=body, content_type=content_type)
+        
+        self.assertEqual(status, 200)
+        self.assertTrue(first['text'])
+        self.assertEqual(first, second)
+    
+    def test_transcription_as_text(self):
+        """Test response_format=text answers with plain text."""
+        body, content_type = multipart_body({"model": "whisper-1", "response_format": "text"},
+                                            {"file": ("memo.mp3", b'\x02' * 100)})
+        
+        status, headers, text = self.request('POST', '/v1/audio/transcriptions', body=body, content_type=content_type)
+        
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['Content-Type'].startswith('text/plain'))
+        self.assertTrue(text.endswith('.'))
+    
+    def test_transcription_without_file(self):
+        """Test a transcription request without audio is rejected."""
+        body, content_type = multipart_body({"model": "whisper-1"}, {})
+        
+        status, _, payload = self.request('POST', '/v1/audio/transcriptions', body=body, content_type=content_type)
+        
+        self.assertEqual(status, 400)
+        self.assertEqual(payload['error']['type'], 'invalid_request_error')
+    
+    def test_chat_completion(self):
+        """Test a chat completion has a reply and token usage."""
+        payload = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Summarize my day"}]}
+        
+        status, _, completion = self.request('POST', '/v1/chat/completions', payload)
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(completion['object'], 'chat.completion')
+        self.assertTrue(completion['choices'][0]['message']['content'])
+        usage = completion['usage']
+        self.assertEqual(usage['total_tokens'], usage['prompt_tokens'] + usage['completion_tokens'])
+    
+    def test_assistant_run_flow(self):
+        """Test an assistant run on a thread completes and adds the assistant's reply."""
+        _, _, assistant = self.request('POST', '/v1/assistants', {"model": "gpt-4o", "instructions": "Summarize"})
+        _, _, thread = self.request('POST', '/v1/threads', {})
+        self.request('POST', f"/v1/threads/{thread['id']}/messages", {"role": "user", "content": "Today I walked"})
+        
+        _, _, run = self.request('POST', f"/v1/threads/{thread['id']}/runs", {"assistant_id": assistant['id']})
+        status, _, polled = self.request('GET', f"/v1/threads/{thread['id']}/runs/{run['id']}")
+        _, _, messages = self.request('GET', f"/v1/threads/{thread['id']}/messages")
+        
+        # Assert the run completed and its reply is the newest message
+        self.assertEqual(run['status'], 'queued')
+        self.assertEqual(status, 200)
+        self.assertEqual(polled['status'], 'completed')
+        self.assertEqual([message['role'] for message in messages['data']], ['assistant', 'user'])
+        self.assertEqual(messages['data'][0]['run_id'], run['id'])
+    
+    def test_unknown_run_and_route(self):
+        """Test unknown runs and endpoints answer 404."""
+        _, _, thread = self.request('POST', '/v1/threads', {})
+        
+        run_status, _, _ = self.request('GET', f"/v1/threads/{thread['id']}/runs/run_missing")
+        route_status, _, payload = self.request('GET', '/v1/models')
+        
+        self.assertEqual(run_status, 404)
+        self.assertEqual(route_status, 404)
+        self.assertIn('Unknown endpoint', payload['error']['message'])
+    
+    def test_stats_count_requests(self):
+        """Test /stats counts requests per endpoint."""
+        self.request('POST', '/v1/chat/completions', {"model": "gpt-4o", "messages": []})
+        self.request('POST', '/v1/chat/completions', {"model": "gpt-4o", "messages": []})
+        
+        status, _, stats = self.request('GET', '/stats')
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(stats['requests'], {'chat_completions': 2})
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreaterEqual(stats['peak_in_flight'], 1)
+
+
+class TestStandInErrors(StandInTestCase):
+    """Tests for errors injected by the stand-in server."""
+    
+    def test_injected_rate_limit(self):
+        """Test an injected 429 carries Retry-After and is counted."""
+        config = dict(TEST_CONFIG, errors={"rate_429": 1.0, "retry_after_seconds": 3, "endpoints": ["chat_completions"]})
+        self.start_server(config)
+        
+        status, headers, payload = self.request('POST', '/v1/chat/completions', {"model": "gpt-4o", "messages": []})
+        _, _, stats = self.request('GET', '/stats')
+        
+        self.assertEqual(status, 429)
+        self.assertEqual(headers['Retry-After'], '3')
+        self.assertEqual(payload['error']['code'], 'rate_limit_exceeded')
+        self.assertEqual(stats['errors']['429'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+"""
+Audio Chunking
+
+Splits long recordings into bounded chunks for transcription. Cuts are placed
+in detected silences where possible, so words are not split, and neighbouring
+chunks overlap slightly; the duplicated words at each boundary are removed
+again when the chunk transcripts are stitched together. Uses ffmpeg for
+silence detection and for cutting.
+"""
+
+import re
+import logging
+import subprocess
+from pathlib import Path
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+SILENCE_START_PATTERN = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+SILENCE_END_PATTERN = re.compile(r'silence_end: (-?\d+(?:\.\d+)?)')
+DURATION_PATTERN = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+WORD_PATTERN = re.compile(r"[\w']+")
+
+# Shortest and longest run of words treated as the overlap between chunks
+MIN_OVERLAP_WORDS = 2
+MAX_OVERLAP_WORDS = 40
+
+
+def detect_silences(file_path, threshold_db=-35, min_silence_seconds=0.5):
+    """Find the silent stretches of an audio file with ffmpeg's silencedetect filter.
+
+    Args:
+        file_path: Path of the audio file
+        threshold_db: Level below which audio counts as silence
+        min_silence_seconds: Shortest pause that counts as a silence
+
+    Returns:
+        tuple: (list of (start, end) silences in seconds, duration in seconds or None)
+    """
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats",
+            "-i", str(file_path),
+            "-af", f"silencedetect=noise={threshold_db}dB:d={min_silence_seconds}",
+            "-f", "null", "-"
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        shell=False
+    )
+    output = result.stderr
+
+    duration = None
+    duration_match = DURATION_PATTERN.search(output)
+    if duration_match:
+        hours, minutes, seconds = duration_match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    starts = [float(value) for value in SILENCE_START_PATTERN.findall(output)]
+    ends = [float(value) for value in SILENCE_END_PATTERN.findall(output)]
+    # A silence running to the end of the file has no silence_end
+    if duration is not None and len(ends) < len(starts):
+        ends.append(duration)
+
+    return list(zip(starts, ends)), duration
+
+
+def plan_chunks(duration, silences, max_chunk_seconds, overlap_seconds=1.0, min_chunk_seconds=None):
+    """Choose where to cut a recording into chunks.
+
+    Each chunk ends in the middle of the latest silence that keeps it within
+    'max_chunk_seconds' (but not before 'min_chunk_seconds'); without such a
+    silence it is cut at the maximum length. Every chunk after the first
+    starts 'overlap_seconds' before the previous cut.
+
+    Args:
+        duration: Length of the recording in seconds
+        silences: (start, end) silences in seconds, in order
+        max_chunk_seconds: Maximum chunk length
+        overlap_seconds: Audio repeated at the start of each following chunk
+        min_chunk_seconds: Shortest chunk worth cutting at a silence
+            (defaults to half the maximum)
+
+    Returns:
+        list: (start, end) times of the chunks in seconds
+    """
+    if min_chunk_seconds is None:
+        min_chunk_seconds = max_chunk_seconds / 2
+    cut_points = [(start + end) / 2 for start, end in silences]
+
+    chunks = []
+    chunk_start = 0.0
+    while duration - chunk_start + (overlap_seconds if chunks else 0.0) > max_chunk_seconds:
+        # The chunk may reach back into the previous one by the overlap
+        limit = chunk_start + max_chunk_seconds - overlap_seconds
+        candidates = [cut for cut in cut_points if chunk_start + min_chunk_seconds <= cut <= limit]
+        cut = candidates[-1] if candidates else limit
+        chunks.append((max(0.0, chunk_start - overlap_seconds) if chunks else 0.0, cut))
+        chunk_start = cut
+
+    chunks.append((max(0.0, chunk_start - overlap_seconds) if chunks else 0.0, duration))
+    return chunks
+
+
+def extract_chunk(file_path, start, end, output_path, bitrate="64k"):
+    """Cut one chunk out of a recording as a mono 16 kHz MP3.
+
+    Args:
+        file_path: Path of the recording
+        start: Start of the chunk in seconds
+        end: End of the chunk in seconds
+        output_path: Path of the chunk file to write
+        bitrate: MP3 bitrate of the chunk
+
+    Returns:
+        Path: The chunk file
+
+    Raises:
+        RuntimeError: If ffmpeg fails
+    """
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats", "-y",
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", str(file_path),
+            "-ac", "1", "-ar", "16000", "-b:a", bitrate,
+            str(output_path)
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        shell=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to cut {file_path} at {start:.1f}-{end:.1f}s: "
+                           f"{result.stderr.strip()[-200:]}")
+    return Path(output_path)
+
+
+def split_audio_file(file_path, output_dir, max_chunk_seconds, overlap_seconds=1.0,
+                     threshold_db=-35, min_silence_seconds=0.5, duration=None):
+    """Split a recording into chunk files, cutting at silences where possible.
+
+    Args:
+        file_path: Path of the recording
+        output_dir: Directory to write the chunk files to
+        max_chunk_seconds: Maximum chunk length
+        overlap_seconds: Audio repeated at the start of each following chunk
+        threshold_db: Level below which audio counts as silence
+        min_silence_seconds: Shortest pause that counts as a silence
+        duration: Length of the recording if already known
+
+    Returns:
+        list: Chunk file paths in order
+    """
+    file_path = Path(file_path)
+    silences, detected_duration = detect_silences(file_path, threshold_db, min_silence_seconds)
+    duration = duration or detected_duration
+    if not duration:
+        raise RuntimeError(f"Could not determine the duration of {file_path}")
+
+    chunks = plan_chunks(duration, silences, max_chunk_seconds, overlap_seconds)
+    logger.info(f"Splitting {file_path.name} ({duration:.0f}s) into {len(chunks)} chunk(s) "
+                f"using {len(silences)} detected silence(s)")
+
+    return [
+        extract_chunk(file_path, start, end, Path(output_dir) / f"{file_path.stem}_chunk{i:03d}.mp3")
+        for i, (start, end) in enumerate(chunks)
+    ]
+
+
+def normalize_words(text):
+    """Split text into lower-case words without punctuation, for comparing overlaps."""
+    return [word.lower() for word in WORD_PATTERN.findall(text)]
+
+
+def stitch_transcripts(texts, min_overlap_words=MIN_OVERLAP_WORDS, max_overlap_words=MAX_OVERLAP_WORDS):
+    """Join chunk transcripts, removing words repeated because of the chunk overlap.
+
+    For each boundary the longest run of words that ends the previous chunk
+    and also starts the next one is dropped from the next chunk. Runs shorter
+    than 'min_overlap_words' are kept, as a single repeated word is as likely
+    to be genuine speech.
+
+    Args:
+        texts: Transcripts of consecutive chunks
+        min_overlap_words: Shortest repeated run to remove
+        max_overlap_words: Longest repeated run to look for
+
+    Returns:
+        str: The combined transcript
+    """
+    stitched = ""
+    for text in texts:
+        text = (text or "").strip()
+        if not text:
+            continue
+        if not stitched:
+            stitched = text
+            continue
+
+        previous_words = normalize_words(stitched)[-max_overlap_words:]
+        next_words = normalize_words(text)
+        overlap = 0
+        for length in range(min(len(previous_words), len(next_words)), min_overlap_words - 1, -1):
+            if previous_words[-length:] == next_words[:length]:
+                overlap = length
+                break
+
+        if overlap:
+            # Drop the repeated words (and their punctuation) from the next chunk
+            matches = list(WORD_PATTERN.finditer(text))
+            text = text[matches[overlap - 1].end():].lstrip(" ,.;:!?-")
+        if text:
+            stitched = f"{stitched} {text}"
+
+    return stitched
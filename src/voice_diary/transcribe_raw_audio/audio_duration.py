@@ -0,0 +1,314 @@
+"""
+Audio Duration Probe
+
+Reads the duration of WAV, MP3, M4A, OGG and FLAC files from their container
+headers in-process, so no ffprobe process has to be started for them. Results
+are cached per file path, size and modification time. Other containers fall
+back to ffprobe.
+"""
+
+import os
+import struct
+import logging
+import threading
+import subprocess
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Duration cache keyed by (path, size, mtime_ns)
+_duration_cache = {}
+_duration_cache_lock = threading.Lock()
+
+# MPEG audio bitrates in kbit/s, indexed by [MPEG-1?][layer][bitrate index]
+MP3_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+
+# MPEG audio sample rates, indexed by version bits
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def probe_wav(f, size):
+    """Get the duration of a RIFF/WAVE file from its fmt and data chunks."""
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    byte_rate = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = chunk_header[:4], struct.unpack('<I', chunk_header[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size)
+            if len(fmt) < 12:
+                return None
+            byte_rate = struct.unpack('<I', fmt[8:12])[0]
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # Recorders that were cut off leave a wrong size, so trust the file length
+            data_size = min(chunk_size, size - f.tell())
+            return data_size / byte_rate
+        else:
+            # Chunks are padded to an even length
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def probe_flac(f, size):
+    """Get the duration of a FLAC file from its STREAMINFO block."""
+    header = f.read(4 + 4 + 18)
+    if len(header) < 26 or header[:4] != b'fLaC' or (header[4] & 0x7F) != 0:
+        return None
+
+    streaminfo = header[8:]
+    # 20 bits sample rate, 3 bits channels, 5 bits bits per sample, 36 bits total samples
+    packed = int.from_bytes(streaminfo[10:18], 'big')
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+def probe_ogg(f, size):
+    """Get the duration of an Ogg Vorbis or Opus file from its last page's granule position."""
+    first_page = f.read(27 + 255 + 64)
+    if len(first_page) < 28 or first_page[:4] != b'OggS':
+        return None
+
+    # The first packet starts right after the segment table
+    packet_start = 27 + first_page[26]
+    packet = first_page[packet_start:]
+    if packet[:7] == b'\x01vorbis' and len(packet) >= 16:
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+        pre_skip = 0
+    elif packet[:8] == b'OpusHead' and len(packet) >= 12:
+        # Opus granule positions always count 48 kHz samples
+        sample_rate = 48000
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+    else:
+        return None
+    if not sample_rate:
+        return None
+
+    # The last page header lies within the final 64 KiB (pages are at most ~64 KiB)
+    tail_size = min(size, 65536 + 27)
+    f.seek(size - tail_size)
+    tail = f.read(tail_size)
+    last_page = tail.rfind(b'OggS')
+    while last_page >= 0:
+        if len(tail) >= last_page + 14:
+            granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+            if granule > 0:
+                return max(0, granule - pre_skip) / sample_rate
+        last_page = tail.rfind(b'OggS', 0, last_page)
+    return None
+
+
+def probe_mp4(f, size):
+    """Get the duration of an MP4/M4A file from its moov/mvhd atom."""
+
+    def iter_atoms(start, end):
+        offset = start
+        while offset + 8 <= end:
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                return
+            atom_size, atom_type = struct.unpack('>I4s', header)
+            header_size = 8
+            if atom_size == 1:
+                atom_size = struct.unpack('>Q', f.read(8))[0]
+                header_size = 16
+            elif atom_size == 0:
+                atom_size = end - offset
+            if atom_size < header_size:
+                return
+            yield atom_type, offset + header_size, offset + atom_size
+            offset += atom_size
+
+    for atom_type, body_start, body_end in iter_atoms(0, size):
+        if atom_type != b'moov':
+            # Large mdat atoms are skipped without being read
+            continue
+        for child_type, child_start, _ in iter_atoms(body_start, body_end):
+            if child_type != b'mvhd':
+                continue
+            f.seek(child_start)
+            mvhd = f.read(32)
+            if mvhd[:1] == b'\x01':
+                timescale, duration = struct.unpack('>IQ', mvhd[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', mvhd[12:20])
+            return duration / timescale if timescale else None
+    return None
+
+
+def probe_mp3(f, size):
+    """Get the duration of an MP3 file from its Xing/Info/VBRI header or its bitrate."""
+    header = f.read(10)
+    audio_start = 0
+    if header[:3] == b'ID3' and len(header) == 10:
+        # ID3v2 tag size is a 28-bit "syncsafe" integer
+        tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        audio_start = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+
+    f.seek(audio_start)
+    data = f.read(65536)
+    for i in range(len(data) - 4):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            continue
+        b1, b2, b3 = data[i + 1], data[i + 2], data[i + 3]
+        version_bits = (b1 >> 3) & 0x03
+        layer_bits = (b1 >> 1) & 0x03
+        bitrate_index = (b2 >> 4) & 0x0F
+        sample_rate_index = (b2 >> 2) & 0x03
+        if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            continue
+
+        mpeg1 = version_bits == 3
+        layer = 4 - layer_bits
+        bitrate = MP3_BITRATES[mpeg1][layer][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+        if layer == 1:
+            samples_per_frame = 384
+        elif layer == 3 and not mpeg1:
+            samples_per_frame = 576
+        else:
+            samples_per_frame = 1152
+
+        # A Xing/Info header (VBR files) holds the exact frame count
+        mono = (b3 >> 6) == 3
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = i + 4 + side_info
+        if data[xing:xing + 4] in (b'Xing', b'Info') and data[xing + 7] & 0x01:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+            return frames * samples_per_frame / sample_rate
+        vbri = i + 4 + 32
+        if data[vbri:vbri + 4] == b'VBRI':
+            frames = struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+            return frames * samples_per_frame / sample_rate
+
+        # Constant bitrate: the audio length follows from the byte count
+        audio_bytes = size - audio_start - i
+        f.seek(max(0, size - 128))
+        if f.read(3) == b'TAG':
+            audio_bytes -= 128
+        return audio_bytes * 8 / bitrate
+    return None
+
+
+# Parsers by file extension
+PROBES = {
+    '.wav': probe_wav,
+    '.flac': probe_flac,
+    '.ogg': probe_ogg,
+    '.oga': probe_ogg,
+    '.opus': probe_ogg,
+    '.m4a': probe_mp4,
+    '.mp4': probe_mp4,
+    '.mp3': probe_mp3,
+}
+
+
+def probe_duration(f, file_name, size):
+    """Get the duration of an open audio file from its container header.
+
+    Args:
+        f: Binary file object positioned anywhere
+        file_name: Name of the file, used to pick the parser
+        size: Size of the file in bytes
+
+    Returns:
+        float: Duration in seconds, or None if the container is unknown or unreadable
+    """
+    probe = PROBES.get(os.path.splitext(file_name)[1].lower())
+    if probe is None:
+        return None
+
+    position = f.tell()
+    try:
+        f.seek(0)
+        duration = probe(f, size)
+    except (OSError, struct.error, IndexError, KeyError, ZeroDivisionError) as e:
+        logger.debug(f"Could not parse header of {file_name}: {str(e)}")
+        duration = None
+    finally:
+        f.seek(position)
+
+    return duration if duration and duration > 0 else None
+
+
+def ffprobe_duration(file_path):
+    """Get the duration of an audio file with ffprobe.
+
+    Returns:
+        float: Duration in seconds, or None if ffprobe is missing or fails
+    """
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                str(file_path)
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            shell=False
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError):
+        return None
+
+
+def get_duration(file_path):
+    """Get the duration of an audio file, parsing its header in-process when possible.
+
+    Results are cached per path, size and modification time, so asking again
+    for an unchanged file costs a single stat call.
+
+    Args:
+        file_path: Path of the audio file
+
+    Returns:
+        float: Duration in seconds, or None if it could not be determined
+    """
+    file_path = str(file_path)
+    stat = os.stat(file_path)
+    cache_key = (file_path, stat.st_size, stat.st_mtime_ns)
+
+    with _duration_cache_lock:
+        if cache_key in _duration_cache:
+            return _duration_cache[cache_key]
+
+    with open(file_path, 'rb') as f:
+        duration = probe_duration(f, file_path, stat.st_size)
+    if duration is None:
+        duration = ffprobe_duration(file_path)
+        if duration is None:
+            logger.warning(f"Could not determine the duration of {file_path}")
+
+    with _duration_cache_lock:
+        _duration_cache[cache_key] = duration
+    return duration
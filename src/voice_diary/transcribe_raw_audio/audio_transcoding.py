@@ -0,0 +1,100 @@
+"""
+Audio Transcoding
+
+Transcodes recordings to compact mono, speech-rate, low-bitrate audio before
+they are uploaded for transcription. The work is meant to run on a process
+pool, so this module stays free of the transcription script's side effects
+(logging setup, database connection) and its functions return plain results
+that the caller logs.
+"""
+
+import os
+import tempfile
+import subprocess
+from pathlib import Path
+
+from voice_diary.transcribe_raw_audio import audio_duration
+
+# ffmpeg encoder and file extension per codec
+CODECS = {
+    'opus': ('libopus', '.ogg'),
+    'mp3': ('libmp3lame', '.mp3'),
+}
+
+
+def parse_bitrate(bitrate):
+    """Convert an ffmpeg bitrate such as '24k' to bits per second."""
+    bitrate = str(bitrate).strip().lower()
+    if bitrate.endswith('k'):
+        return int(float(bitrate[:-1]) * 1000)
+    return int(bitrate)
+
+
+def transcode_for_upload(file_path, output_dir, codec='opus', bitrate='24k', sample_rate=16000):
+    """Transcode a recording to mono low-bitrate audio if that makes it smaller.
+
+    Files whose expected output (duration x bitrate) is not smaller than the
+    original are skipped without running ffmpeg, and a transcoded file that
+    still turns out larger is thrown away.
+
+    Args:
+        file_path: Path of the recording
+        output_dir: Directory for the transcoded file
+        codec: 'opus' or 'mp3'
+        bitrate: Target bitrate, e.g. '24k'
+        sample_rate: Target sample rate in Hz
+
+    Returns:
+        dict: 'path' (the file to upload: the transcoded file or the original),
+              'transcoded', 'original_bytes', 'upload_bytes' and, when the
+              original is used, 'reason'
+    """
+    file_path = Path(file_path)
+    original_bytes = os.path.getsize(file_path)
+    result = {
+        'path': str(file_path),
+        'transcoded': False,
+        'original_bytes': original_bytes,
+        'upload_bytes': original_bytes
+    }
+
+    encoder, extension = CODECS[codec]
+    try:
+        duration = audio_duration.get_duration(file_path)
+    except OSError:
+        duration = None
+    if duration is not None and duration * parse_bitrate(bitrate) / 8 >= original_bytes:
+        result['reason'] = 'already compact'
+        return result
+
+    # A unique name, as recordings in different folders can share their name
+    fd, output_path = tempfile.mkstemp(prefix=f"{file_path.stem}_", suffix=extension, dir=output_dir)
+    os.close(fd)
+    output_path = Path(output_path)
+    process = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats", "-y",
+            "-i", str(file_path),
+            "-vn", "-ac", "1", "-ar", str(sample_rate),
+            "-c:a", encoder, "-b:a", str(bitrate),
+            *(["-application", "voip"] if codec == 'opus' else []),
+            str(output_path)
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        shell=False
+    )
+    if process.returncode != 0:
+        output_path.unlink(missing_ok=True)
+        result['reason'] = f"ffmpeg failed: {process.stderr.strip()[-200:]}"
+        return result
+
+    upload_bytes = os.path.getsize(output_path)
+    if upload_bytes >= original_bytes:
+        output_path.unlink()
+        result['reason'] = 'not smaller after transcoding'
+        return result
+
+    result.update(path=str(output_path), transcoded=True, upload_bytes=upload_bytes)
+    return result
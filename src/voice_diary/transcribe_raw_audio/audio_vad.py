@@ -0,0 +1,271 @@
+"""
+Voice Activity Detection
+
+Finds the speech in a recording with a short-time energy pass over its
+decoded PCM samples, vectorized with NumPy. Recordings with (almost) no
+speech, such as pocket recordings and accidental taps, are skipped before
+anything is uploaded, and mostly silent ones are trimmed down to their
+speech. Plain 16-bit WAV files are read directly; anything else is decoded
+with ffmpeg. Samples are processed in blocks, so memory use does not grow
+with the length of the recording.
+"""
+
+import os
+import wave
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Sample rate recordings are decoded to for the analysis
+ANALYSIS_SAMPLE_RATE = 16000
+
+# Length of the sample blocks read at a time
+BLOCK_SECONDS = 30
+
+
+def read_pcm_blocks(file_path, sample_rate=ANALYSIS_SAMPLE_RATE):
+    """Decode a recording to mono 16-bit PCM, block by block.
+
+    Args:
+        file_path: Path of the recording
+        sample_rate: Sample rate to decode to (WAV files keep their own)
+
+    Returns:
+        tuple: (sample rate, iterator of int16 sample arrays), or None if the
+               recording cannot be decoded
+    """
+    file_path = Path(file_path)
+
+    if file_path.suffix.lower() == '.wav':
+        try:
+            with wave.open(str(file_path), 'rb') as wav:
+                plain_pcm = wav.getsampwidth() == 2 and wav.getcomptype() == 'NONE'
+                wav_rate = wav.getframerate()
+        except (wave.Error, EOFError, OSError):
+            plain_pcm = False
+        if plain_pcm:
+            return wav_rate, read_wav_blocks(file_path)
+
+    try:
+        process = subprocess.Popen(
+            [
+                "ffmpeg", "-hide_banner", "-nostats", "-v", "error",
+                "-i", str(file_path),
+                "-vn", "-ac", "1", "-ar", str(sample_rate),
+                "-f", "s16le", "-"
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            shell=False
+        )
+    except OSError as e:
+        logger.warning(f"Could not decode {file_path.name} for voice detection: {str(e)}")
+        return None
+    return sample_rate, read_ffmpeg_blocks(process, sample_rate)
+
+
+def read_wav_blocks(file_path):
+    """Read a 16-bit PCM WAV file in blocks, mixed down to mono."""
+    with wave.open(str(file_path), 'rb') as wav:
+        channels = wav.getnchannels()
+        block_frames = wav.getframerate() * BLOCK_SECONDS
+        while True:
+            data = wav.readframes(block_frames)
+            if not data:
+                return
+            samples = np.frombuffer(data, dtype='<i2')
+            if channels > 1:
+                samples = samples[:len(samples) // channels * channels].reshape(-1, channels)
+                samples = samples.mean(axis=1).astype(np.int16)
+            yield samples
+
+
+def read_ffmpeg_blocks(process, sample_rate):
+    """Read the raw PCM output of an ffmpeg process in blocks."""
+    block_bytes = sample_rate * BLOCK_SECONDS * 2
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                return
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2')
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def frame_levels(samples, frame_size):
+    """Get the level of each complete frame of samples in dBFS."""
+    frame_count = len(samples) // frame_size
+    frames = samples[:frame_count * frame_size].astype(np.float32).reshape(frame_count, frame_size)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    # Digital silence is floored at one quantization step (about -90 dBFS)
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+
+def speech_mask(levels, threshold_db=-45, noise_margin_db=10, max_threshold_db=-30, hangover_frames=10):
+    """Mark the frames that hold speech.
+
+    A frame counts as speech when it is louder than both 'threshold_db' and
+    the recording's noise floor (its quietest frames) plus 'noise_margin_db'.
+    The threshold never rises above 'max_threshold_db', so loud recordings are
+    never taken for silence. Speech is extended by 'hangover_frames' on both
+    sides so word edges and short pauses are kept.
+
+    Returns:
+        numpy.ndarray: Boolean mask with one entry per frame
+    """
+    if len(levels) == 0:
+        return np.zeros(0, dtype=bool)
+
+    noise_floor = np.percentile(levels, 5)
+    threshold = min(max(threshold_db, noise_floor + noise_margin_db), max_threshold_db)
+    mask = levels > threshold
+    if hangover_frames:
+        window = np.ones(2 * hangover_frames + 1)
+        mask = np.convolve(mask.astype(np.float32), window, mode='same') > 0
+    return mask
+
+
+def mask_segments(mask, frame_seconds):
+    """Turn a speech mask into (start, end) times in seconds."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(start * frame_seconds, end * frame_seconds) for start, end in zip(starts, ends)]
+
+
+def analyze_recording(file_path, threshold_db=-45, noise_margin_db=10, max_threshold_db=-30,
+                      frame_seconds=0.03, hangover_seconds=0.3):
+    """Measure how much of a recording is speech.
+
+    Args:
+        file_path: Path of the recording
+        threshold_db: Level a frame must exceed to count as speech
+        noise_margin_db: Margin a frame must exceed the noise floor by
+        max_threshold_db: Upper limit of the speech threshold
+        frame_seconds: Length of the analysis frames
+        hangover_seconds: Time kept around detected speech
+
+    Returns:
+        dict: 'duration_seconds', 'speech_seconds', 'speech_ratio' and
+              'segments' ((start, end) speech times in seconds), or None if
+              the recording cannot be decoded
+    """
+    decoded = read_pcm_blocks(file_path)
+    if decoded is None:
+        return None
+    sample_rate, blocks = decoded
+
+    frame_size = max(1, int(sample_rate * frame_seconds))
+    levels = []
+    remainder = np.zeros(0, dtype=np.int16)
+    for block in blocks:
+        samples = np.concatenate((remainder, block))
+        complete = len(samples) // frame_size * frame_size
+        levels.append(frame_levels(samples[:complete], frame_size))
+        remainder = samples[complete:]
+    levels = np.concatenate(levels) if levels else np.zeros(0)
+    if len(levels) == 0:
+        return None
+
+    frame_seconds = frame_size / sample_rate
+    mask = speech_mask(levels, threshold_db, noise_margin_db, max_threshold_db,
+                       int(round(hangover_seconds / frame_seconds)))
+    duration = len(levels) * frame_seconds
+    speech_seconds = float(np.count_nonzero(mask)) * frame_seconds
+    return {
+        'duration_seconds': duration,
+        'speech_seconds': speech_seconds,
+        'speech_ratio': speech_seconds / duration,
+        'segments': mask_segments(mask, frame_seconds)
+    }
+
+
+def write_speech_wav(file_path, segments, output_path):
+    """Write only the speech segments of a recording to a mono 16-bit WAV file.
+
+    Args:
+        file_path: Path of the recording
+        segments: (start, end) speech times in seconds, in order
+        output_path: Path of the WAV file to write
+
+    Returns:
+        Path: The WAV file, or None if the recording cannot be decoded
+    """
+    decoded = read_pcm_blocks(file_path)
+    if decoded is None:
+        return None
+    sample_rate, blocks = decoded
+    bounds = [(int(start * sample_rate), int(end * sample_rate)) for start, end in segments]
+
+    with wave.open(str(output_path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+
+        block_start = 0
+        for block in blocks:
+            block_end = block_start + len(block)
+            for start, end in bounds:
+                if start < block_end and end > block_start:
+                    wav.writeframes(block[max(start, block_start) - block_start:
+                                          min(end, block_end) - block_start].astype('<i2').tobytes())
+            block_start = block_end
+
+    return Path(output_path)
+
+
+def screen_recording(file_path, output_dir, min_speech_seconds=1.5, skip_below_ratio=0.03,
+                     trim_below_ratio=0.6, **analysis_options):
+    """Decide whether a recording is worth transcribing, trimming it if mostly silent.
+
+    Args:
+        file_path: Path of the recording
+        output_dir: Directory for the trimmed copy
+        min_speech_seconds: Recordings with less speech are skipped
+        skip_below_ratio: Recordings with a lower share of speech are skipped
+        trim_below_ratio: Recordings with a lower share of speech are trimmed
+            to their speech
+        **analysis_options: Passed on to analyze_recording
+
+    Returns:
+        dict: 'decision' ('keep', 'trim' or 'skip'), 'path' (the file to
+              transcribe), and the analysis figures when available
+    """
+    file_path = Path(file_path)
+    analysis = analyze_recording(file_path, **analysis_options)
+    if analysis is None:
+        return {'decision': 'keep', 'path': str(file_path), 'reason': 'not decoded'}
+
+    result = {
+        'duration_seconds': round(analysis['duration_seconds'], 2),
+        'speech_seconds': round(analysis['speech_seconds'], 2),
+        'speech_ratio': round(analysis['speech_ratio'], 4),
+        'path': str(file_path)
+    }
+    if analysis['speech_seconds'] < min_speech_seconds or analysis['speech_ratio'] < skip_below_ratio:
+        result['decision'] = 'skip'
+    elif analysis['speech_ratio'] < trim_below_ratio:
+        # A unique name, as recordings in different folders can share their name
+        fd, output_path = tempfile.mkstemp(suffix='_speech.wav', prefix=f"{file_path.stem}_", dir=output_dir)
+        os.close(fd)
+        trimmed = write_speech_wav(file_path, analysis['segments'], output_path)
+        # The copy is plain PCM, so a compressed recording can shrink less than its silence
+        if trimmed and os.path.getsize(trimmed) < os.path.getsize(file_path):
+            result['decision'] = 'trim'
+            result['path'] = str(trimmed)
+        else:
+            Path(output_path).unlink(missing_ok=True)
+            result['decision'] = 'keep'
+            result['reason'] = 'trimmed copy not smaller' if trimmed else 'not decoded'
+    else:
+        result['decision'] = 'keep'
+    return result
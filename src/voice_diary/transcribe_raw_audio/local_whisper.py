@@ -0,0 +1,86 @@
+"""
+Local Whisper Transcription
+
+Runs a quantized Whisper-family model in-process on the CPU with
+faster-whisper (CTranslate2), as an offline alternative to the whisper-1 API:
+no upload, no per-minute cost and no network dependence. The model is loaded
+once per process and shared by all threads. faster-whisper is an optional
+dependency that is only imported when the local backend is used.
+"""
+
+import os
+import logging
+import threading
+from pathlib import Path
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Loaded model and the options it was loaded with
+_model = None
+_model_options = None
+_model_lock = threading.Lock()
+
+
+def get_model(model="small", compute_type="int8", cpu_threads=None, num_workers=1, download_root=None):
+    """Load the Whisper model, or reuse it if it is already loaded with the same options.
+
+    Args:
+        model: Model size or path, e.g. 'base', 'small' or 'distil-small.en'
+        compute_type: Quantization, e.g. 'int8' or 'int8_float32'
+        cpu_threads: Threads per transcription (defaults to all cores)
+        num_workers: Transcriptions that can run at the same time
+        download_root: Directory for downloaded models (defaults to the Hugging Face cache)
+
+    Returns:
+        faster_whisper.WhisperModel: The loaded model
+
+    Raises:
+        RuntimeError: If faster-whisper is not installed
+    """
+    global _model, _model_options
+
+    options = (model, compute_type, cpu_threads or os.cpu_count() or 1, num_workers, download_root)
+    with _model_lock:
+        if _model is None or _model_options != options:
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError as e:
+                raise RuntimeError("The local transcription backend needs the faster-whisper package "
+                                   "(pip install faster-whisper)") from e
+
+            logger.info(f"Loading local Whisper model '{model}' ({compute_type}, {options[2]} CPU thread(s))")
+            _model = WhisperModel(
+                model,
+                device="cpu",
+                compute_type=compute_type,
+                cpu_threads=options[2],
+                num_workers=num_workers,
+                download_root=download_root
+            )
+            _model_options = options
+        return _model
+
+
+def transcribe(file_path, audio_file=None, beam_size=1, language=None, **model_options):
+    """Transcribe an audio file with the local Whisper model.
+
+    Args:
+        file_path: Path of the audio file
+        audio_file: Optional open binary file to read instead of 'file_path'
+        beam_size: Beam size for decoding (1 is greedy and fastest)
+        language: Language code, or None to detect it
+        **model_options: Passed on to get_model
+
+    Returns:
+        str: The transcription text
+    """
+    whisper = get_model(**model_options)
+    source = audio_file if audio_file is not None else str(file_path)
+    segments, info = whisper.transcribe(source, beam_size=beam_size, language=language)
+
+    # Segments are decoded lazily, as they are read
+    text = " ".join(segment.text.strip() for segment in segments).strip()
+    logger.info(f"Transcribed {Path(file_path).name} locally "
+                f"({info.duration:.1f}s of audio, language '{info.language}')")
+    return text
@@ -0,0 +1 @@
+"""Test package for transcribe_raw_audio."""
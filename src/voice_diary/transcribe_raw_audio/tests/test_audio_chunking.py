@@ -0,0 +1,78 @@
+"""Unit tests for audio_chunking module."""
+import unittest
+
+from voice_diary.transcribe_raw_audio.audio_chunking import (
+    plan_chunks,
+    stitch_transcripts,
+)
+
+
+class TestPlanChunks(unittest.TestCase):
+    """Tests for choosing where to cut long recordings."""
+    
+    def test_short_recording_is_one_chunk(self):
+        """Test a recording within the limit is not cut."""
+        self.assertEqual(plan_chunks(300.0, [(100.0, 101.0)], 600), [(0.0, 300.0)])
+    
+    def test_cuts_in_latest_silence(self):
+        """Test each chunk ends in the middle of the latest silence within the limit."""
+        silences = [(200.0, 202.0), (500.0, 504.0), (900.0, 902.0)]
+        
+        chunks = plan_chunks(1000.0, silences, 600, overlap_seconds=1.0)
+        
+        # Cut at 502, the next chunk reaches back by the overlap
+        self.assertEqual(chunks, [(0.0, 502.0), (501.0, 1000.0)])
+    
+    def test_cuts_at_limit_without_silence(self):
+        """Test a recording without silences is cut at the maximum length less the overlap."""
+        chunks = plan_chunks(1500.0, [], 600, overlap_seconds=2.0)
+        
+        self.assertEqual(chunks, [(0.0, 598.0), (596.0, 1196.0), (1194.0, 1500.0)])
+    
+    def test_ignores_silences_before_min_chunk(self):
+        """Test a silence early in the chunk is not used, so chunks do not get too short."""
+        chunks = plan_chunks(900.0, [(10.0, 12.0)], 600, overlap_seconds=0.0)
+        
+        self.assertEqual(chunks, [(0.0, 600.0), (600.0, 900.0)])
+    
+    def test_chunks_stay_within_limit(self):
+        """Test no chunk, overlap included, is longer than the maximum."""
+        silences = [(start, start + 1.0) for start in range(50, 3600, 170)]
+        
+        chunks = plan_chunks(3600.0, silences, 600, overlap_seconds=1.5)
+        
+        self.assertEqual(chunks[0][0], 0.0)
+        self.assertEqual(chunks[-1][1], 3600.0)
+        for (start, end), (next_start, _) in zip(chunks, chunks[1:]):
+            self.assertAlmostEqual(next_start, end - 1.5)
+        for start, end in chunks:
+            self.assertLessEqual(end - start, 600)
+
+
+class TestStitchTranscripts(unittest.TestCase):
+    """Tests for joining chunk transcripts."""
+    
+    def test_removes_repeated_words(self):
+        """Test words repeated at a chunk boundary appear once."""
+        texts = ["I went to the market today.", "The market today was busy."]
+        
+        self.assertEqual(stitch_transcripts(texts), "I went to the market today. was busy.")
+    
+    def test_keeps_single_repeated_word(self):
+        """Test a single repeated word is kept, as it may be genuine speech."""
+        texts = ["We said no", "no more meetings"]
+        
+        self.assertEqual(stitch_transcripts(texts), "We said no no more meetings")
+    
+    def test_ignores_case_and_punctuation(self):
+        """Test repeats are found regardless of case and punctuation."""
+        texts = ["Call me tomorrow, okay?", "Tomorrow okay. Bye."]
+        
+        self.assertEqual(stitch_transcripts(texts), "Call me tomorrow, okay? Bye.")
+    
+    def test_skips_empty_chunks(self):
+        """Test empty and missing chunk transcripts are skipped."""
+        self.assertEqual(stitch_transcripts(["", None, "Hello there", "  "]), "Hello there")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Unit tests for audio_duration module."""
+import unittest
+import io
+import struct
+
+from voice_diary.transcribe_raw_audio.audio_duration import (
+    probe_wav,
+    probe_mp3,
+    probe_flac,
+    probe_ogg,
+    probe_mp4,
+    probe_duration,
+)
+
+
+def make_wav(data_bytes, declared_size=None, sample_rate=16000):
+    """Build a mono 16-bit WAV file with an extra chunk before its data."""
+    fmt = struct.pack('<HHIIHH', 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    data_size = len(data_bytes) if declared_size is None else declared_size
+    body = (b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            + b'LIST' + struct.pack('<I', 3) + b'abc\x00'
+            + b'data' + struct.pack('<I', data_size) + data_bytes)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def make_ogg_page(granule, packet=b''):
+    """Build an Ogg page header holding at most one small packet."""
+    header = b'OggS' + bytes([0, 0]) + struct.pack('<qIII', granule, 1, 0, 0)
+    return header + bytes([1, len(packet)]) + packet
+
+
+def make_atom(atom_type, body):
+    """Build an MP4 atom."""
+    return struct.pack('>I4s', 8 + len(body), atom_type) + body
+
+
+class TestAudioDuration(unittest.TestCase):
+    """Tests for reading durations from container headers."""
+    
+    def probe(self, probe, data):
+        return probe(io.BytesIO(data), len(data))
+    
+    def test_probe_wav(self):
+        """Test the WAV duration follows from the byte rate, skipping other chunks."""
+        data = make_wav(b'\x00' * 64000)
+        
+        # 64000 bytes at 32000 bytes per second
+        self.assertAlmostEqual(self.probe(probe_wav, data), 2.0)
+    
+    def test_probe_wav_trusts_file_length(self):
+        """Test a WAV file that was cut off is measured by what it holds."""
+        data = make_wav(b'\x00' * 32000, declared_size=64000)
+        
+        self.assertAlmostEqual(self.probe(probe_wav, data), 1.0)
+    
+    def test_probe_wav_rejects_other_files(self):
+        """Test a file that is not RIFF/WAVE is not parsed."""
+        self.assertIsNone(self.probe(probe_wav, b'RIFX' + b'\x00' * 40))
+    
+    def test_probe_mp3_constant_bitrate(self):
+        """Test a CBR MP3 duration follows from its size and bitrate, after an ID3 tag."""
+        # MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo
+        frames = b'\xff\xfb\x90\x00' + b'\x00' * (16000 - 4)
+        data = b'ID3\x03\x00\x00\x00\x00\x00\x00' + frames
+        
+        self.assertAlmostEqual(self.probe(probe_mp3, data), 1.0)
+    
+    def test_probe_mp3_xing_header(self):
+        """Test a VBR MP3 duration is read from the frame count in its Xing header."""
+        frame = b'\xff\xfb\x90\x00' + b'\x00' * 32 + b'Xing' + struct.pack('>II', 1, 100)
+        data = frame + b'\x00' * 1000
+        
+        self.assertAlmostEqual(self.probe(probe_mp3, data), 100 * 1152 / 44100)
+    
+    def test_probe_mp3_without_frames(self):
+        """Test data without an MPEG frame header is not measured."""
+        self.assertIsNone(self.probe(probe_mp3, b'\x00' * 1000))
+    
+    def test_probe_flac(self):
+        """Test the FLAC duration is read from STREAMINFO."""
+        # 20 bits sample rate, 3 bits channels - 1, 5 bits bits per sample - 1, 36 bits total samples
+        packed = (16000 << 44) | (0 << 41) | (15 << 36) | 32000
+        streaminfo = b'\x00' * 10 + packed.to_bytes(8, 'big') + b'\x00' * 16
+        data = b'fLaC' + b'\x00' + (34).to_bytes(3, 'big') + streaminfo
+        
+        self.assertAlmostEqual(self.probe(probe_flac, data), 2.0)
+    
+    def test_probe_ogg_opus(self):
+        """Test the Opus duration comes from the last granule position less the pre-skip."""
+        opus_head = b'OpusHead' + bytes([1, 1]) + struct.pack('<HIhB', 312, 48000, 0, 0)
+        data = make_ogg_page(0, opus_head) + b'\x00' * 500 + make_ogg_page(48000 * 3 + 312)
+        
+        self.assertAlmostEqual(self.probe(probe_ogg, data), 3.0)
+    
+    def test_probe_ogg_vorbis(self):
+        """Test the Vorbis duration uses the sample rate from the identification header."""
+        vorbis_id = b'\x01vorbis' + struct.pack('<IBI', 0, 1, 22050) + b'\x00' * 15
+        data = make_ogg_page(0, vorbis_id) + make_ogg_page(22050 * 2)
+        
+        self.assertAlmostEqual(self.probe(probe_ogg, data), 2.0)
+    
+    def test_probe_mp4(self):
+        """Test the MP4 duration is read from mvhd, after a large mdat atom."""
+        mvhd = struct.pack('>IIIII', 0, 0, 0, 1000, 2500) + b'\x00' * 80
+        data = (make_atom(b'ftyp', b'M4A \x00\x00\x00\x00')
+                + make_atom(b'mdat', b'\x00' * 5000)
+                + make_atom(b'moov', make_atom(b'mvhd', mvhd)))
+        
+        self.assertAlmostEqual(self.probe(probe_mp4, data), 2.5)
+    
+    def test_probe_mp4_version_1(self):
+        """Test a version 1 mvhd atom with 64-bit times is read."""
+        mvhd = struct.pack('>IQQIQ', 1 << 24, 0, 0, 600, 600 * 4) + b'\x00' * 80
+        data = make_atom(b'moov', make_atom(b'mvhd', mvhd))
+        
+        self.assertAlmostEqual(self.probe(probe_mp4, data), 4.0)
+    
+    def test_probe_duration_picks_parser_by_extension(self):
+        """Test probe_duration dispatches on the extension and restores the position."""
+        f = io.BytesIO(make_wav(b'\x00' * 64000))
+        f.seek(7)
+        
+        duration = probe_duration(f, "Recording.WAV", len(f.getvalue()))
+        
+        self.assertAlmostEqual(duration, 2.0)
+        self.assertEqual(f.tell(), 7)
+        self.assertIsNone(probe_duration(f, "recording.aac", len(f.getvalue())))
+    
+    def test_probe_duration_unreadable_header(self):
+        """Test a truncated header gives None instead of raising."""
+        data = b'fLaC\x00'
+        
+        self.assertIsNone(probe_duration(io.BytesIO(data), "recording.flac", len(data)))
+
+if __name__ == '__main__':
+    unittest.main()
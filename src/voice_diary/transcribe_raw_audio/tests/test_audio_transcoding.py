@@ -0,0 +1,106 @@
+"""Unit tests for audio_transcoding module."""
+import unittest
+from unittest.mock import patch, MagicMock
+import tempfile
+from pathlib import Path
+
+from voice_diary.transcribe_raw_audio.audio_transcoding import (
+    parse_bitrate,
+    transcode_for_upload,
+)
+
+MODULE = 'voice_diary.transcribe_raw_audio.audio_transcoding'
+
+
+def fake_ffmpeg(output_bytes):
+    """Build a subprocess.run stand-in that writes an output file of 'output_bytes' bytes.
+    
+    'output_bytes' is a function of the input path, so each recording can transcode to its own content.
+    """
+    def run(command, **kwargs):
+        Path(command[-1]).write_bytes(output_bytes(Path(command[command.index("-i") + 1])))
+        return MagicMock(returncode=0, stderr="")
+    return run
+
+
+class TestTranscodeForUpload(unittest.TestCase):
+    """Tests for transcoding recordings before upload."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = Path(self.temp_dir.name)
+        self.output_dir = self.root / "upload"
+        self.output_dir.mkdir()
+    
+    def make_recording(self, relative_path, size):
+        file_path = self.root / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(b'\x01' * size)
+        return file_path
+    
+    def test_parse_bitrate(self):
+        """Test ffmpeg bitrates are converted to bits per second."""
+        self.assertEqual(parse_bitrate('24k'), 24000)
+        self.assertEqual(parse_bitrate('64000'), 64000)
+    
+    @patch(f'{MODULE}.subprocess.run')
+    @patch(f'{MODULE}.audio_duration.get_duration', return_value=60.0)
+    def test_already_compact_is_skipped(self, mock_duration, mock_run):
+        """Test a recording already below the target bitrate is not transcoded."""
+        # 60 s at 24 kbit/s would be 180000 bytes
+        recording = self.make_recording("memo.m4a", 150000)
+        
+        result = transcode_for_upload(recording, self.output_dir)
+        
+        self.assertFalse(result['transcoded'])
+        self.assertEqual(result['reason'], 'already compact')
+        self.assertEqual(result['path'], str(recording))
+        mock_run.assert_not_called()
+    
+    @patch(f'{MODULE}.subprocess.run', side_effect=fake_ffmpeg(lambda path: b'\x00' * 2000000))
+    @patch(f'{MODULE}.audio_duration.get_duration', return_value=None)
+    def test_larger_output_is_discarded(self, mock_duration, mock_run):
+        """Test a transcoded file that is not smaller is thrown away."""
+        recording = self.make_recording("memo.wav", 1000000)
+        
+        result = transcode_for_upload(recording, self.output_dir)
+        
+        self.assertFalse(result['transcoded'])
+        self.assertEqual(result['reason'], 'not smaller after transcoding')
+        self.assertEqual(result['path'], str(recording))
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+    
+    @patch(f'{MODULE}.subprocess.run', side_effect=fake_ffmpeg(lambda path: path.parent.name.encode() * 100))
+    @patch(f'{MODULE}.audio_duration.get_duration', return_value=60.0)
+    def test_same_name_recordings_get_own_output(self, mock_duration, mock_run):
+        """Test recordings with the same name in different folders are transcoded to separate files."""
+        first = self.make_recording("a/rec.wav", 2000000)
+        second = self.make_recording("b/rec.wav", 2000000)
+        
+        first_result = transcode_for_upload(first, self.output_dir)
+        second_result = transcode_for_upload(second, self.output_dir)
+        
+        # Assert each result holds its own recording's audio
+        self.assertTrue(first_result['transcoded'])
+        self.assertTrue(second_result['transcoded'])
+        self.assertNotEqual(first_result['path'], second_result['path'])
+        self.assertEqual(Path(first_result['path']).read_bytes(), b'a' * 100)
+        self.assertEqual(Path(second_result['path']).read_bytes(), b'b' * 100)
+        self.assertEqual(Path(first_result['path']).suffix, '.ogg')
+        self.assertEqual(first_result['upload_bytes'], 100)
+    
+    @patch(f'{MODULE}.subprocess.run', return_value=MagicMock(returncode=1, stderr="Invalid data"))
+    @patch(f'{MODULE}.audio_duration.get_duration', return_value=60.0)
+    def test_ffmpeg_failure_keeps_original(self, mock_duration, mock_run):
+        """Test the original is uploaded when ffmpeg fails, leaving no output behind."""
+        recording = self.make_recording("memo.wav", 2000000)
+        
+        result = transcode_for_upload(recording, self.output_dir)
+        
+        self.assertFalse(result['transcoded'])
+        self.assertIn('Invalid data', result['reason'])
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Unit tests for audio_vad module."""
+import unittest
+import tempfile
+import wave
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+from voice_diary.transcribe_raw_audio.audio_vad import (
+    speech_mask,
+    mask_segments,
+    screen_recording,
+)
+
+SAMPLE_RATE = 16000
+
+
+def write_wav(path, sections):
+    """Write a mono 16-bit WAV file of tone ('speech') and silent sections.
+    
+    Args:
+        path: Path of the file to write
+        sections: (seconds, is_speech) pairs in order
+    """
+    rng = np.random.default_rng(0)
+    parts = []
+    for seconds, is_speech in sections:
+        count = int(seconds * SAMPLE_RATE)
+        if is_speech:
+            t = np.arange(count) / SAMPLE_RATE
+            parts.append(0.3 * 32767 * np.sin(2 * np.pi * 220 * t))
+        else:
+            # Faint room noise, about -70 dBFS
+            parts.append(rng.normal(0, 10, count))
+    samples = np.concatenate(parts).astype('<i2')
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return Path(path)
+
+
+class TestSpeechMask(unittest.TestCase):
+    """Tests for marking speech frames."""
+    
+    def test_marks_frames_above_noise_floor(self):
+        """Test loud frames count as speech, widened by the hangover."""
+        levels = np.array([-80.0] * 10 + [-20.0] * 3 + [-80.0] * 10)
+        
+        mask = speech_mask(levels, hangover_frames=2)
+        
+        self.assertEqual(list(np.flatnonzero(mask)), list(range(8, 15)))
+    
+    def test_loud_recording_is_speech(self):
+        """Test the threshold never rises above its maximum, so a loud recording is all speech."""
+        levels = np.full(50, -20.0)
+        
+        mask = speech_mask(levels, max_threshold_db=-30, hangover_frames=0)
+        
+        self.assertTrue(mask.all())
+    
+    def test_empty_levels(self):
+        """Test a recording without frames has an empty mask."""
+        self.assertEqual(len(speech_mask(np.zeros(0))), 0)
+    
+    def test_mask_segments(self):
+        """Test a mask is turned into speech times."""
+        mask = np.array([False, True, True, False, True])
+        
+        self.assertEqual(mask_segments(mask, 0.5), [(0.5, 1.5), (2.0, 2.5)])
+
+
+class TestScreenRecording(unittest.TestCase):
+    """Tests for deciding whether a recording is worth transcribing."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = Path(self.temp_dir.name)
+        self.output_dir = self.root / "trimmed"
+        self.output_dir.mkdir()
+    
+    def test_skips_silent_recording(self):
+        """Test a recording without speech is skipped."""
+        recording = write_wav(self.root / "silent.wav", [(5, False)])
+        
+        result = screen_recording(recording, self.output_dir)
+        
+        self.assertEqual(result['decision'], 'skip')
+        self.assertEqual(result['speech_seconds'], 0)
+        self.assertEqual(result['path'], str(recording))
+    
+    def test_keeps_mostly_speech(self):
+        """Test a recording that is mostly speech is uploaded as is."""
+        recording = write_wav(self.root / "speech.wav", [(0.5, False), (4, True), (0.5, False)])
+        
+        result = screen_recording(recording, self.output_dir)
+        
+        self.assertEqual(result['decision'], 'keep')
+        self.assertEqual(result['path'], str(recording))
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+    
+    def test_trims_mostly_silent_recording(self):
+        """Test a mostly silent recording is trimmed to its speech."""
+        recording = write_wav(self.root / "quiet.wav", [(8, False), (3, True), (9, False)])
+        
+        result = screen_recording(recording, self.output_dir, hangover_seconds=0.3)
+        
+        self.assertEqual(result['decision'], 'trim')
+        self.assertAlmostEqual(result['speech_seconds'], 3.6, delta=0.1)
+        with wave.open(result['path'], 'rb') as wav:
+            self.assertAlmostEqual(wav.getnframes() / wav.getframerate(), 3.6, delta=0.1)
+    
+    def test_trimmed_copies_of_same_name_do_not_collide(self):
+        """Test recordings with the same name in different folders get their own trimmed copy."""
+        (self.root / "a").mkdir()
+        (self.root / "b").mkdir()
+        first = write_wav(self.root / "a" / "memo.wav", [(8, False), (2, True), (10, False)])
+        second = write_wav(self.root / "b" / "memo.wav", [(6, False), (4, True), (10, False)])
+        
+        first_result = screen_recording(first, self.output_dir)
+        second_result = screen_recording(second, self.output_dir)
+        
+        # Assert both were trimmed to separate files, each with its own speech
+        self.assertNotEqual(first_result['path'], second_result['path'])
+        with wave.open(first_result['path'], 'rb') as wav:
+            first_seconds = wav.getnframes() / wav.getframerate()
+        with wave.open(second_result['path'], 'rb') as wav:
+            second_seconds = wav.getnframes() / wav.getframerate()
+        self.assertLess(first_seconds, second_seconds)
+    
+    def test_keeps_original_when_trimmed_copy_is_not_smaller(self):
+        """Test a compressed recording is kept when its PCM trimmed copy would be larger."""
+        recording = write_wav(self.root / "quiet.wav", [(8, False), (3, True), (9, False)])
+        
+        def write_large_copy(file_path, segments, output_path):
+            Path(output_path).write_bytes(b'\0' * (recording.stat().st_size + 1))
+            return Path(output_path)
+        
+        with patch('voice_diary.transcribe_raw_audio.audio_vad.write_speech_wav', side_effect=write_large_copy):
+            result = screen_recording(recording, self.output_dir)
+        
+        # Assert the original is used and the trimmed copy is removed
+        self.assertEqual(result['decision'], 'keep')
+        self.assertEqual(result['reason'], 'trimmed copy not smaller')
+        self.assertEqual(result['path'], str(recording))
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+    
+    def test_keeps_undecodable_recording(self):
+        """Test a recording that cannot be decoded is kept, not skipped."""
+        recording = self.root / "broken.wav"
+        recording.write_bytes(b'not audio')
+        
+        result = screen_recording(recording, self.output_dir)
+        
+        self.assertEqual(result['decision'], 'keep')
+        self.assertEqual(result['path'], str(recording))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,469 @@
+"""Unit tests for transcribe_raw_audio module."""
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import platform
+import contextlib
+from pathlib import Path
+
+from voice_diary.transcribe_raw_audio.transcribe_raw_audio import (
+    transcribe_files_concurrently,
+    open_transcription_output,
+    split_for_transcription,
+    transcribe_audio_file,
+    process_audio_files,
+    store_transcription,
+    select_backend,
+    get_backend_model,
+    transcribe_locally,
+    main,
+    scan_audio_files,
+    load_audio_index,
+    TRANSCRIPTION_MODEL,
+    release_dead_claims,
+    process_is_running,
+    RUN_ID,
+)
+
+MODULE = 'voice_diary.transcribe_raw_audio.transcribe_raw_audio'
+
+CHUNKING_CONFIG = {
+    "enabled": True,
+    "max_chunk_seconds": 600,
+    "safety_margin_seconds": 5,
+    "max_upload_bytes": 25000000,
+    "overlap_seconds": 1.5,
+    "concurrency": 2,
+}
+
+
+def make_transcribing_client(texts):
+    """Build a client mock whose transcriptions return 'texts' by uploaded file name."""
+    def create(model, file):
+        # Keeps the measured transcription time above zero on coarse clocks
+        time.sleep(0.02)
+        return MagicMock(text=texts[Path(file.name).name])
+    
+    client = MagicMock()
+    client.audio.transcriptions.create.side_effect = create
+    return client
+
+
+class TestTranscribeFilesConcurrently(unittest.TestCase):
+    """Tests for transcribing files concurrently through the async client."""
+    
+    @patch(f'{MODULE}.get_async_openai_client', side_effect=lambda: contextlib.nullcontext(MagicMock()))
+    @patch(f'{MODULE}.transcribe_audio_file_async')
+    def test_results_are_reported_in_order(self, mock_transcribe, mock_client):
+        """Test results reach the callback in file order even when later files finish first."""
+        audio_files = [Path(f"{i}.mp3") for i in range(5)]
+        finished = []
+        running = 0
+        most_running = 0
+        
+        async def transcribe(client, file_path, semaphore, timeout=None, backend=None):
+            nonlocal running, most_running
+            async with semaphore:
+                running += 1
+                most_running = max(most_running, running)
+                # Earlier files take longer
+                await asyncio.sleep(0.01 * (5 - int(file_path.stem)))
+                running -= 1
+            finished.append(file_path)
+            return f"text {file_path.stem}"
+        
+        mock_transcribe.side_effect = transcribe
+        reported = []
+        
+        asyncio.run(transcribe_files_concurrently(
+            audio_files, 3, lambda file_path, text: reported.append((file_path, text))))
+        
+        # Assert the files finished out of order but were reported in order
+        self.assertNotEqual(finished, audio_files)
+        self.assertEqual(reported, [(file_path, f"text {file_path.stem}") for file_path in audio_files])
+        self.assertEqual(most_running, 3)
+    
+    @patch(f'{MODULE}.get_async_openai_client')
+    @patch(f'{MODULE}.transcribe_audio_file_async')
+    def test_failed_file_is_reported_as_none(self, mock_transcribe, mock_client):
+        """Test a failed transcription is reported as None without holding back later files."""
+        async def transcribe(client, file_path, semaphore, timeout=None, backend=None):
+            return None if file_path.stem == "1" else f"text {file_path.stem}"
+        
+        mock_transcribe.side_effect = transcribe
+        audio_files = [Path(f"{i}.mp3") for i in range(3)]
+        reported = []
+        
+        asyncio.run(transcribe_files_concurrently(
+            audio_files, 2, lambda file_path, text: reported.append(text),
+            backends={file_path: "local" for file_path in audio_files}))
+        
+        # Assert no API client is opened when every file is transcribed locally
+        self.assertEqual(reported, ["text 0", None, "text 2"])
+        mock_client.assert_not_called()
+
+
+class TestOpenTranscriptionOutput(unittest.TestCase):
+    """Tests for streaming transcriptions to the combined output file."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.output_dir = Path(self.temp_dir.name) / "transcriptions"
+    
+    def test_commits_to_final_name(self):
+        """Test transcriptions are written to a .part file that is renamed on exit."""
+        with open_transcription_output(self.output_dir, "transcription.txt") as write:
+            write("First")
+            write(None)
+            write("Second")
+            part_files = list(self.output_dir.glob("*.part"))
+            # Assert each transcription is on disk as soon as it is written
+            self.assertEqual(len(part_files), 1)
+            self.assertEqual(part_files[0].read_text(encoding='utf-8'), "First\nSecond")
+        
+        # Assert only the final file is left
+        output_files = list(self.output_dir.iterdir())
+        self.assertEqual(len(output_files), 1)
+        self.assertTrue(output_files[0].name.endswith("_transcription.txt"))
+        self.assertEqual(output_files[0].read_text(encoding='utf-8'), "First\nSecond")
+    
+    def test_nothing_written_leaves_no_file(self):
+        """Test an output without transcriptions is removed."""
+        with open_transcription_output(self.output_dir, "transcription.txt"):
+            pass
+        
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+    
+    def test_abort_keeps_transcriptions_written(self):
+        """Test an error part-way keeps the transcriptions written before it."""
+        with self.assertRaises(RuntimeError):
+            with open_transcription_output(self.output_dir, "transcription.txt") as write:
+                write("First")
+                raise RuntimeError("Interrupted")
+        
+        output_files = list(self.output_dir.iterdir())
+        self.assertEqual(len(output_files), 1)
+        self.assertFalse(output_files[0].name.endswith(".part"))
+        self.assertEqual(output_files[0].read_text(encoding='utf-8'), "First")
+    
+    def test_abort_without_transcriptions_leaves_no_file(self):
+        """Test an error before anything was written leaves no output behind."""
+        with self.assertRaises(RuntimeError):
+            with open_transcription_output(self.output_dir, "transcription.txt"):
+                raise RuntimeError("Interrupted")
+        
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+
+
+class TestChunkedTranscription(unittest.TestCase):
+    """Tests for transcribing long recordings in chunks."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.recording = Path(self.temp_dir.name) / "20240101_120000.mp3"
+        self.recording.write_bytes(b'\x00' * 100)
+    
+    @patch(f'{MODULE}.get_chunking_config', return_value=CHUNKING_CONFIG)
+    @patch(f'{MODULE}.audio_chunking.split_audio_file')
+    def test_split_plans_chunks_below_limit(self, mock_split, mock_config):
+        """Test chunks are planned the safety margin below the maximum length."""
+        split_for_transcription(self.recording, self.temp_dir.name, 1300.0)
+        
+        # Assert the margin is taken off the limit
+        self.assertEqual(mock_split.call_args.kwargs['max_chunk_seconds'], 595)
+        self.assertEqual(mock_split.call_args.kwargs['duration'], 1300.0)
+    
+    @patch(f'{MODULE}.get_chunking_config', return_value=CHUNKING_CONFIG)
+    @patch(f'{MODULE}.calculate_duration')
+    @patch(f'{MODULE}.audio_chunking.split_audio_file')
+    def test_chunks_are_not_split_again(self, mock_split, mock_duration, mock_config):
+        """Test a chunk that probes slightly over the limit is still sent in one request."""
+        chunk_paths = []
+        for i in range(2):
+            chunk_path = Path(self.temp_dir.name) / f"chunk{i}.mp3"
+            chunk_path.write_bytes(b'\x00' * 10)
+            chunk_paths.append(chunk_path)
+        mock_split.return_value = chunk_paths
+        # Encoder padding makes the re-encoded chunks a little longer than planned
+        mock_duration.side_effect = lambda path: 1200.0 if Path(path) == self.recording else 600.3
+        client = make_transcribing_client({"chunk0.mp3": "Good morning diary.", "chunk1.mp3": "Morning diary. Today was fine."})
+        
+        text = transcribe_audio_file(client, self.recording, backend="openai")
+        
+        # Assert the recording was split once and each chunk uploaded once
+        mock_split.assert_called_once()
+        self.assertEqual(client.audio.transcriptions.create.call_count, 2)
+        self.assertEqual(text, "Good morning diary. Today was fine.")
+
+
+class TestAudioIndex(unittest.TestCase):
+    """Tests for the saved index of the audio files in the downloads directory."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = Path(self.temp_dir.name)
+        self.downloads = self.root / "downloads"
+        (self.downloads / "2024" / "march").mkdir(parents=True)
+        for relative_path in ("20240301_090000.mp3", "2024/march/20240302_090000.m4a",
+                              "2024/20240101_090000.wav", "2024/notes.txt"):
+            (self.downloads / relative_path).write_bytes(b"audio")
+        
+        state_dir = self.root / "state"
+        for name, value in (('STATE_DIR', state_dir), ('AUDIO_INDEX_FILE', state_dir / "audio_index.json")):
+            patcher = patch(f'{MODULE}.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.extensions = {".mp3", ".m4a", ".wav"}
+    
+    def test_scan_finds_nested_files_in_order(self):
+        """Test audio files in subdirectories are found and sorted by the time in their name."""
+        records, directory_mtimes = scan_audio_files(self.downloads, self.extensions)
+        
+        # Assert only audio files are indexed, oldest first, and every directory was recorded
+        self.assertEqual([relative_path for _, relative_path in records], [
+            os.path.join("2024", "20240101_090000.wav"),
+            "20240301_090000.mp3",
+            os.path.join("2024", "march", "20240302_090000.m4a"),
+        ])
+        self.assertEqual(set(directory_mtimes), {"", "2024", os.path.join("2024", "march")})
+    
+    def test_index_is_reused_when_nothing_changed(self):
+        """Test a second run reads the saved index instead of scanning again."""
+        with patch(f'{MODULE}.scan_audio_files', wraps=scan_audio_files) as mock_scan:
+            first = load_audio_index(self.downloads, self.extensions)
+            second = load_audio_index(self.downloads, self.extensions)
+        
+        # Assert the directories were scanned once and both runs see the same files
+        self.assertEqual(mock_scan.call_count, 1)
+        self.assertEqual(second, first)
+    
+    def test_index_is_rebuilt_when_subdirectory_changes(self):
+        """Test a file added to a nested directory is picked up by the next run."""
+        load_audio_index(self.downloads, self.extensions)
+        march = self.downloads / "2024" / "march"
+        (march / "20240303_090000.mp3").write_bytes(b"audio")
+        # Moved forward explicitly, as the filesystem clock may be too coarse to show the change
+        mtime = march.stat().st_mtime_ns + 10 ** 9
+        os.utime(march, ns=(mtime, mtime))
+        
+        with patch(f'{MODULE}.scan_audio_files', wraps=scan_audio_files) as mock_scan:
+            records = load_audio_index(self.downloads, self.extensions)
+        
+        # Assert the tree was scanned again and the new file is last
+        self.assertEqual(mock_scan.call_count, 1)
+        self.assertEqual(records[-1][1], os.path.join("2024", "march", "20240303_090000.mp3"))
+
+
+class TestBackendSelection(unittest.TestCase):
+    """Tests for choosing between the OpenAI API and the local model."""
+    
+    LOCAL_CONFIG = {"model": "base", "compute_type": "int8", "beam_size": 2, "language": "en"}
+    
+    def set_backend_config(self, config):
+        patcher = patch(f'{MODULE}._backend_config', dict(config))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_select_backend_uses_configured_engine(self):
+        """Test a fixed engine is used for every file, whatever its size."""
+        self.set_backend_config({"engine": "local"})
+        self.assertEqual(select_backend("memo.mp3", size=10 ** 9), "local")
+        
+        self.set_backend_config({})
+        self.assertEqual(select_backend("memo.mp3", size=1), "openai")
+    
+    def test_select_backend_auto_picks_by_size(self):
+        """Test 'auto' transcribes small files locally and large ones through the API."""
+        self.set_backend_config({"engine": "auto", "local_max_bytes": 1000})
+        
+        self.assertEqual(select_backend("small.mp3", size=1000), "local")
+        self.assertEqual(select_backend("large.mp3", size=1001), "openai")
+    
+    def test_get_backend_model(self):
+        """Test each backend has its own transcription cache key."""
+        self.set_backend_config({"engine": "auto", "local": self.LOCAL_CONFIG})
+        
+        self.assertEqual(get_backend_model("local"), "local:base:int8")
+        self.assertEqual(get_backend_model("openai"), TRANSCRIPTION_MODEL)
+    
+    @patch(f'{MODULE}.local_whisper.transcribe', return_value="Local text")
+    def test_transcribe_locally_passes_settings(self, mock_transcribe):
+        """Test the local model is called with the configured settings."""
+        self.set_backend_config({"engine": "local", "local": self.LOCAL_CONFIG})
+        
+        text = transcribe_locally("memo.mp3")
+        
+        # Assert the text is returned and the settings were passed on
+        self.assertEqual(text, "Local text")
+        mock_transcribe.assert_called_once_with(
+            "memo.mp3", None, beam_size=2, language="en", model="base", compute_type="int8",
+            cpu_threads=None, num_workers=1, download_root=None
+        )
+    
+    @patch(f'{MODULE}.calculate_duration', return_value=3.0)
+    @patch(f'{MODULE}.local_whisper.transcribe', return_value="Local text")
+    def test_local_backend_does_not_call_api(self, mock_transcribe, mock_duration):
+        """Test a file routed to the local backend never reaches the API client."""
+        self.set_backend_config({"engine": "local"})
+        client = MagicMock()
+        
+        text = transcribe_audio_file(client, "memo.mp3")
+        
+        self.assertEqual(text, "Local text")
+        client.audio.transcriptions.create.assert_not_called()
+    
+    @patch(f'{MODULE}.run_transcribe')
+    @patch(f'{MODULE}.load_config', return_value={"backend": {"engine": "openai", "local_max_bytes": 1000}})
+    def test_backend_flag_overrides_config(self, mock_load_config, mock_run):
+        """Test --backend replaces the configured engine for the run and keeps the other settings."""
+        with patch(f'{MODULE}._backend_config', None), \
+                patch.object(sys, 'argv', ["transcribe_raw_audio", "--backend", "auto"]):
+            main()
+            
+            # Assert the run uses the flag's engine with the configured size limit
+            mock_run.assert_called_once()
+            self.assertEqual(select_backend("small.mp3", size=1000), "local")
+            self.assertEqual(select_backend("large.mp3", size=1001), "openai")
+        
+        # Assert the config itself was not changed
+        self.assertEqual(mock_load_config.return_value["backend"]["engine"], "openai")
+
+
+class TestClaimAndResume(unittest.TestCase):
+    """Tests for claiming files in the job table and resuming an earlier run."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = Path(self.temp_dir.name)
+        self.audio_files = []
+        for name in ("saved", "transcribed", "first", "second"):
+            file_path = self.root / f"{name}.mp3"
+            file_path.write_bytes(name.encode())
+            self.audio_files.append(file_path)
+        
+        # Job table rows left by an earlier run
+        self.jobs = {
+            str(self.root / "saved.mp3"): {"state": "saved", "content": "Saved before"},
+            str(self.root / "transcribed.mp3"): {"state": "transcribed", "content": "Transcribed before"},
+            str(self.root / "first.mp3"): {"state": "failed", "content": None},
+        }
+        self.events = []
+        self.unclaimable = set()
+        
+        def claim(audio_path, max_attempts, stale_after_seconds, claimed_by):
+            self.events.append(("claim", Path(audio_path).stem))
+            return Path(audio_path).stem not in self.unclaimable
+        
+        def transcribe(client, file_path, audio_file=None, backend=None):
+            self.events.append(("transcribe", Path(file_path).stem))
+            return f"Text of {Path(file_path).stem}"
+        
+        async def transcribe_async(client, file_path, semaphore, timeout=None, backend=None):
+            self.events.append(("transcribe", Path(file_path).stem))
+            return f"Text of {Path(file_path).stem}"
+        
+        def store(file_path, transcription, audio_hash=None, cached=False, metadata=None, model=None):
+            self.events.append(("store", Path(file_path).stem))
+            return transcription
+        
+        patches = {
+            'db_register_processed_files': MagicMock(return_value=self.jobs),
+            'db_claim_processed_file': MagicMock(side_effect=claim),
+            'db_get_processed_file_claimants': MagicMock(return_value=[]),
+            'get_jobs_config': MagicMock(return_value={"max_attempts": 3, "claim_timeout_seconds": 60}),
+            'select_backend': MagicMock(return_value="openai"),
+            'find_cached_transcription': MagicMock(return_value=None),
+            'transcribe_audio_file': MagicMock(side_effect=transcribe),
+            'transcribe_audio_file_async': MagicMock(side_effect=transcribe_async),
+            'get_async_openai_client': MagicMock(side_effect=lambda: contextlib.nullcontext(MagicMock())),
+            'store_transcription': MagicMock(side_effect=store),
+        }
+        self.mocks = {}
+        for name, mock in patches.items():
+            patcher = patch(f'{MODULE}.{name}', mock)
+            self.mocks[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def read_output(self):
+        output_files = list((self.root / "out").glob("*_transcription.txt"))
+        return output_files[0].read_text(encoding='utf-8') if output_files else ""
+    
+    def test_resumes_and_claims_each_file_before_transcribing(self):
+        """Test saved files are skipped, transcribed ones reused and the rest claimed one at a time."""
+        result = process_audio_files(MagicMock(), self.audio_files, self.root / "out", "transcription.txt")
+        
+        # Assert each claim comes right before that file's transcription
+        self.assertTrue(result)
+        self.assertEqual([event for event in self.events if event[0] != "store"], [
+            ("claim", "first"), ("transcribe", "first"),
+            ("claim", "second"), ("transcribe", "second"),
+        ])
+        self.assertEqual(self.read_output(), "Transcribed before\nText of first\nText of second")
+        self.assertEqual(self.mocks['db_claim_processed_file'].call_args[0][3], RUN_ID)
+    
+    def test_unclaimed_file_is_left_alone(self):
+        """Test a file another run holds is neither transcribed nor saved."""
+        self.unclaimable.add("first")
+        
+        process_audio_files(MagicMock(), self.audio_files, self.root / "out", "transcription.txt")
+        
+        self.assertNotIn(("transcribe", "first"), self.events)
+        self.assertNotIn(("store", "first"), self.events)
+        self.assertEqual(self.read_output(), "Transcribed before\nText of second")
+    
+    def test_concurrent_run_claims_inside_each_task(self):
+        """Test the concurrent path claims each file before its transcription and skips unclaimed ones."""
+        self.unclaimable.add("second")
+        
+        process_audio_files(MagicMock(), self.audio_files, self.root / "out", "transcription.txt", concurrency=2)
+        
+        self.assertLess(self.events.index(("claim", "first")), self.events.index(("transcribe", "first")))
+        self.assertIn(("claim", "second"), self.events)
+        self.assertNotIn(("transcribe", "second"), self.events)
+        self.assertNotIn(("store", "second"), self.events)
+        self.assertEqual(self.read_output(), "Transcribed before\nText of first")
+    
+    @patch(f'{MODULE}.db_release_processed_file_claims', return_value=2)
+    @patch(f'{MODULE}.process_is_running', side_effect=lambda pid: pid != 999999)
+    def test_release_dead_claims(self, mock_running, mock_release):
+        """Test only the claims of ended processes on this host are released."""
+        host = platform.node()
+        self.mocks['db_get_processed_file_claimants'].return_value = [
+            f"{host}:999999", f"{host}:1234", f"{host}:{os.getpid()}", "other-host:999999"
+        ]
+        
+        released = release_dead_claims()
+        
+        self.assertEqual(released, 2)
+        mock_release.assert_called_once_with([f"{host}:999999"], unittest.mock.ANY)
+    
+    @patch(f'{MODULE}.calculate_duration', return_value=12.0)
+    @patch(f'{MODULE}.db_complete_processed_file')
+    @patch(f'{MODULE}.db_save_processed_transcription', return_value=None)
+    def test_resumed_file_is_saved_once(self, mock_save, mock_complete, mock_duration):
+        """Test a resumed file is saved through the job-locked save, which skips files already saved."""
+        file_path = self.root / "transcribed.mp3"
+        
+        formatted = store_transcription(file_path, "Transcribed before", "abc123", model="whisper-1")
+        
+        # Assert the transcription, cache entry and job state go through one call
+        mock_save.assert_called_once()
+        self.assertEqual(mock_save.call_args[0], (str(file_path), "Transcribed before"))
+        self.assertEqual(mock_save.call_args[1]["audio_sha256"], "abc123")
+        self.assertEqual(mock_save.call_args[1]["model"], "whisper-1")
+        self.assertIn("Transcribed before", formatted)
+    
+    def test_process_is_running(self):
+        """Test this process counts as running."""
+        self.assertTrue(process_is_running(os.getpid()))
+
+if __name__ == '__main__':
+    unittest.main()
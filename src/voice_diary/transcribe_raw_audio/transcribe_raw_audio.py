@@ -4,6 +4,7 @@ OpenAI Whisper API Transcription
 
 This script transcribes audio files using OpenAI's API:
 - whisper-1 API endpoint 
+- or, offline, a quantized Whisper model run locally on the CPU (local_whisper)
 
 It processes audio files in the downloads directory in chronological order,
 supporting both individual files and batch processing based on the configuration.
@@ -15,24 +16,54 @@ import json
 import argparse
 import logging
 import time
-import shutil
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 import tempfile
 import asyncio
 import concurrent.futures
 import traceback
 import platform
-import subprocess
 import logging.handlers
 import re
-from openai import OpenAI
-from voice_diary.db_utils.db_manager import save_transcription as db_save_transcription
+import queue
+import hashlib
+import contextlib
+import threading
+from openai import OpenAI, AsyncOpenAI
+from voice_diary.db_utils.db_manager import save_processed_transcription as db_save_processed_transcription
+from voice_diary.db_utils.db_manager import get_cached_transcription as db_get_cached_transcription
+from voice_diary.db_utils.db_manager import register_processed_files as db_register_processed_files
+from voice_diary.db_utils.db_manager import claim_processed_file as db_claim_processed_file
+from voice_diary.db_utils.db_manager import get_processed_file_claimants as db_get_processed_file_claimants
+from voice_diary.db_utils.db_manager import release_processed_file_claims as db_release_processed_file_claims
+from voice_diary.db_utils.db_manager import complete_processed_file as db_complete_processed_file
+from voice_diary.db_utils.db_manager import mark_processed_file_saved as db_mark_processed_file_saved
+from voice_diary.db_utils.db_manager import fail_processed_file as db_fail_processed_file
+from voice_diary.db_utils.db_manager import skip_processed_file as db_skip_processed_file
+from voice_diary.transcribe_raw_audio import audio_duration
+from voice_diary.transcribe_raw_audio import audio_vad
+from voice_diary.transcribe_raw_audio import local_whisper
+from voice_diary.transcribe_raw_audio import audio_chunking
+from voice_diary.transcribe_raw_audio import audio_transcoding
 
 
 # Get the package directory path
 SCRIPT_DIR = Path(sys._MEIPASS) if getattr(sys, 'frozen', False) else Path(__file__).resolve().parent
 LOGS_DIR = SCRIPT_DIR / "logs"
+STATE_DIR = SCRIPT_DIR / "state"
+AUDIO_INDEX_FILE = STATE_DIR / "audio_index.json"
+
+# Model used for API transcriptions (also part of the transcription cache key)
+TRANSCRIPTION_MODEL = "whisper-1"
+
+# Transcription backends: the OpenAI API or a local model on the CPU
+BACKENDS = ("openai", "local")
+
+# Owner of this run's claims in the processed_files job table (host:pid)
+RUN_ID = f"{platform.node()}:{os.getpid()}"
+
+# Timestamp added to file names by dwnload_files (YYYYMMDD_HHMMSS)
+FILENAME_TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{6})')
 
 # Make sure the log directory exists
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -76,20 +107,40 @@ def setup_logging(logs_dir, log_filename="transcribe_raw_audio.log", to_file=Tru
 # Initialize logger after function definition
 logger = setup_logging(LOGS_DIR)
 
+# Google Drive download config, read once per process
+_gdrive_config = None
+
+def load_gdrive_config():
+    """Load the Google Drive download config (cached after the first call).
+    
+    Returns:
+        dict: The config, or None if it is missing or unreadable
+    """
+    global _gdrive_config
+    
+    if _gdrive_config is not None:
+        return _gdrive_config
+    
+    project_root = Path(__file__).resolve().parent.parent
+    gdrive_config_path = project_root / "dwnload_files" / "config_dwnload_files" / "config_dwnld_from_gdrive.json"
+    
+    if not gdrive_config_path.exists():
+        logger.warning(f"Google Drive config file not found at {gdrive_config_path}")
+        return None
+        
+    with open(gdrive_config_path, 'r') as f:
+        _gdrive_config = json.load(f)
+    
+    return _gdrive_config
+
 # Get downloads directory from Google Drive config
 def get_downloads_dir_from_gdrive_config():
     """Get downloads directory from Google Drive download config."""
     try:
-        project_root = Path(__file__).resolve().parent.parent
-        gdrive_config_path = project_root / "dwnload_files" / "config_dwnload_files" / "config_dwnld_from_gdrive.json"
-        
-        if not gdrive_config_path.exists():
-            logger.warning(f"Google Drive config file not found at {gdrive_config_path}")
+        gdrive_config = load_gdrive_config()
+        if gdrive_config is None:
             return None
             
-        with open(gdrive_config_path, 'r') as f:
-            gdrive_config = json.load(f)
-            
         return gdrive_config.get("downloads_path", {}).get("downloads_dir")
     except Exception as e:
         logger.warning(f"Error loading Google Drive config: {str(e)}")
@@ -98,16 +149,10 @@ def get_downloads_dir_from_gdrive_config():
 def get_audio_extensions_from_gdrive_config():
     """Get supported audio extensions from Google Drive download config."""
     try:
-        project_root = Path(__file__).resolve().parent.parent
-        gdrive_config_path = project_root / "dwnload_files" / "config_dwnload_files" / "config_dwnld_from_gdrive.json"
-        
-        if not gdrive_config_path.exists():
-            logger.warning(f"Google Drive config file not found at {gdrive_config_path}")
+        gdrive_config = load_gdrive_config()
+        if gdrive_config is None:
             return None
             
-        with open(gdrive_config_path, 'r') as f:
-            gdrive_config = json.load(f)
-            
         return gdrive_config.get("audio_file_types", {}).get("include", [])
     except Exception as e:
         logger.warning(f"Error loading audio extensions from Google Drive config: {str(e)}")
@@ -125,7 +170,7 @@ def get_openai_client():
             sys.exit(1)
             
         # Create OpenAI client
-        client = OpenAI(api_key=api_key)
+        client = OpenAI(api_key=api_key, base_url=get_api_base_url())
         return client
         
     except Exception as e:
@@ -133,31 +178,35 @@ def get_openai_client():
         traceback.print_exc()
         sys.exit(1)
 
+def get_async_openai_client():
+    """Get an instance of the async OpenAI client."""
+    api_key = os.environ.get("OPENAI_API_KEY")
+    
+    if not api_key:
+        logger.error("OPENAI_API_KEY environment variable not set")
+        logger.error("Please set the OPENAI_API_KEY environment variable with your OpenAI API key")
+        sys.exit(1)
+    
+    return AsyncOpenAI(api_key=api_key, base_url=get_api_base_url())
+
+def get_api_base_url():
+    """Get the API base URL from the configured 'api_endpoint', e.g. to use a local stand-in server.
+    
+    Returns:
+        str: The endpoint up to and including '/v1', or None for the client's default
+    """
+    api_endpoint = load_config().get("api_endpoint")
+    if not api_endpoint or "/v1" not in api_endpoint:
+        return None
+    return api_endpoint[:api_endpoint.index("/v1") + len("/v1")]
+
 def calculate_duration(file_path):
-    """Calculate estimated duration of an audio file in seconds."""
+    """Get the duration of an audio file in seconds (None if it cannot be determined)."""
     try:
-        # Use ffprobe with platform-agnostic command construction
-        ffprobe_cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            str(file_path)
-        ]
-        
-        # Use subprocess.run with shell=False for better cross-platform compatibility
-        result = subprocess.run(
-            ffprobe_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            shell=False
-        )
-        return float(result.stdout.strip())
-    except Exception:
-        # Fallback: use file size as a very rough estimate (3MB ≈ 1 minute)
-        file_size = os.path.getsize(file_path)
-        return (file_size / (3 * 1024 * 1024)) * 60  # Convert to seconds
+        return audio_duration.get_duration(file_path)
+    except OSError as e:
+        logger.warning(f"Could not read {file_path} to get its duration: {str(e)}")
+        return None
 
 def load_config():
     """Load configuration from transcribe_config.json."""
@@ -177,8 +226,330 @@ def load_config():
         traceback.print_exc()
         sys.exit(1)
 
+# Chunking settings, read once per process
+_chunking_config = None
+
+def get_chunking_config():
+    """Get the chunking settings for long recordings from the config."""
+    global _chunking_config
+    
+    if _chunking_config is None:
+        _chunking_config = load_config().get("chunking", {})
+    return _chunking_config
+
+# Backend settings, read once per process (the engine can be overridden per run)
+_backend_config = None
+
+def get_backend_config():
+    """Get the transcription backend settings from the config."""
+    global _backend_config
+    
+    if _backend_config is None:
+        _backend_config = dict(load_config().get("backend", {}))
+    return _backend_config
+
+def select_backend(file_path, size=None):
+    """Pick the transcription backend for an audio file.
+    
+    The configured engine is "openai", "local" or "auto"; with "auto",
+    files of up to 'local_max_bytes' are transcribed locally and larger
+    ones through the API.
+    
+    Args:
+        file_path: Path of the audio file
+        size: Size of the file in bytes, if it is not on disk
+        
+    Returns:
+        str: "openai" or "local"
+    """
+    backend_config = get_backend_config()
+    engine = backend_config.get("engine", "openai")
+    if engine != "auto":
+        return engine
+    
+    if size is None:
+        size = os.path.getsize(file_path)
+    return "local" if size <= backend_config.get("local_max_bytes", 2000000) else "openai"
+
+def get_backend_model(backend):
+    """Get the name of the model a backend transcribes with (used as the transcription cache key)."""
+    if backend == "local":
+        local_config = get_backend_config().get("local", {})
+        return f"local:{local_config.get('model', 'small')}:{local_config.get('compute_type', 'int8')}"
+    return TRANSCRIPTION_MODEL
+
+def transcribe_locally(file_path, audio_file=None):
+    """Transcribe an audio file with the local Whisper model using the backend settings."""
+    local_config = get_backend_config().get("local", {})
+    return local_whisper.transcribe(
+        file_path,
+        audio_file,
+        beam_size=local_config.get("beam_size", 1),
+        language=local_config.get("language"),
+        model=local_config.get("model", "small"),
+        compute_type=local_config.get("compute_type", "int8"),
+        cpu_threads=local_config.get("cpu_threads"),
+        num_workers=local_config.get("num_workers", 1),
+        download_root=local_config.get("download_root")
+    )
+
+# Job table settings, read once per process
+_jobs_config = None
+
+def get_jobs_config():
+    """Get the settings for claiming files in the processed_files job table from the config."""
+    global _jobs_config
+    
+    if _jobs_config is None:
+        _jobs_config = load_config().get("jobs", {})
+    return _jobs_config
+
+def claim_file(file_path):
+    """Claim an audio file for transcription in the processed_files job table.
+    
+    Returns:
+        bool: False if the file is already done, failed too often or is being
+              transcribed by another run; True otherwise (also if the job
+              table cannot be reached, so a database problem does not stop
+              transcription)
+    """
+    jobs_config = get_jobs_config()
+    claimed = db_claim_processed_file(
+        str(file_path),
+        jobs_config.get("max_attempts", 3),
+        jobs_config.get("claim_timeout_seconds", 3600),
+        RUN_ID
+    )
+    if claimed is False:
+        logger.info(f"Skipping {Path(file_path).name}: already handled, failed too often or in progress")
+    return claimed is not False
+
+def process_is_running(pid):
+    """Check whether a process with the given id is running on this machine."""
+    if platform.system() == "Windows":
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return False
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+def release_dead_claims():
+    """Give up the claims of earlier runs on this machine whose process has ended.
+    
+    Their files can then be claimed again right away instead of after the
+    claim timeout. Claims of runs on other machines are left to the timeout.
+    
+    Returns:
+        int: Number of files released
+    """
+    host = platform.node()
+    dead_claimants = []
+    for claimant in db_get_processed_file_claimants():
+        claimant_host, _, pid = claimant.rpartition(":")
+        if claimant_host != host or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        if not process_is_running(int(pid)):
+            dead_claimants.append(claimant)
+    
+    if not dead_claimants:
+        return 0
+    
+    released = db_release_processed_file_claims(dead_claimants, "The run transcribing the file ended")
+    if released:
+        logger.info(f"Released {released} file(s) claimed by {len(dead_claimants)} run(s) that ended")
+    return released
+
+def needs_chunking(file_path, duration):
+    """Check whether a recording is too long or too large to upload in one request."""
+    chunking_config = get_chunking_config()
+    if not chunking_config.get("enabled", False):
+        return False
+    
+    max_chunk_seconds = chunking_config.get("max_chunk_seconds", 600)
+    max_upload_bytes = chunking_config.get("max_upload_bytes", 25 * 1024 * 1024)
+    return ((duration is not None and duration > max_chunk_seconds)
+            or os.path.getsize(file_path) > max_upload_bytes)
+
+def split_for_transcription(file_path, output_dir, duration):
+    """Split a long recording into chunk files using the chunking settings.
+    
+    Chunks are planned 'safety_margin_seconds' shorter than the limit, as
+    re-encoded chunks can come out slightly longer than planned (encoder
+    padding).
+    """
+    chunking_config = get_chunking_config()
+    max_chunk_seconds = chunking_config.get("max_chunk_seconds", 600)
+    safety_margin = chunking_config.get("safety_margin_seconds", 5)
+    return audio_chunking.split_audio_file(
+        file_path,
+        output_dir,
+        max_chunk_seconds=max(max_chunk_seconds - safety_margin, max_chunk_seconds / 2),
+        overlap_seconds=chunking_config.get("overlap_seconds", 1.5),
+        threshold_db=chunking_config.get("silence_threshold_db", -35),
+        min_silence_seconds=chunking_config.get("min_silence_seconds", 0.5),
+        duration=duration
+    )
+
+def transcribe_long_audio_file(client, file_path, duration):
+    """Transcribe a long recording in chunks that are transcribed in parallel.
+    
+    The recording is split at silences (see audio_chunking), the chunks are
+    transcribed concurrently and their transcripts are stitched back together
+    in order, so the wall time is about that of the slowest chunk.
+    
+    Returns:
+        str: The transcription text, or None if any chunk failed
+    """
+    file_path = Path(file_path)
+    concurrency = max(1, int(get_chunking_config().get("concurrency", 4)))
+    
+    with tempfile.TemporaryDirectory(prefix="transcribe_chunks_") as chunk_dir:
+        chunk_paths = split_for_transcription(file_path, chunk_dir, duration)
+        
+        start_time = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            texts = list(executor.map(
+                lambda chunk_path: transcribe_audio_file(client, chunk_path, backend="openai", allow_chunking=False),
+                chunk_paths
+            ))
+    
+    if any(text is None for text in texts):
+        logger.error(f"Transcription of {file_path} failed for "
+                     f"{sum(1 for text in texts if text is None)} of {len(texts)} chunk(s)")
+        return None
+    
+    logger.info(f"Transcribed {len(chunk_paths)} chunk(s) of {file_path.name} in {time.time() - start_time:.2f} seconds")
+    return audio_chunking.stitch_transcripts(texts)
+
+def get_file_sort_key(name, ctime):
+    """Get the chronological sort key of an audio file.
+    
+    Uses the YYYYMMDD_HHMMSS timestamp in the file name when there is one,
+    and falls back to the file creation time otherwise.
+    
+    Returns:
+        float: POSIX timestamp to sort by
+    """
+    timestamp_match = FILENAME_TIMESTAMP_PATTERN.search(name)
+    if timestamp_match:
+        try:
+            return datetime.strptime(timestamp_match.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    
+    return ctime
+
+def scan_audio_files(directory, audio_extensions):
+    """Index the audio files in a directory and its subdirectories in a single pass.
+    
+    Recursive Drive downloads keep their folder structure, so recordings can
+    sit in nested subdirectories of the downloads directory.
+    
+    Args:
+        directory: Directory to scan
+        audio_extensions: Set of lower-case extensions to include
+        
+    Returns:
+        tuple: ([sort_key, relative_path] records sorted chronologically,
+                dict of the relative path of every scanned directory -> its mtime in ns)
+    """
+    records = []
+    directory_mtimes = {}
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        scan_dir = os.path.join(directory, relative_dir)
+        directory_mtimes[relative_dir] = os.stat(scan_dir).st_mtime_ns
+        with os.scandir(scan_dir) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                if entry.is_dir():
+                    pending.append(relative_path)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in audio_extensions:
+                    continue
+                if not entry.is_file():
+                    continue
+                records.append([get_file_sort_key(entry.name, entry.stat().st_ctime), relative_path])
+    
+    records.sort()
+    return records, directory_mtimes
+
+def directories_unchanged(directory, directory_mtimes):
+    """Check that none of the directories of a saved index were modified since it was saved."""
+    try:
+        return all(
+            os.stat(os.path.join(directory, relative_dir)).st_mtime_ns == mtime
+            for relative_dir, mtime in directory_mtimes.items()
+        )
+    except OSError:
+        return False
+
+def load_audio_index(directory, audio_extensions):
+    """Get the chronological index of the audio files in a directory tree.
+    
+    The index is saved between runs and reused as long as none of the
+    directories have changed since (files or subdirectories added, removed
+    or renamed change their parent's mtime), so a large archive is only
+    rescanned after new downloads.
+    
+    Args:
+        directory: Directory to index
+        audio_extensions: Set of lower-case extensions to include
+        
+    Returns:
+        list: [sort_key, relative_path] records sorted chronologically
+    """
+    extensions = sorted(audio_extensions)
+    
+    try:
+        with open(AUDIO_INDEX_FILE, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if (index.get("directory") == str(directory) and index.get("extensions") == extensions
+                and directories_unchanged(directory, index["directory_mtimes"])):
+            logger.info(f"Using saved index of {len(index['files'])} audio file(s) in {directory}")
+            return index["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    records, directory_mtimes = scan_audio_files(directory, audio_extensions)
+    
+    try:
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = AUDIO_INDEX_FILE.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "directory": str(directory),
+                "directory_mtimes": directory_mtimes,
+                "extensions": extensions,
+                "files": records
+            }, f)
+        os.replace(tmp_file, AUDIO_INDEX_FILE)
+    except OSError as e:
+        logger.warning(f"Could not save audio file index: {str(e)}")
+    
+    return records
+
 def get_audio_files(directory):
-    """Get all audio files from the specified directory and sort them chronologically."""
+    """Get all audio files in the specified directory and its subdirectories, sorted chronologically."""
     directory = Path(directory)
     
     if not directory.exists():
@@ -186,143 +557,771 @@ def get_audio_files(directory):
         return []
         
     # Get audio extensions from Google Drive config
-    audio_extensions = get_audio_extensions_from_gdrive_config()
-    
-    # Get all files with audio extensions
-    audio_files = []
-    for ext in audio_extensions:
-        audio_files.extend(directory.glob(f"*{ext}"))
-    
-    if not audio_files:
-        return []
-    
-    # Function to extract timestamp from filename if present
-    def get_timestamp_from_filename(filepath):
-        filename = filepath.name
-        # Try to extract timestamp in format YYYYMMDD_HHMMSS from filename
-        timestamp_match = re.search(r'(\d{8}_\d{6})', filename)
-        if timestamp_match:
-            try:
-                # If timestamp found in filename, use it
-                timestamp_str = timestamp_match.group(1)
-                return datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-            except ValueError:
-                pass
-        
-        # Fall back to file creation time if no timestamp in filename
-        # or if timestamp couldn't be parsed
-        return datetime.fromtimestamp(os.path.getctime(filepath))
+    audio_extensions = frozenset(ext.lower() for ext in get_audio_extensions_from_gdrive_config() or [])
     
     # Sort files by timestamp
     logger.info("Sorting audio files by creation time (chronological order)")
-    sorted_files = sorted(audio_files, key=get_timestamp_from_filename)
+    records = load_audio_index(directory, audio_extensions)
+    
+    if not records:
+        return []
     
     # Log the sorted files
-    if sorted_files:
-        logger.info("Files will be processed in the following order:")
-        for i, file in enumerate(sorted_files, 1):
-            timestamp = get_timestamp_from_filename(file)
-            logger.info(f"{i}. {file.name} (Created: {timestamp.strftime('%Y-%m-%d %H:%M:%S')})")
+    logger.info("Files will be processed in the following order:")
+    for i, (sort_key, name) in enumerate(records, 1):
+        created = datetime.fromtimestamp(sort_key).strftime('%Y-%m-%d %H:%M:%S')
+        logger.info(f"{i}. {name} (Created: {created})")
     
-    return sorted_files
+    return [directory / name for _, name in records]
 
-def transcribe_audio_file(client, file_path):
-    """Transcribe a single audio file using OpenAI's Whisper API."""
+def transcribe_audio_file(client, file_path, audio_file=None, backend=None, allow_chunking=True):
+    """Transcribe a single audio file using OpenAI's Whisper API or the local model.
+    
+    If 'audio_file' is given (an open binary file, such as a download held in
+    memory) it is uploaded instead of reading 'file_path', which then only
+    provides the file name.
+    
+    'backend' ("openai" or "local") picks the engine; by default it is chosen
+    from the configuration and the file size (see select_backend).
+    
+    Chunks of a long recording are transcribed with 'allow_chunking' off, so
+    they are never split again.
+    """
     try:
         logger.info(f"Transcribing file: {file_path}")
         
-        # Calculate estimated duration to log progress
-        duration = calculate_duration(file_path)
-        logger.info(f"Estimated duration: {duration:.2f} seconds")
+        # Get the duration to log progress
+        size = None
+        if audio_file is None:
+            duration = calculate_duration(file_path)
+        else:
+            # Not on disk yet, so read the header from the buffer
+            audio_file.seek(0, os.SEEK_END)
+            size = audio_file.tell()
+            audio_file.seek(0)
+            duration = audio_duration.probe_duration(audio_file, Path(file_path).name, size)
+        if duration is not None:
+            logger.info(f"Duration: {duration:.2f} seconds")
+        
+        if backend is None:
+            backend = select_backend(file_path, size)
+        
+        # Recordings over the length or upload limit are sent to the API in chunks
+        if backend == "openai" and audio_file is None and allow_chunking and needs_chunking(file_path, duration):
+            return transcribe_long_audio_file(client, file_path, duration)
         
         start_time = time.time()
         
-        # Open the audio file
-        with open(file_path, "rb") as audio_file:
-            # Call the OpenAI API
+        if backend == "local":
+            text = transcribe_locally(file_path, audio_file)
+        elif audio_file is None:
+            # Open the audio file
+            with open(file_path, "rb") as audio_file:
+                # Call the OpenAI API
+                transcription = client.audio.transcriptions.create(
+                    model=TRANSCRIPTION_MODEL, 
+                    file=audio_file
+                )
+            text = transcription.text
+        else:
+            # The name tells the API which audio format the buffer holds
             transcription = client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file
+                model=TRANSCRIPTION_MODEL, 
+                file=(Path(file_path).name, audio_file)
             )
+            text = transcription.text
         
         end_time = time.time()
         transcription_time = end_time - start_time
         
         logger.info(f"Transcription completed in {transcription_time:.2f} seconds")
-        logger.info(f"Transcription speed: {duration/transcription_time:.2f}x real-time")
+        if duration is not None:
+            logger.info(f"Transcription speed: {duration/transcription_time:.2f}x real-time")
         
-        return transcription.text
+        return text
         
     except Exception as e:
         logger.error(f"Error transcribing file {file_path}: {str(e)}")
         traceback.print_exc()
         return None
 
-def save_transcription(text, output_path, file_name):
-    """Save the transcription to the output file."""
-    if not text:
-        logger.warning("No transcription text to save")
-        return False
+@contextlib.contextmanager
+def open_transcription_output(output_path, file_name):
+    """Open the combined transcription file for writing one transcription at a time.
+    
+    Each transcription is appended and flushed to disk as soon as it is
+    written, so memory use does not grow with the batch and a crash leaves
+    everything written so far in '<timestamp>_<file_name>.part'. On exit the
+    file is renamed to its final name in one step (or removed if nothing was
+    written).
+    
+    Args:
+        output_path: Directory for the output file
+        file_name: Name of the output file, prefixed with a timestamp
         
+    Yields:
+        function: Takes one formatted transcription and appends it to the file
+    """
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = output_path / f"{timestamp}_{file_name}"
+    part_file = output_file.with_name(f"{output_file.name}.part")
+    written = 0
+    
+    try:
+        with open(part_file, 'w', encoding='utf-8') as f:
+            def write(text):
+                nonlocal written
+                if not text:
+                    return
+                if written:
+                    f.write("\n")
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+                written += 1
+            
+            yield write
+    finally:
+        if written:
+            os.replace(part_file, output_file)
+            logger.info(f"{written} transcription(s) saved to {output_file}")
+        else:
+            part_file.unlink(missing_ok=True)
+
+def hash_audio(audio_file):
+    """Get the SHA-256 hex digest of an open binary audio file, leaving its position unchanged."""
+    position = audio_file.tell()
+    audio_file.seek(0)
+    hasher = hashlib.sha256()
+    for block in iter(lambda: audio_file.read(1024 * 1024), b""):
+        hasher.update(block)
+    audio_file.seek(position)
+    return hasher.hexdigest()
+
+def hash_audio_file(file_path):
+    """Get the SHA-256 hex digest of an audio file, or None if it cannot be read."""
     try:
-        output_path = Path(output_path)
-        output_path.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "rb") as audio_file:
+            return hash_audio(audio_file)
+    except OSError as e:
+        logger.warning(f"Could not hash {file_path}: {str(e)}")
+        return None
+
+def find_cached_transcription(audio_hash, model=TRANSCRIPTION_MODEL):
+    """Get the stored transcript of identical audio, or None if 'model' never transcribed it."""
+    if audio_hash is None:
+        return None
+    
+    entry = db_get_cached_transcription(audio_hash, model)
+    return entry["content"] if entry else None
+
+def transcribe_and_store(client, file_path):
+    """Transcribe one audio file and save the result to the database.
+    
+    Audio that was transcribed before is not sent to the API again; the
+    stored transcript is reused instead.
+    
+    Returns:
+        str: The transcription formatted for the combined output file, or None on failure
+    """
+    backend = select_backend(file_path)
+    model = get_backend_model(backend)
+    audio_hash = hash_audio_file(file_path)
+    cached_transcription = find_cached_transcription(audio_hash, model)
+    if cached_transcription is not None:
+        return store_transcription(file_path, cached_transcription, audio_hash, cached=True, model=model)
+    
+    # Transcribe the audio file
+    transcription = transcribe_audio_file(client, file_path, backend=backend)
+    
+    return store_transcription(file_path, transcription, audio_hash, model=model)
+
+def store_transcription(file_path, transcription, audio_hash=None, cached=False, metadata=None,
+                        model=TRANSCRIPTION_MODEL):
+    """Save the transcription of an audio file on disk to the database.
+    
+    A new transcription is also added to the transcription cache under
+    'audio_hash' and the 'model' that produced it. A transcript taken from the cache ('cached') is already in
+    the database and is not saved again. Saving is done once per file, so a
+    file that another run saved meanwhile (e.g. one resumed from the job
+    table) gets no second transcription row.
+    
+    The file's job in the processed_files table moves to 'transcribed' (with
+    the text, so it survives a crash) and then to 'saved', or to 'failed' if
+    there is no transcription. 'metadata' is added to the saved transcription's
+    metadata.
+    
+    Returns:
+        str: The transcription formatted for the combined output file, or None if there is none
+    """
+    file_path = Path(file_path)
+    
+    if not transcription:
+        db_fail_processed_file(str(file_path), "No transcription")
+        return None
+    
+    db_complete_processed_file(str(file_path), transcription)
+    
+    if cached:
+        logger.info(f"Reusing cached transcription for {file_path.name}")
+        db_mark_processed_file_saved(str(file_path))
+    else:
+        # Save transcription to database
+        duration = calculate_duration(file_path)
+        metadata = {"transcribed_at": datetime.now().isoformat(), "model": model, **(metadata or {})}
+        if audio_hash:
+            metadata["audio_sha256"] = audio_hash
+        db_save_processed_transcription(
+            str(file_path),
+            transcription,
+            filename=file_path.name, 
+            duration_seconds=duration,
+            metadata=metadata,
+            audio_sha256=audio_hash,
+            model=model
+        )
+    
+    # Add file name and timestamp to the transcription
+    file_name = file_path.name
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"File: {file_name}\nTimestamp: {timestamp}\n\n{transcription}\n\n"
+
+async def transcribe_audio_file_async(client, file_path, semaphore, timeout=None, backend=None,
+                                      allow_chunking=True):
+    """Transcribe a single audio file using the async OpenAI client.
+    
+    At most as many transcriptions as the semaphore allows run at once.
+    A request that takes longer than 'timeout' seconds is cancelled. Long
+    recordings are split into chunks that share the same semaphore (and are
+    transcribed with 'allow_chunking' off, so they are never split again).
+    
+    Files for the local backend are transcribed on a worker thread instead,
+    outside the semaphore (see select_backend).
+    
+    Returns:
+        str: The transcription text, or None on failure
+    """
+    file_path = Path(file_path)
+    
+    if backend is None:
+        backend = await asyncio.to_thread(select_backend, file_path)
+    if backend == "local":
+        return await asyncio.to_thread(transcribe_audio_file, None, file_path, None, "local")
+    
+    duration = await asyncio.to_thread(calculate_duration, file_path) if allow_chunking else None
+    if allow_chunking and needs_chunking(file_path, duration):
+        with tempfile.TemporaryDirectory(prefix="transcribe_chunks_") as chunk_dir:
+            try:
+                chunk_paths = await asyncio.to_thread(split_for_transcription, file_path, chunk_dir, duration)
+            except Exception as e:
+                logger.error(f"Error splitting file {file_path}: {str(e)}")
+                return None
+            texts = await asyncio.gather(*[
+                transcribe_audio_file_async(client, chunk_path, semaphore, timeout, "openai", allow_chunking=False)
+                for chunk_path in chunk_paths
+            ])
+        if any(text is None for text in texts):
+            logger.error(f"Transcription of {file_path} failed for "
+                         f"{sum(1 for text in texts if text is None)} of {len(texts)} chunk(s)")
+            return None
+        return audio_chunking.stitch_transcripts(texts)
+    
+    async with semaphore:
+        try:
+            logger.info(f"Transcribing file: {file_path}")
+            start_time = time.time()
+            
+            # Read the file off the event loop so other uploads keep going
+            audio_data = await asyncio.to_thread(file_path.read_bytes)
+            transcription = await asyncio.wait_for(
+                client.audio.transcriptions.create(
+                    model=TRANSCRIPTION_MODEL,
+                    file=(file_path.name, audio_data)
+                ),
+                timeout
+            )
+            
+            logger.info(f"Transcription of {file_path.name} completed in {time.time() - start_time:.2f} seconds")
+            return transcription.text
+            
+        except asyncio.TimeoutError:
+            logger.error(f"Transcription of {file_path} timed out after {timeout} seconds")
+            return None
+        except Exception as e:
+            logger.error(f"Error transcribing file {file_path}: {str(e)}")
+            return None
+
+# Settings of the "vad" config section passed on to audio_vad.screen_recording
+VAD_OPTIONS = ("min_speech_seconds", "skip_below_ratio", "trim_below_ratio", "threshold_db",
+               "noise_margin_db", "max_threshold_db", "frame_seconds", "hangover_seconds")
+
+def screen_recordings(audio_files, output_dir, vad_config):
+    """Run voice activity detection on audio files before they are uploaded.
+    
+    Recordings with (almost) no speech are marked to be skipped and mostly
+    silent ones are trimmed to their speech (see audio_vad.screen_recording).
+    The files are decoded and analyzed on a thread pool.
+    
+    Args:
+        audio_files: Audio file paths
+        output_dir: Directory for the trimmed copies
+        vad_config: The "vad" config section
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = output_path / f"{timestamp}_{file_name}"
+    Returns:
+        dict: Audio file path -> screening result ('decision', 'path' of the file to transcribe, speech figures)
+    """
+    options = {key: vad_config[key] for key in VAD_OPTIONS if key in vad_config}
+    workers = vad_config.get("workers") or os.cpu_count() or 1
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            file_path: executor.submit(audio_vad.screen_recording, file_path, output_dir, **options)
+            for file_path in audio_files
+        }
+    
+    results = {}
+    for file_path, future in futures.items():
+        try:
+            results[file_path] = future.result()
+        except Exception as e:
+            logger.warning(f"Voice detection failed for {Path(file_path).name}, keeping it: {str(e)}")
+            results[file_path] = {"decision": "keep", "path": str(file_path), "reason": str(e)}
+            continue
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-            
-        logger.info(f"Transcription saved to {output_file}")
-        return True
+        result = results[file_path]
+        if "speech_ratio" in result:
+            logger.info(f"Voice detection for {Path(file_path).name}: {result['decision']} "
+                        f"({result['speech_seconds']:.1f}s of speech in {result['duration_seconds']:.1f}s)")
+    return results
+
+def start_transcoding(executor, audio_files, output_dir, transcoding_config):
+    """Submit every audio file for pre-upload transcoding on a process pool.
+    
+    Args:
+        executor: ProcessPoolExecutor to run the transcoding on
+        audio_files: Audio file paths
+        output_dir: Directory for the transcoded files
+        transcoding_config: The "transcoding" config section
         
+    Returns:
+        dict: Audio file path -> Future of its audio_transcoding.transcode_for_upload result
+    """
+    return {
+        file_path: executor.submit(
+            audio_transcoding.transcode_for_upload,
+            str(file_path),
+            str(output_dir),
+            transcoding_config.get("codec", "opus"),
+            transcoding_config.get("bitrate", "24k"),
+            transcoding_config.get("sample_rate", 16000)
+        )
+        for file_path in audio_files
+    }
+
+def get_upload_path(file_path, transcode_result):
+    """Pick the file to upload from a transcoding result, logging the outcome."""
+    if isinstance(transcode_result, Exception):
+        logger.warning(f"Transcoding {file_path} failed, uploading the original: {str(transcode_result)}")
+        return Path(file_path)
+    
+    if transcode_result["transcoded"]:
+        logger.info(f"Transcoded {Path(file_path).name} for upload: "
+                    f"{transcode_result['original_bytes']} -> {transcode_result['upload_bytes']} bytes")
+    else:
+        logger.info(f"Uploading {Path(file_path).name} as is ({transcode_result['reason']})")
+    return Path(transcode_result["path"])
+
+def wait_for_upload_path(file_path, upload_futures):
+    """Get the file to upload for an audio file, waiting for its transcoding if needed."""
+    if not upload_futures or file_path not in upload_futures:
+        return Path(file_path)
+    
+    try:
+        return get_upload_path(file_path, upload_futures[file_path].result())
     except Exception as e:
-        logger.error(f"Error saving transcription: {str(e)}")
-        traceback.print_exc()
-        return False
+        return get_upload_path(file_path, e)
+
+async def transcribe_files_concurrently(audio_files, concurrency, on_transcribed, timeout=None,
+                                       upload_futures=None, backends=None, claim=None):
+    """Transcribe audio files concurrently through one shared async client.
+    
+    Args:
+        audio_files: Audio file paths in chronological order
+        concurrency: Maximum number of transcriptions in flight
+        on_transcribed: Called (in a worker thread) with each file path and its
+            transcription text (or None), in the order of 'audio_files', as
+            soon as the file and all files before it are done
+        timeout: Optional per-request timeout in seconds
+        upload_futures: Optional futures of the files' pre-upload transcoding
+            (see start_transcoding); each file is sent once its own is done
+        backends: Optional backend for each file (see select_backend)
+        claim: Optional callable run (in a worker thread) with each file path
+            right before it is transcribed; a file it returns False for is
+            not transcribed and passed to 'on_transcribed' with None. At
+            most 'concurrency' files are then claimed and in progress at once.
+    """
+    backends = backends or {}
+    semaphore = asyncio.Semaphore(concurrency)
+    file_slots = asyncio.Semaphore(concurrency) if claim else contextlib.nullcontext()
+    
+    async def transcribe_when_ready(client, file_path):
+        upload_path = Path(file_path)
+        if upload_futures and file_path in upload_futures:
+            try:
+                upload_path = get_upload_path(file_path, await asyncio.wrap_future(upload_futures[file_path]))
+            except Exception as e:
+                upload_path = get_upload_path(file_path, e)
+        async with file_slots:
+            if claim and not await asyncio.to_thread(claim, file_path):
+                return None
+            return await transcribe_audio_file_async(client, upload_path, semaphore, timeout,
+                                                     backends.get(file_path))
+    
+    # No API client is needed when every file is transcribed locally
+    api_needed = any(backends.get(file_path) != "local" for file_path in audio_files)
+    async with (get_async_openai_client() if api_needed else contextlib.nullcontext()) as client:
+        tasks = [
+            asyncio.create_task(transcribe_when_ready(client, file_path))
+            for file_path in audio_files
+        ]
+        try:
+            for file_path, task in zip(audio_files, tasks):
+                await asyncio.to_thread(on_transcribed, file_path, await task)
+        finally:
+            # On cancellation (e.g. Ctrl+C) stop the requests still queued or running
+            for task in tasks:
+                task.cancel()
 
-def process_audio_files(client, audio_files, output_path, output_file):
-    """Process all audio files and save their transcriptions."""
+def get_vad_metadata(vad_result):
+    """Get the voice detection figures and decision to record in metadata."""
+    return {key: value for key, value in vad_result.items() if key != "path"}
+
+def process_audio_files(client, audio_files, output_path, output_file, concurrency=1, timeout=None,
+                        transcoding=None, vad=None):
+    """Process all audio files and save their transcriptions.
+    
+    With a concurrency above 1 the files are transcribed concurrently (see
+    transcribe_files_concurrently); the results are still saved to the
+    database and the output file in chronological order.
+    
+    Every file is tracked in the processed_files job table, so a rerun after
+    an interruption skips the files already saved, saves the ones already
+    transcribed without sending them again, and transcribes only the rest.
+    Each file is claimed right before it is transcribed, so a concurrent run
+    can take the files this one has not reached yet.
+    
+    If 'vad' (the "vad" config section) is enabled, recordings with too little
+    speech are skipped and mostly silent ones are trimmed before they are
+    uploaded; the decision is recorded in the metadata of the job or the
+    saved transcription.
+    
+    If 'transcoding' (the "transcoding" config section) is enabled, every file
+    is first transcoded to compact mono audio on a process pool, and the
+    smaller file is uploaded in its place. Transcoding runs ahead of the
+    transcriptions, which start on each file as soon as it is ready.
+    """
     if not audio_files:
         logger.warning("No audio files found")
         return False
         
     logger.info(f"Found {len(audio_files)} audio file(s) to process")
     
-    all_transcriptions = []
-    
+    # Resume from the job table: saved files are done, transcribed ones only need saving
+    jobs = db_register_processed_files(audio_files)
+    resumed_transcriptions = {}
+    remaining_files = []
     for file_path in audio_files:
-        logger.info(f"Processing {file_path}")
+        job = jobs.get(str(file_path))
+        if job and job["state"] in ("saved", "skipped"):
+            continue
+        if job and job["state"] == "transcribed" and job["content"]:
+            resumed_transcriptions[file_path] = job["content"]
+        remaining_files.append(file_path)
+    if len(remaining_files) < len(audio_files):
+        logger.info(f"Skipping {len(audio_files) - len(remaining_files)} file(s) already saved or skipped")
+    if resumed_transcriptions:
+        logger.info(f"Resuming {len(resumed_transcriptions)} file(s) transcribed in an earlier run")
+    audio_files = remaining_files
+    release_dead_claims()
+    
+    # Chosen by the size of the recording, before any trimming or transcoding
+    backends = {file_path: select_backend(file_path) for file_path in audio_files}
+    models = {file_path: get_backend_model(backend) for file_path, backend in backends.items()}
+    
+    # Audio transcribed before (same content and model) is not sent again
+    audio_hashes = {file_path: hash_audio_file(file_path) for file_path in audio_files}
+    cached_transcriptions = dict(resumed_transcriptions)
+    for file_path, audio_hash in audio_hashes.items():
+        if file_path in cached_transcriptions:
+            continue
+        cached_transcription = find_cached_transcription(audio_hash, models[file_path])
+        if cached_transcription is not None:
+            cached_transcriptions[file_path] = cached_transcription
+    if len(cached_transcriptions) > len(resumed_transcriptions):
+        logger.info(f"{len(cached_transcriptions) - len(resumed_transcriptions)} file(s) "
+                    f"found in the transcription cache")
+    
+    files_to_transcribe = [file_path for file_path in audio_files if file_path not in cached_transcriptions]
+    
+    with contextlib.ExitStack() as stack:
+        # Recordings without enough speech are dropped before anything is uploaded
+        vad_results = {}
+        if vad and vad.get("enabled", False) and files_to_transcribe:
+            vad_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="transcribe_vad_"))
+            vad_results = screen_recordings(files_to_transcribe, vad_dir, vad)
+            skipped_files = {file_path for file_path, result in vad_results.items() if result["decision"] == "skip"}
+            for file_path in skipped_files:
+                # Claimed first, so a file another run is transcribing is left alone
+                if claim_file(file_path):
+                    db_skip_processed_file(str(file_path), {"vad": get_vad_metadata(vad_results[file_path])})
+            if skipped_files:
+                logger.info(f"Skipping {len(skipped_files)} recording(s) without enough speech")
+            files_to_transcribe = [file_path for file_path in files_to_transcribe if file_path not in skipped_files]
+            audio_files = [file_path for file_path in audio_files if file_path not in skipped_files]
         
-        # Transcribe the audio file
-        transcription = transcribe_audio_file(client, file_path)
+        # A trimmed copy is transcoded and uploaded in place of its recording
+        upload_sources = {
+            file_path: Path(vad_results[file_path]["path"]) if file_path in vad_results else file_path
+            for file_path in files_to_transcribe
+        }
+        recordings_by_source = {source: file_path for file_path, source in upload_sources.items()}
         
-        if transcription:
-            # Save transcription to database
-            duration = calculate_duration(file_path)
-            db_save_transcription(
-                content=transcription,
-                filename=file_path.name, 
-                audio_path=str(file_path),
-                duration_seconds=duration,
-                metadata={"transcribed_at": datetime.now().isoformat()}
+        upload_futures = None
+        if transcoding and transcoding.get("enabled", False):
+            workers = transcoding.get("workers") or os.cpu_count() or 1
+            logger.info(f"Transcoding files for upload with {workers} worker process(es)")
+            upload_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="transcribe_upload_"))
+            executor = stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=workers))
+            # Registered last so it runs first: queued transcodes are dropped on early exit
+            stack.callback(executor.shutdown, wait=True, cancel_futures=True)
+            # Only uploads are transcoded; the local backend reads any format itself
+            upload_futures = start_transcoding(
+                executor,
+                [upload_sources[file_path] for file_path in files_to_transcribe if backends[file_path] != "local"],
+                upload_dir,
+                transcoding
             )
+        
+        # Each transcription goes to the output file as soon as it is saved
+        write_output = stack.enter_context(open_transcription_output(output_path, output_file))
+        transcriptions_written = 0
+        
+        # Files that could not be claimed are left to the run that holds them
+        unclaimed_files = set()
+        
+        def claim(file_path):
+            if claim_file(file_path):
+                return True
+            unclaimed_files.add(file_path)
+            return False
+        
+        def finish_file(file_path, transcription=None):
+            nonlocal transcriptions_written
+            if file_path in unclaimed_files:
+                return
+            if file_path in cached_transcriptions:
+                formatted_transcription = store_transcription(
+                    file_path, cached_transcriptions[file_path], audio_hashes[file_path],
+                    cached=file_path not in resumed_transcriptions, model=models[file_path])
+            else:
+                metadata = {"vad": get_vad_metadata(vad_results[file_path])} if file_path in vad_results else None
+                formatted_transcription = store_transcription(file_path, transcription, audio_hashes[file_path],
+                                                              metadata=metadata, model=models[file_path])
             
-            # Add file name and timestamp to the transcription
-            file_name = file_path.name
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            formatted_transcription = f"File: {file_name}\nTimestamp: {timestamp}\n\n{transcription}\n\n"
-            
-            all_transcriptions.append(formatted_transcription)
+            if formatted_transcription:
+                write_output(formatted_transcription)
+                transcriptions_written += 1
+        
+        # Files are finished in chronological order; cached ones in between need no transcription
+        remaining_files = iter(audio_files)
+        
+        def on_transcribed(file_path, transcription):
+            for earlier_file in remaining_files:
+                if earlier_file == file_path:
+                    break
+                finish_file(earlier_file)
+            finish_file(file_path, transcription)
+        
+        if concurrency > 1 and files_to_transcribe:
+            logger.info(f"Transcribing up to {concurrency} file(s) concurrently")
+            asyncio.run(transcribe_files_concurrently(
+                [upload_sources[file_path] for file_path in files_to_transcribe],
+                concurrency,
+                lambda source, transcription: on_transcribed(recordings_by_source[source], transcription),
+                timeout,
+                upload_futures,
+                {upload_sources[file_path]: backends[file_path] for file_path in files_to_transcribe},
+                lambda source: claim(recordings_by_source[source])
+            ))
+        else:
+            for file_path in files_to_transcribe:
+                if not claim(file_path):
+                    continue
+                logger.info(f"Processing {file_path}")
+                upload_path = wait_for_upload_path(upload_sources[file_path], upload_futures)
+                on_transcribed(file_path, transcribe_audio_file(client, upload_path, backend=backends[file_path]))
+        
+        for file_path in remaining_files:
+            finish_file(file_path)
     
-    # Combine all transcriptions and save them
-    if all_transcriptions:
-        combined_text = "\n".join(all_transcriptions)
-        save_transcription(combined_text, output_path, output_file)
-        return True
+    return transcriptions_written > 0
+
+def run_pipelined_transcribe():
+    """Download from Google Drive and transcribe each audio file as soon as it arrives.
+    
+    Completed downloads are pushed onto a bounded queue that transcription
+    workers consume while the remaining files are still downloading. When the
+    queue is full the downloader waits, so downloads never run far ahead of
+    transcription.
+    
+    Small audio files are kept in memory and uploaded straight from there;
+    they are written to the downloads directory only after their
+    transcription, which saves a write and a read of each file.
+    
+    Voice detection ('vad' config section) is not run in pipeline mode:
+    every downloaded file is transcribed as it is.
+    """
+    # Imported here so the plain transcription run does not load the Drive client
+    from voice_diary.dwnload_files import dwnload_files
     
-    return False
+    try:
+        config = load_config()
+        pipeline_config = config.get("pipeline", {})
+        queue_size = max(1, int(pipeline_config.get("queue_size", 8)))
+        num_workers = max(1, int(pipeline_config.get("transcription_workers", 2)))
+        in_memory = pipeline_config.get("in_memory", True)
+        
+        output_file = config.get("output_file", "transcription.txt")
+        output_dir = Path(SCRIPT_DIR) / config.get("transcriptions_dir", "transcriptions")
+        
+        client = get_openai_client() if get_backend_config().get("engine", "openai") != "local" else None
+        
+        audio_queue = queue.Queue(maxsize=queue_size)
+        
+        # Transcriptions finished ahead of an earlier file wait here until it is done
+        pending_results = {}
+        next_sequence = 0
+        transcriptions_written = 0
+        results_lock = threading.Lock()
+        
+        def write_ready_results(write_output, flush_all=False):
+            nonlocal next_sequence, transcriptions_written
+            while pending_results and (flush_all or next_sequence in pending_results):
+                sequence = next_sequence if next_sequence in pending_results else min(pending_results)
+                formatted_transcription = pending_results.pop(sequence)
+                next_sequence = sequence + 1
+                if formatted_transcription:
+                    write_output(formatted_transcription)
+                    transcriptions_written += 1
+        
+        def process_download(download_result):
+            file_path = Path(download_result["saved_as"])
+            logger.info(f"Processing {file_path}")
+            db_register_processed_files([file_path])
+            if not claim_file(file_path):
+                if download_result.get("in_memory"):
+                    dwnload_files.persist_download(download_result)
+                return None
+            if download_result.get("in_memory"):
+                buffer = download_result["buffer"]
+                size = buffer.seek(0, os.SEEK_END)
+                buffer.seek(0)
+                backend = select_backend(file_path, size)
+                model = get_backend_model(backend)
+                audio_hash = hash_audio(buffer)
+                transcription = find_cached_transcription(audio_hash, model)
+                cached = transcription is not None
+                if not cached:
+                    transcription = transcribe_audio_file(client, file_path, buffer, backend)
+                # Saved even if the transcription failed, so the recording is never lost
+                if not dwnload_files.persist_download(download_result):
+                    return None
+                return store_transcription(file_path, transcription, audio_hash, cached, model=model)
+            return transcribe_and_store(client, file_path)
+        
+        def fail_download(download_result, error):
+            file_path = str(download_result["saved_as"])
+            db_fail_processed_file(file_path, error)
+            # Keep the recording of a failed file, as for a failed transcription
+            if download_result.get("in_memory"):
+                try:
+                    dwnload_files.persist_download(download_result)
+                except Exception as e:
+                    logger.error(f"Error saving {file_path} after a failure: {str(e)}")
+        
+        def transcription_worker(write_output):
+            while True:
+                item = audio_queue.get()
+                try:
+                    if item is None:
+                        return
+                    sequence, download_result = item
+                    formatted_transcription = None
+                    try:
+                        formatted_transcription = process_download(download_result)
+                    except Exception as e:
+                        # A worker that died here would leave the downloader blocked on a full queue
+                        logger.error(f"Error processing {download_result.get('saved_as')}: {str(e)}")
+                        traceback.print_exc()
+                        fail_download(download_result, str(e))
+                    finally:
+                        # Recorded even on failure, so the files after it are not held back
+                        with results_lock:
+                            pending_results[sequence] = formatted_transcription
+                            write_ready_results(write_output)
+                finally:
+                    audio_queue.task_done()
+        
+        # Number the files in download order so the combined output stays in that order
+        sequence_counter = iter(range(sys.maxsize))
+        sequence_lock = threading.Lock()
+        
+        def enqueue(download_result):
+            if download_result.get("file_type") != "audio":
+                return
+            with sequence_lock:
+                sequence = next(sequence_counter)
+            # Blocks while the queue is full, holding back further downloads
+            audio_queue.put((sequence, download_result))
+        
+        with open_transcription_output(output_dir, output_file) as write_output:
+            workers = [
+                threading.Thread(target=transcription_worker, args=(write_output,), name=f"transcribe-{i}",
+                                 daemon=True)
+                for i in range(num_workers)
+            ]
+            for worker in workers:
+                worker.start()
+            
+            logger.info(f"Starting pipelined download and transcription with {num_workers} worker(s)")
+            release_dead_claims()
+            # Kept open until the workers have recorded the files they saved
+            own_manifest = dwnload_files.open_download_manifest()
+            try:
+                dwnload_files.main(on_download=enqueue, in_memory=in_memory)
+            finally:
+                # One stop marker per worker, after every downloaded file
+                for _ in workers:
+                    audio_queue.put(None)
+                for worker in workers:
+                    worker.join()
+                if own_manifest:
+                    dwnload_files.download_manifest.close_manifest()
+                with results_lock:
+                    write_ready_results(write_output, flush_all=True)
+        
+        if transcriptions_written:
+            logger.info("Pipelined transcription process completed successfully")
+        else:
+            logger.warning("Pipelined transcription process completed without new transcriptions")
+            
+    except Exception as e:
+        logger.error(f"Error running pipelined transcription process: {str(e)}")
+        traceback.print_exc()
+        sys.exit(1)
 
 def run_transcribe():
     """Main function to run the transcription process."""
@@ -340,14 +1339,22 @@ def run_transcribe():
         # Get output directory (same as downloads directory)
         output_dir = Path(SCRIPT_DIR) / config.get("transcriptions_dir", "transcriptions")
         
+        # Get concurrency settings
+        transcription_config = config.get("transcription", {})
+        concurrency = max(1, int(transcription_config.get("concurrency", 1)))
+        timeout = transcription_config.get("timeout_seconds")
+        transcoding = config.get("transcoding", {})
+        vad = config.get("vad", {})
+        
         # Get OpenAI client
-        client = get_openai_client()
+        client = get_openai_client() if get_backend_config().get("engine", "openai") != "local" else None
         
         # Get audio files in chronological order
         audio_files = get_audio_files(downloads_dir)
         
         # Process audio files
-        success = process_audio_files(client, audio_files, output_dir, output_file)
+        success = process_audio_files(client, audio_files, output_dir, output_file, concurrency, timeout,
+                                      transcoding, vad)
         
         if success:
             logger.info("Transcription process completed successfully")
@@ -363,9 +1370,20 @@ def main():
     """Entry point for the script when run directly."""
     parser = argparse.ArgumentParser(description="Transcribe audio files using OpenAI's Whisper API")
     parser.add_argument("--config", help="Path to custom config file")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Download from Google Drive and transcribe files as they arrive")
+    parser.add_argument("--backend", choices=BACKENDS + ("auto",),
+                        help="Transcription backend for this run (overrides the config): the OpenAI API, "
+                             "the local model, or the local model for small files only")
     args = parser.parse_args()
     
-    run_transcribe()
+    if args.backend:
+        get_backend_config()["engine"] = args.backend
+    
+    if args.pipeline:
+        run_pipelined_transcribe()
+    else:
+        run_transcribe()
 
 if __name__ == "__main__":
     main()